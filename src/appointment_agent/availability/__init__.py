@@ -0,0 +1,28 @@
+"""This package contains the calendar availability helpers for the appointment agent."""
+
+from appointment_agent.availability.cache import (
+    AvailabilityCache,
+    get_availability_cache,
+)
+from appointment_agent.availability.freebusy import FreeBusyQuery, parse_free_slots_args
+from appointment_agent.availability.index import (
+    AvailabilityIndex,
+    get_availability_index,
+)
+from appointment_agent.availability.prefetch import AvailabilityPrefetch
+from appointment_agent.availability.temporal import (
+    TemporalWindow,
+    resolve_temporal_expression,
+)
+
+__all__ = [
+    "AvailabilityCache",
+    "AvailabilityIndex",
+    "AvailabilityPrefetch",
+    "FreeBusyQuery",
+    "TemporalWindow",
+    "get_availability_cache",
+    "get_availability_index",
+    "parse_free_slots_args",
+    "resolve_temporal_expression",
+]
@@ -0,0 +1,153 @@
+"""TTL cache of calendar free/busy data.
+
+Busy intervals are stored per calendar and per UTC day, so overlapping queries
+(the model always asks for three days) are answered from the day buckets that
+are already cached and only the missing days are fetched from Google Calendar.
+Buckets are dropped as soon as an event is created in them.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+from typing import Any, Iterable, Optional
+
+from appointment_agent.availability.freebusy import (
+    DEFAULT_CALENDAR,
+    FreeBusyQuery,
+    Interval,
+    clip_intervals,
+    get_timezone,
+    parse_calendar_datetime,
+)
+from appointment_agent.configuration import Configuration
+from appointment_agent.kv import KeyValueStore, get_key_value_store
+
+_DAY = datetime.timedelta(days=1)
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=datetime.timezone.utc)
+
+
+def _days(start: datetime.datetime, end: datetime.datetime) -> list[datetime.date]:
+    """List the UTC days that `[start, end)` touches (at least one)."""
+    first = start.astimezone(datetime.timezone.utc).date()
+    last = end.astimezone(datetime.timezone.utc).date()
+    if end <= start:
+        last = first
+    elif _day_start(last) == end:
+        last -= _DAY
+    return [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+class AvailabilityCache:
+    """Free/busy cache over a `KeyValueStore`."""
+
+    def __init__(
+        self, store: KeyValueStore, ttl_seconds: float, prefix: str = "availability"
+    ) -> None:
+        """Cache free/busy days in `store` under `prefix` for `ttl_seconds`."""
+        self._store = store
+        self._ttl_seconds = ttl_seconds
+        self._prefix = prefix
+
+    def _key(self, calendar: str, day: datetime.date) -> str:
+        return f"{self._prefix}:{calendar}:{day.isoformat()}"
+
+    async def lookup(
+        self, query: FreeBusyQuery
+    ) -> tuple[Optional[dict[str, list[Interval]]], Optional[FreeBusyQuery]]:
+        """Answer `query` from the cache.
+
+        Returns:
+            tuple: `(busy, None)` on a hit, with busy intervals per calendar, or
+            `(None, fetch_query)` on a miss, where `fetch_query` spans the whole
+            days that are missing and should be fetched and passed to `store`.
+        """
+        days = _days(query.start, query.end)
+        slots = [(calendar, day) for calendar in query.calendars for day in days]
+        values = await self._store.get_many([self._key(c, d) for c, d in slots])
+
+        missing = sorted(
+            {day for (_, day), value in zip(slots, values) if value is None}
+        )
+        if missing:
+            return None, query.with_window(
+                _day_start(missing[0]), _day_start(missing[-1]) + _DAY
+            )
+
+        busy: dict[str, list[Interval]] = {calendar: [] for calendar in query.calendars}
+        for (calendar, _), value in zip(slots, values):
+            busy[calendar].extend(
+                (datetime.datetime.fromisoformat(s), datetime.datetime.fromisoformat(e))
+                for s, e in json.loads(value or "[]")
+            )
+        return {c: sorted(intervals) for c, intervals in busy.items()}, None
+
+    async def store(
+        self, query: FreeBusyQuery, busy: dict[str, list[Interval]]
+    ) -> None:
+        """Cache the busy intervals of every whole day covered by `query`."""
+        items = {}
+        for day in _days(query.start, query.end):
+            start, end = _day_start(day), _day_start(day) + _DAY
+            if start < query.start or end > query.end:
+                continue
+            for calendar, intervals in busy.items():
+                items[self._key(calendar, day)] = json.dumps(
+                    [
+                        [s.isoformat(), e.isoformat()]
+                        for s, e in clip_intervals(intervals, start, end)
+                    ]
+                )
+        await self._store.set_many(items, self._ttl_seconds)
+
+    async def invalidate(
+        self, calendars: Iterable[str], start: datetime.datetime, end: datetime.datetime
+    ) -> None:
+        """Drop the cached days of `calendars` that overlap `[start, end)`."""
+        days = _days(start, end)
+        await self._store.delete_many(self._key(c, d) for c in calendars for d in days)
+
+    async def invalidate_event(self, args: dict[str, Any]) -> None:
+        """Drop the cached days touched by a `GOOGLECALENDAR_CREATE_EVENT` call."""
+        window = event_window(args)
+        if window is not None:
+            await self.invalidate(*window)
+
+
+def event_window(
+    args: dict[str, Any],
+) -> Optional[tuple[list[str], datetime.datetime, datetime.datetime]]:
+    """Get the calendars and time window affected by a create-event call."""
+    if not args or not args.get("start_datetime"):
+        return None
+    tz = get_timezone(args.get("timezone"))
+    try:
+        start = parse_calendar_datetime(args["start_datetime"], tz)
+        if args.get("end_datetime"):
+            end = parse_calendar_datetime(args["end_datetime"], tz)
+        else:
+            end = start + datetime.timedelta(
+                hours=float(args.get("event_duration_hour") or 0),
+                minutes=float(args.get("event_duration_minutes") or 0),
+            )
+    except (TypeError, ValueError):
+        return None
+
+    # The model may have queried the organizer's calendar or an attendee's.
+    calendars = {str(args.get("calendar_id") or DEFAULT_CALENDAR)}
+    for attendee in args.get("attendees") or []:
+        calendars.add(
+            str(attendee.get("email") if isinstance(attendee, dict) else attendee)
+        )
+    return sorted(calendars), start, max(end, start)
+
+
+def get_availability_cache(configuration: Configuration) -> Optional[AvailabilityCache]:
+    """Get the availability cache selected by the configuration, if any."""
+    store = get_key_value_store(configuration.availability_cache)
+    if store is None:
+        return None
+    return AvailabilityCache(store, configuration.availability_cache_ttl_seconds)
@@ -0,0 +1,202 @@
+"""Helpers to read and write `GOOGLECALENDAR_FIND_FREE_SLOTS` payloads.
+
+The model calls the tool with `time_min` / `time_max` either as ISO strings or in
+Composio's `YYYY,MM,DD,HH,MM,SS` form, plus a `timezone` and the calendar `items`.
+The response wraps a Google Calendar freeBusy object:
+
+    {"successfull": true, "error": null, "data": {"response_data": {
+        "kind": "calendar#freeBusy", "timeMin": ..., "timeMax": ...,
+        "calendars": {"primary": {"busy": [{"start": ..., "end": ...}]}}}}}
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from appointment_agent.utils import parse_tool_result, tool_result_succeeded
+
+Interval = tuple[datetime.datetime, datetime.datetime]
+
+DEFAULT_CALENDAR = "primary"
+
+
+def get_timezone(name: Optional[str]) -> datetime.tzinfo:
+    """Resolve an IANA timezone name, falling back to UTC."""
+    if not name:
+        return datetime.timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return datetime.timezone.utc
+
+
+def parse_calendar_datetime(value: Any, tz: datetime.tzinfo) -> datetime.datetime:
+    """Parse a tool datetime (ISO or `YYYY,MM,DD,HH,MM,SS`) as an aware datetime.
+
+    Naive values are interpreted in `tz`.
+    """
+    text = str(value).strip()
+    if "," in text:
+        dt = datetime.datetime(*(int(part) for part in text.split(",")))
+    else:
+        dt = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    return dt
+
+
+def format_calendar_datetime(
+    value: datetime.datetime, tz: datetime.tzinfo, comma_style: bool
+) -> str:
+    """Format a datetime in the same style the model used for the query."""
+    local = value.astimezone(tz)
+    if comma_style:
+        return local.strftime("%Y,%m,%d,%H,%M,%S")
+    return local.replace(tzinfo=None).isoformat()
+
+
+@dataclass(frozen=True)
+class FreeBusyQuery:
+    """A normalized free/busy query."""
+
+    calendars: tuple[str, ...]
+    start: datetime.datetime
+    end: datetime.datetime
+    timezone: str = "UTC"
+    comma_style: bool = False
+
+    @property
+    def tz(self) -> datetime.tzinfo:
+        """The timezone the query was made in."""
+        return get_timezone(self.timezone)
+
+    def with_window(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> FreeBusyQuery:
+        """Return the same query over a different time window."""
+        return replace(self, start=start, end=end)
+
+    def to_args(self, original: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """Render the query as tool arguments, keeping any extra original args."""
+        args = dict(original or {})
+        args.update(
+            time_min=format_calendar_datetime(self.start, self.tz, self.comma_style),
+            time_max=format_calendar_datetime(self.end, self.tz, self.comma_style),
+            timezone=self.timezone,
+            items=list(self.calendars),
+        )
+        return args
+
+
+def parse_free_slots_args(args: Optional[dict[str, Any]]) -> Optional[FreeBusyQuery]:
+    """Build a `FreeBusyQuery` from tool arguments, or None if they can't be parsed."""
+    if not args or not args.get("time_min") or not args.get("time_max"):
+        return None
+
+    timezone = args.get("timezone") or "UTC"
+    tz = get_timezone(timezone)
+    try:
+        start = parse_calendar_datetime(args["time_min"], tz)
+        end = parse_calendar_datetime(args["time_max"], tz)
+    except (TypeError, ValueError):
+        return None
+
+    items = args.get("items") or [DEFAULT_CALENDAR]
+    if isinstance(items, str):
+        items = [items]
+    calendars = tuple(
+        str(item.get("id") if isinstance(item, dict) else item) for item in items
+    )
+    return FreeBusyQuery(
+        calendars=calendars,
+        start=start,
+        end=max(start, end),
+        timezone=timezone,
+        comma_style="," in str(args["time_min"]),
+    )
+
+
+def _find_calendars(data: Any) -> Optional[dict[str, Any]]:
+    """Locate the freeBusy `calendars` object inside a Composio response."""
+    if isinstance(data, dict):
+        calendars = data.get("calendars")
+        if isinstance(calendars, dict):
+            return calendars
+        for value in data.values():
+            found = _find_calendars(value)
+            if found is not None:
+                return found
+    return None
+
+
+def parse_free_busy_response(
+    result: Any, tz: datetime.tzinfo = datetime.timezone.utc
+) -> Optional[dict[str, list[Interval]]]:
+    """Extract busy intervals per calendar from a tool result.
+
+    Returns None if the call failed, the payload is not recognized, or any
+    calendar reports an error, so that partial answers are never cached.
+    """
+    if not tool_result_succeeded(result):
+        return None
+    calendars = _find_calendars(parse_tool_result(result))
+    if calendars is None:
+        return None
+
+    busy: dict[str, list[Interval]] = {}
+    try:
+        for calendar, info in calendars.items():
+            if not isinstance(info, dict) or info.get("errors"):
+                return None
+            busy[calendar] = sorted(
+                (
+                    parse_calendar_datetime(b["start"], tz),
+                    parse_calendar_datetime(b["end"], tz),
+                )
+                for b in info.get("busy") or []
+            )
+    except (KeyError, TypeError, ValueError):
+        return None
+    return busy
+
+
+def clip_intervals(
+    intervals: list[Interval], start: datetime.datetime, end: datetime.datetime
+) -> list[Interval]:
+    """Clip sorted intervals to `[start, end)`, dropping those outside it."""
+    return [(max(s, start), min(e, end)) for s, e in intervals if e > start and s < end]
+
+
+def build_free_busy_response(
+    query: FreeBusyQuery, busy: dict[str, list[Interval]]
+) -> dict[str, Any]:
+    """Render busy intervals for `query` in the shape of a Composio response."""
+    tz = query.tz
+    return {
+        "successfull": True,
+        "error": None,
+        "data": {
+            "response_data": {
+                "kind": "calendar#freeBusy",
+                "timeMin": query.start.astimezone(tz).isoformat(),
+                "timeMax": query.end.astimezone(tz).isoformat(),
+                "calendars": {
+                    calendar: {
+                        "busy": [
+                            {
+                                "start": s.astimezone(tz).isoformat(),
+                                "end": e.astimezone(tz).isoformat(),
+                            }
+                            for s, e in clip_intervals(
+                                busy.get(calendar, []), query.start, query.end
+                            )
+                        ]
+                    }
+                    for calendar in query.calendars
+                },
+            }
+        },
+    }
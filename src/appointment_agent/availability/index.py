@@ -0,0 +1,327 @@
+"""In-memory interval index mirroring the clinic calendars.
+
+Each calendar is kept as a sorted list of merged busy intervals, refreshed in the
+background a few days at a time while lookups keep arriving, so free-slot and
+nearest-alternative questions are answered locally with a binary search instead
+of a Google Calendar round trip. Every day of every calendar records when it
+was last pulled; queries that touch a day older than the configured max age are
+reported as stale and the caller falls back to the live tool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import datetime
+import logging
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence
+
+from appointment_agent.availability.freebusy import (
+    FreeBusyQuery,
+    Interval,
+    clip_intervals,
+    parse_free_busy_response,
+)
+
+logger = logging.getLogger(__name__)
+
+_DAY = datetime.timedelta(days=1)
+
+# Fetches busy intervals per calendar for a query (None if the pull failed).
+FetchBusy = Callable[[FreeBusyQuery], Awaitable[Optional[dict[str, list[Interval]]]]]
+
+
+def _utc_day(value: datetime.datetime) -> datetime.date:
+    return value.astimezone(datetime.timezone.utc).date()
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=datetime.timezone.utc)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Sort intervals and merge the ones that overlap or touch."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class CalendarIndex:
+    """Busy intervals of a single calendar, merged and sorted by start."""
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self._starts: list[datetime.datetime] = []
+        self._ends: list[datetime.datetime] = []
+        self._synced: dict[datetime.date, float] = {}
+
+    def _intervals(self) -> list[Interval]:
+        return list(zip(self._starts, self._ends))
+
+    def _set(self, intervals: list[Interval]) -> None:
+        self._starts = [s for s, _ in intervals]
+        self._ends = [e for _, e in intervals]
+
+    def replace_window(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        busy: Iterable[Interval],
+        synced_at: Optional[float] = None,
+    ) -> None:
+        """Replace everything known about `[start, end)` with `busy`.
+
+        Whole UTC days inside the window are marked as synced at `synced_at`.
+        """
+        kept: list[Interval] = []
+        for s, e in self._intervals():
+            if e <= start or s >= end:
+                kept.append((s, e))
+                continue
+            # Keep the parts of an interval that stick out of the window.
+            if s < start:
+                kept.append((s, start))
+            if e > end:
+                kept.append((end, e))
+        self._set(merge_intervals([*kept, *clip_intervals(list(busy), start, end)]))
+
+        synced_at = time.monotonic() if synced_at is None else synced_at
+        day = _utc_day(start)
+        while _day_start(day) < end:
+            if _day_start(day) >= start and _day_start(day) + _DAY <= end:
+                self._synced[day] = synced_at
+            day += _DAY
+
+    def add_busy(self, start: datetime.datetime, end: datetime.datetime) -> None:
+        """Record a new busy interval, e.g. an event the agent just created."""
+        self._set(merge_intervals([*self._intervals(), (start, end)]))
+
+    def busy_between(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> list[Interval]:
+        """Return the busy intervals overlapping `[start, end)`, clipped to it."""
+        # Intervals are disjoint, so ends are sorted as well: skip every interval
+        # ending before `start`, then walk forward until one starts after `end`.
+        i = bisect.bisect_right(self._ends, start)
+        busy = []
+        while i < len(self._starts) and self._starts[i] < end:
+            busy.append((max(self._starts[i], start), min(self._ends[i], end)))
+            i += 1
+        return busy
+
+    def is_fresh(
+        self, start: datetime.datetime, end: datetime.datetime, max_age: float
+    ) -> bool:
+        """Check that every day touched by `[start, end)` was pulled recently."""
+        cutoff = time.monotonic() - max_age
+        day = _utc_day(start)
+        while _day_start(day) < max(end, start + datetime.timedelta(microseconds=1)):
+            if self._synced.get(day, float("-inf")) < cutoff:
+                return False
+            day += _DAY
+        return True
+
+    def stale_days(
+        self, first: datetime.date, days: int, max_age: float
+    ) -> list[datetime.date]:
+        """List the days in `[first, first + days)` that need to be pulled again."""
+        cutoff = time.monotonic() - max_age
+        candidates = (first + datetime.timedelta(days=i) for i in range(days))
+        return [d for d in candidates if self._synced.get(d, float("-inf")) < cutoff]
+
+
+class AvailabilityIndex:
+    """Interval indexes for a set of calendars plus their background sync."""
+
+    def __init__(self, max_age_seconds: float = 300.0) -> None:
+        """Create an empty index whose days go stale after `max_age_seconds`."""
+        self.max_age_seconds = max_age_seconds
+        self._calendars: dict[str, CalendarIndex] = {}
+        self._sync_task: Optional[asyncio.Task[None]] = None
+        self._sync_settings: Optional[tuple[tuple[str, ...], int, str]] = None
+        self._fetch: Optional[FetchBusy] = None
+        self._last_used = float("-inf")
+
+    def calendar(self, calendar: str) -> CalendarIndex:
+        """Get (or create) the index of one calendar."""
+        index = self._calendars.get(calendar)
+        if index is None:
+            index = self._calendars[calendar] = CalendarIndex()
+        return index
+
+    def load(self, query: FreeBusyQuery, busy: dict[str, list[Interval]]) -> None:
+        """Load a free/busy answer for `query` into the index."""
+        synced_at = time.monotonic()
+        for calendar, intervals in busy.items():
+            self.calendar(calendar).replace_window(
+                query.start, query.end, intervals, synced_at
+            )
+
+    def add_event(
+        self, calendars: Iterable[str], start: datetime.datetime, end: datetime.datetime
+    ) -> None:
+        """Mark `[start, end)` busy right away on every calendar of a new event."""
+        for calendar in calendars:
+            self.calendar(calendar).add_busy(start, end)
+
+    def lookup(self, query: FreeBusyQuery) -> Optional[dict[str, list[Interval]]]:
+        """Answer `query` locally, or return None if any calendar is stale."""
+        busy = {}
+        for calendar in query.calendars:
+            index = self._calendars.get(calendar)
+            if index is None or not index.is_fresh(
+                query.start, query.end, self.max_age_seconds
+            ):
+                return None
+            busy[calendar] = index.busy_between(query.start, query.end)
+        return busy
+
+    def free_between(
+        self,
+        calendars: Sequence[str],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        min_duration: datetime.timedelta = datetime.timedelta(0),
+    ) -> list[Interval]:
+        """Return the gaps in `[start, end)` where all `calendars` are free."""
+        busy = merge_intervals(
+            interval
+            for c in calendars
+            for interval in self.calendar(c).busy_between(start, end)
+        )
+        free, cursor = [], start
+        for s, e in [*busy, (end, end)]:
+            if s - cursor >= max(min_duration, datetime.timedelta(microseconds=1)):
+                free.append((cursor, s))
+            cursor = max(cursor, e)
+        return free
+
+    def nearest_free(
+        self,
+        calendars: Sequence[str],
+        at: datetime.datetime,
+        duration: datetime.timedelta,
+        horizon: datetime.timedelta = datetime.timedelta(days=3),
+    ) -> list[Interval]:
+        """Return the free gaps of at least `duration` near `at`, closest first.
+
+        Only gaps within `horizon` before or after `at` are considered.
+        """
+        gaps = self.free_between(calendars, at - horizon, at + horizon, duration)
+
+        def distance(gap: Interval) -> datetime.timedelta:
+            if gap[0] <= at < gap[1]:
+                return datetime.timedelta(0)
+            return min(abs(gap[0] - at), abs(gap[1] - at))
+
+        return sorted(gaps, key=distance)
+
+    async def sync(
+        self,
+        fetch: FetchBusy,
+        calendars: Sequence[str],
+        horizon_days: int,
+        timezone: str = "UTC",
+    ) -> None:
+        """Pull the stale days of the next `horizon_days` for `calendars`.
+
+        Stale days are pulled in contiguous runs, one free/busy call per run.
+        """
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        # Refresh a little before the data is considered stale by `lookup`.
+        refresh_age = self.max_age_seconds / 2
+        stale = sorted(
+            {
+                d
+                for c in calendars
+                for d in self.calendar(c).stale_days(today, horizon_days, refresh_age)
+            }
+        )
+
+        runs: list[list[datetime.date]] = []
+        for day in stale:
+            if runs and runs[-1][-1] + _DAY == day:
+                runs[-1].append(day)
+            else:
+                runs.append([day])
+
+        for run in runs:
+            query = FreeBusyQuery(
+                calendars=tuple(calendars),
+                start=_day_start(run[0]),
+                end=_day_start(run[-1]) + _DAY,
+                timezone=timezone,
+            )
+            busy = await fetch(query)
+            if busy is not None:
+                self.load(query, busy)
+
+    def ensure_sync(
+        self,
+        fetch: FetchBusy,
+        calendars: Sequence[str],
+        horizon_days: int,
+        timezone: str = "UTC",
+        idle_seconds: float = 900.0,
+    ) -> None:
+        """Keep the background sync loop running on the running event loop.
+
+        Call it on every lookup: the loop stops once no call has arrived for
+        `idle_seconds`, and is restarted when the calendars, horizon or timezone
+        change.
+        """
+        self._last_used = time.monotonic()
+        self._fetch = fetch
+        settings = (tuple(calendars), horizon_days, timezone)
+        if self._sync_task is not None and not self._sync_task.done():
+            if settings == self._sync_settings:
+                return
+            self._sync_task.cancel()
+        self._sync_settings = settings
+        self._sync_task = asyncio.get_running_loop().create_task(
+            self._sync_while_used(list(calendars), horizon_days, timezone, idle_seconds)
+        )
+
+    async def _sync_while_used(
+        self,
+        calendars: list[str],
+        horizon_days: int,
+        timezone: str,
+        idle_seconds: float,
+    ) -> None:
+        while time.monotonic() - self._last_used < idle_seconds:
+            assert self._fetch is not None
+            try:
+                await self.sync(self._fetch, calendars, horizon_days, timezone)
+            except Exception:
+                logger.warning("Availability index sync failed", exc_info=True)
+            await asyncio.sleep(max(self.max_age_seconds / 4, 1.0))
+
+
+_index: Optional[AvailabilityIndex] = None
+
+
+def get_availability_index(max_age_seconds: float) -> AvailabilityIndex:
+    """Get the process-wide availability index."""
+    global _index
+    if _index is None:
+        _index = AvailabilityIndex(max_age_seconds)
+    _index.max_age_seconds = max_age_seconds
+    return _index
+
+
+def busy_from_tool(tool: Any) -> FetchBusy:
+    """Adapt a `GOOGLECALENDAR_FIND_FREE_SLOTS` tool into a `FetchBusy` callable."""
+
+    async def fetch(query: FreeBusyQuery) -> Optional[dict[str, list[Interval]]]:
+        return parse_free_busy_response(await tool.ainvoke(query.to_args()), query.tz)
+
+    return fetch
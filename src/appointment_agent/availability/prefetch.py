@@ -0,0 +1,132 @@
+"""Speculative free/busy lookups started before the model asks for them.
+
+When the patient mentions a date or time, a free-slot lookup is nearly always
+the model's next action. The agent node therefore starts the lookup for the
+resolved days in the background while the model is still thinking, and
+registers it here under the thread id. When `find_slots` then runs a query the
+prefetch covers, it awaits the already-running lookup instead of starting a
+second one, hiding a calendar round trip from the caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from appointment_agent.availability.freebusy import (
+    FreeBusyQuery,
+    Interval,
+    clip_intervals,
+)
+
+logger = logging.getLogger(__name__)
+
+Busy = dict[str, list[Interval]]
+
+# Most prefetches kept per event loop; the oldest threads are dropped first.
+_MAX_PREFETCHES = 1000
+
+
+class AvailabilityPrefetch:
+    """A background free/busy lookup for one query."""
+
+    def __init__(
+        self, query: FreeBusyQuery, task: asyncio.Task[Optional[Busy]]
+    ) -> None:
+        """Wrap `task`, the running lookup of `query`."""
+        self.query = query
+        self.task = task
+        self.started_at = time.monotonic()
+        # Failures surface when the result is used; don't log them as unretrieved.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def covers(self, query: FreeBusyQuery) -> bool:
+        """Check whether this lookup answers `query`."""
+        return (
+            set(query.calendars) <= set(self.query.calendars)
+            and self.query.start <= query.start
+            and query.end <= self.query.end
+        )
+
+    async def busy_for(self, query: FreeBusyQuery) -> Optional[Busy]:
+        """Wait for the lookup and return the busy intervals of `query`; None if it failed."""
+        try:
+            # Shielded: a caller timing out must not cancel the shared lookup.
+            busy = await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if not self.task.cancelled():
+                raise
+            return None
+        except Exception:
+            logger.warning("Prefetched availability lookup failed", exc_info=True)
+            return None
+        if busy is None:
+            return None
+        return {
+            calendar: clip_intervals(busy.get(calendar, []), query.start, query.end)
+            for calendar in query.calendars
+        }
+
+
+_prefetches: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, OrderedDict[str, AvailabilityPrefetch]
+] = weakref.WeakKeyDictionary()
+_prefetches_lock = threading.Lock()
+
+
+def _loop_prefetches() -> OrderedDict[str, AvailabilityPrefetch]:
+    loop = asyncio.get_running_loop()
+    with _prefetches_lock:
+        prefetches = _prefetches.get(loop)
+        if prefetches is None:
+            prefetches = _prefetches[loop] = OrderedDict()
+        return prefetches
+
+
+def register_prefetch(thread_id: str, prefetch: AvailabilityPrefetch) -> None:
+    """Make `prefetch` the thread's current prefetch."""
+    prefetches = _loop_prefetches()
+    with _prefetches_lock:
+        prefetches[thread_id] = prefetch
+        prefetches.move_to_end(thread_id)
+        while len(prefetches) > _MAX_PREFETCHES:
+            prefetches.popitem(last=False)
+
+
+def get_prefetch(
+    thread_id: str, max_age_seconds: float
+) -> Optional[AvailabilityPrefetch]:
+    """Get the thread's prefetch if it was started less than `max_age_seconds` ago."""
+    prefetches = _loop_prefetches()
+    with _prefetches_lock:
+        prefetch = prefetches.get(thread_id)
+        if (
+            prefetch is not None
+            and time.monotonic() - prefetch.started_at > max_age_seconds
+        ):
+            del prefetches[thread_id]
+            return None
+        return prefetch
+
+
+def discard_prefetches(
+    calendars: Iterable[str], start: datetime.datetime, end: datetime.datetime
+) -> None:
+    """Drop the prefetches of `calendars` overlapping `[start, end)`, e.g. after a booking."""
+    calendars = set(calendars)
+    prefetches = _loop_prefetches()
+    with _prefetches_lock:
+        for thread_id, prefetch in list(prefetches.items()):
+            query = prefetch.query
+            if (
+                calendars & set(query.calendars)
+                and query.start < end
+                and start < query.end
+            ):
+                del prefetches[thread_id]
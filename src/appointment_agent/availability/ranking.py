@@ -0,0 +1,168 @@
+"""Deterministic ranking of appointment slots around a requested time.
+
+Instead of handing the model raw free/busy JSON and letting it work out close-by
+alternatives, `find_slots` turns the busy intervals into bookable slots (sized to
+the appointment length, inside clinic hours, on a fixed grid) and returns the
+few closest to what the patient asked for.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, Sequence
+
+from appointment_agent.availability.freebusy import Interval, get_timezone
+from appointment_agent.availability.index import merge_intervals
+from appointment_agent.configuration import Configuration
+
+
+@dataclass(frozen=True)
+class ClinicHours:
+    """When appointments can be booked."""
+
+    timezone: str = "UTC"
+    open_hour: int = 9
+    close_hour: int = 17
+    weekdays: tuple[int, ...] = (0, 1, 2, 3, 4)
+    """Open days, Monday being 0."""
+    step: datetime.timedelta = field(default=datetime.timedelta(minutes=30))
+    """Granularity of appointment start times."""
+
+    @property
+    def tz(self) -> datetime.tzinfo:
+        """The clinic's timezone."""
+        return get_timezone(self.timezone)
+
+    def day_start(self, value: datetime.datetime) -> datetime.datetime:
+        """Return midnight, in clinic time, of the day `value` falls on."""
+        local = value.astimezone(self.tz)
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def clinic_hours_from_config(configuration: Configuration) -> ClinicHours:
+    """Build the clinic hours from the agent configuration."""
+    return ClinicHours(
+        timezone=configuration.clinic_timezone,
+        open_hour=configuration.clinic_open_hour,
+        close_hour=configuration.clinic_close_hour,
+        weekdays=tuple(configuration.clinic_weekdays),
+    )
+
+
+class _BusyLookup:
+    """Overlap checks against merged busy intervals."""
+
+    def __init__(self, busy: Iterable[Interval]) -> None:
+        merged = merge_intervals(busy)
+        self._starts = [s for s, _ in merged]
+        self._ends = [e for _, e in merged]
+
+    def is_free(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        i = bisect.bisect_right(self._ends, start)
+        return i >= len(self._starts) or self._starts[i] >= end
+
+
+def _is_bookable(
+    start: datetime.datetime,
+    duration: datetime.timedelta,
+    hours: ClinicHours,
+    busy: _BusyLookup,
+) -> bool:
+    local = start.astimezone(hours.tz)
+    opens = local.replace(hour=hours.open_hour, minute=0, second=0, microsecond=0)
+    closes = local.replace(hour=hours.close_hour, minute=0, second=0, microsecond=0)
+    return (
+        local.weekday() in hours.weekdays
+        and opens <= local
+        and local + duration <= closes
+        and busy.is_free(start, start + duration)
+    )
+
+
+def candidate_slots(
+    window_start: datetime.datetime,
+    window_end: datetime.datetime,
+    busy: Iterable[Interval],
+    duration: datetime.timedelta,
+    hours: ClinicHours,
+) -> list[datetime.datetime]:
+    """List every bookable start time inside `[window_start, window_end)`."""
+    lookup = _BusyLookup(busy)
+    starts = []
+    day = hours.day_start(window_start)
+    while day < window_end:
+        if day.weekday() in hours.weekdays:
+            opens = day.replace(hour=hours.open_hour)
+            closes = day.replace(hour=hours.close_hour)
+            slot = opens
+            while slot < window_start:
+                slot += hours.step
+            while slot + duration <= min(closes, window_end):
+                if lookup.is_free(slot, slot + duration):
+                    starts.append(slot)
+                slot += hours.step
+        # Aware arithmetic is wall-clock time, so DST changes don't shift opening hours.
+        day += datetime.timedelta(days=1)
+    return starts
+
+
+def rank_slots(
+    requested: datetime.datetime,
+    window_start: datetime.datetime,
+    window_end: datetime.datetime,
+    busy: Sequence[Interval],
+    duration: datetime.timedelta,
+    hours: ClinicHours,
+    limit: int = 3,
+    now: Optional[datetime.datetime] = None,
+) -> list[Interval]:
+    """Return the `limit` bookable slots closest to `requested`, closest first.
+
+    The requested time itself comes first when it is bookable, even if it is
+    off the slot grid.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    window_start = max(window_start, now)
+    candidates = candidate_slots(window_start, window_end, busy, duration, hours)
+    if (
+        window_start <= requested
+        and requested + duration <= window_end
+        and requested not in candidates
+        and _is_bookable(requested, duration, hours, _BusyLookup(busy))
+    ):
+        candidates.append(requested)
+
+    best = heapq.nsmallest(limit, candidates, key=lambda s: (abs(s - requested), s))
+    return [(s, s + duration) for s in best]
+
+
+def summarize_ranked_slots(
+    requested: datetime.datetime,
+    slots: Sequence[Interval],
+    duration: datetime.timedelta,
+    hours: ClinicHours,
+) -> dict[str, Any]:
+    """Render ranked slots as the compact payload sent back to the model."""
+    tz = hours.tz
+
+    def label(value: datetime.datetime) -> str:
+        local = value.astimezone(tz)
+        return local.strftime("%A %d %B, %I:%M %p").replace(" 0", " ")
+
+    return {
+        "requested": requested.astimezone(tz).isoformat(),
+        "requested_available": bool(slots) and slots[0][0] == requested,
+        "duration_minutes": int(duration.total_seconds() // 60),
+        "timezone": hours.timezone,
+        "options": [
+            {
+                "start": start.astimezone(tz).isoformat(),
+                "end": end.astimezone(tz).isoformat(),
+                "label": label(start),
+            }
+            for start, end in slots
+        ],
+    }
@@ -0,0 +1,311 @@
+"""Resolve what a patient said about dates and times into a concrete window.
+
+The model turns "next Tuesday afternoon" into `time_min` / `time_max` itself,
+working from the date in its call context, and sometimes lands in the wrong
+week. `resolve_temporal_expression` resolves the same words deterministically,
+in the clinic's timezone, so the window can be shown to the model as a hint:
+
+- days: "today", "tonight", "tomorrow", "the day after tomorrow", "in 3 days",
+  weekdays ("Tuesday", "this Tuesday", "next Tuesday"), "next week", dates
+  ("January 30", "30th of January", "the 30th", "2025-01-30");
+- times: "3pm", "3:30 pm", "15:00", "at 3", "noon", "morning", "afternoon",
+  "evening", "after 2pm", "before 11".
+
+A bare weekday is the next one after today; "next <weekday>" is the one in next
+calendar week (weeks start on Monday). A bare hour from 1 to 7 is taken as pm.
+A time with no day is today if it is still ahead, else tomorrow. Text naming
+days that don't agree, negating one ("not tomorrow") or picking an offered
+option ("the 3rd one") resolves to nothing rather than to a guess.
+"""
+
+from __future__ import annotations
+
+import datetime
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+_MONTHS = [
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+]
+_MONTH = (
+    r"(?P<month>"
+    + "|".join(m[:3] + (m[3:] and f"(?:{m[3:]})?") for m in _MONTHS)
+    + r")\.?"
+)
+_DAY_OF_MONTH = r"(?P<day>[0-3]?\d)(?:st|nd|rd|th)?"
+
+# Parts of the day, as [start hour, end hour).
+_DAY_PARTS = {
+    "morning": (8, 12),
+    "afternoon": (12, 17),
+    "evening": (17, 21),
+    "tonight": (17, 21),
+}
+_SMALL_NUMBERS = {
+    "a": 1,
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+}
+
+_ISO_DATE = re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\b")
+_MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY_OF_MONTH}\b")
+_DAY_MONTH = re.compile(rf"\b{_DAY_OF_MONTH}\s+(?:of\s+)?{_MONTH}\b")
+_THE_DAY = re.compile(r"\bthe\s+(?P<day>[0-3]?\d)(?:st|nd|rd|th)\b")
+_RELATIVE_DAYS = re.compile(
+    r"\bin\s+(?P<count>\d+|a|one|two|three|four|five|six|seven)\s+(?P<unit>days?|weeks?)\b"
+)
+_WEEKDAY = re.compile(
+    r"\b(?:(?P<modifier>this|next|coming)\s+)?(?P<weekday>"
+    + "|".join(_WEEKDAYS)
+    + r")\b"
+)
+_NEXT_WEEK = re.compile(r"\bnext\s+week\b")
+_DAY_AFTER_TOMORROW = re.compile(r"\b(?:the\s+)?day\s+after\s+tomorrow\b")
+_TOMORROW = re.compile(r"\btomorrow\b")
+_TODAY = re.compile(r"\b(?:today|tonight)\b")
+
+# Words that make a mention unreliable: "not tomorrow, Friday?" or "the 3rd one".
+_NEGATION = re.compile(
+    r"\b(?:not|no|never|can'?t|cannot|won'?t|don'?t|doesn'?t|isn'?t)\b"
+)
+_OPTION_PICK = re.compile(
+    r"\b(?:first|second|third|fourth|fifth|last|\d(?:st|nd|rd|th))\s+(?:one|option|slot|time|choice)\b"
+)
+
+_BOUND = re.compile(r"\b(?P<bound>after|before|from|by)\s+(?=\d|noon|midday)")
+_CLOCK = re.compile(
+    r"(?:\bat\s+|\baround\s+|\b)(?P<hour>[01]?\d|2[0-3])(?::(?P<minute>[0-5]\d))?\s*"
+    r"(?P<meridiem>am|pm|a\.m\.|p\.m\.|o'?clock)?(?![\d:]|st\b|nd\b|rd\b|th\b)"
+)
+_NOON = re.compile(r"\b(?:noon|midday)\b")
+
+
+@dataclass(frozen=True)
+class TemporalWindow:
+    """A resolved window, in the timezone it was resolved in."""
+
+    start: datetime.datetime
+    end: datetime.datetime
+    exact_time: bool = False
+    """Whether a clock time was given, i.e. `start` is the time asked for."""
+
+
+def _month_number(name: str) -> int:
+    return next(i for i, month in enumerate(_MONTHS, 1) if month.startswith(name[:3]))
+
+
+def _upcoming(today: datetime.date, month: int, day: int) -> Optional[datetime.date]:
+    """Find the next `month`/`day` on or after today."""
+    for year in (today.year, today.year + 1):
+        try:
+            date = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if date >= today:
+            return date
+    return None
+
+
+def _resolve_days(
+    text: str, today: datetime.date
+) -> Optional[set[tuple[datetime.date, int]]]:
+    """Find the days (and the number of days each spans) mentioned in `text`.
+
+    A weekday naming the weekday of a date counts as the same mention. Returns
+    None if `text` names a date that doesn't exist.
+    """
+    mentions: list[tuple[datetime.date, int]] = []
+
+    def take(pattern: re.Pattern[str]) -> list[re.Match[str]]:
+        # Blank out what was matched so later patterns don't read it again.
+        nonlocal text
+        matches = list(pattern.finditer(text))
+        for match in matches:
+            text = (
+                text[: match.start()] + " " * len(match.group(0)) + text[match.end() :]
+            )
+        return matches
+
+    for match in take(_ISO_DATE):
+        try:
+            mentions.append(
+                (
+                    datetime.date(
+                        *(int(match.group(k)) for k in ("year", "month", "day"))
+                    ),
+                    1,
+                )
+            )
+        except ValueError:
+            return None
+    for pattern in (_MONTH_DAY, _DAY_MONTH):
+        for match in take(pattern):
+            date = _upcoming(
+                today, _month_number(match.group("month")), int(match.group("day"))
+            )
+            if date is None:
+                return None
+            mentions.append((date, 1))
+    for match in take(_THE_DAY):
+        day = int(match.group("day"))
+        month = today.month if day >= today.day else today.month % 12 + 1
+        date = _upcoming(today, month, day)
+        if date is None:
+            return None
+        mentions.append((date, 1))
+    dates = {date for date, _ in mentions}
+
+    mentions += [
+        (today + datetime.timedelta(days=2), 1) for _ in take(_DAY_AFTER_TOMORROW)
+    ]
+    mentions += [(today + datetime.timedelta(days=1), 1) for _ in take(_TOMORROW)]
+    mentions += [(today, 1) for _ in take(_TODAY)]
+    for match in take(_RELATIVE_DAYS):
+        count = match.group("count")
+        count = int(count) if count.isdigit() else _SMALL_NUMBERS[count]
+        days = count * (7 if match.group("unit").startswith("week") else 1)
+        mentions.append((today + datetime.timedelta(days=days), 1))
+    next_week = bool(take(_NEXT_WEEK))
+    for match in take(_WEEKDAY):
+        weekday = _WEEKDAYS.index(match.group("weekday"))
+        if any(date.weekday() == weekday for date in dates):
+            continue
+        if match.group("modifier") == "next" or next_week:
+            next_monday = today + datetime.timedelta(days=7 - today.weekday())
+            mentions.append((next_monday + datetime.timedelta(days=weekday), 1))
+            next_week = False
+        else:
+            mentions.append(
+                (
+                    today
+                    + datetime.timedelta(days=(weekday - today.weekday() - 1) % 7 + 1),
+                    1,
+                )
+            )
+    if next_week:
+        mentions.append((today + datetime.timedelta(days=7 - today.weekday()), 7))
+
+    return set(mentions)
+
+
+def _resolve_clock(text: str) -> Optional[tuple[datetime.time, Optional[str]]]:
+    """Find a clock time in `text`, with "after"/"before" if it bounds a range."""
+    bound = _BOUND.search(text)
+    rest = text[bound.end() :] if bound else text
+    if _NOON.match(rest) or (not bound and _NOON.search(text)):
+        return datetime.time(12), bound.group("bound") if bound else None
+    for match in _CLOCK.finditer(rest):
+        hour, minute, meridiem = (
+            int(match.group("hour")),
+            int(match.group("minute") or 0),
+            match.group("meridiem") or "",
+        )
+        # A bare number is only a time with "at"/"around", minutes or am/pm.
+        if not (
+            meridiem
+            or match.group("minute")
+            or match.group(0).lstrip().startswith(("at", "around"))
+            or bound
+        ):
+            continue
+        if meridiem.startswith("p") and hour < 12:
+            hour += 12
+        elif meridiem.startswith("a") and hour == 12:
+            hour = 0
+        elif not meridiem.startswith(("a", "p")) and 1 <= hour <= 7:
+            hour += 12
+        return datetime.time(hour, minute), bound.group("bound") if bound else None
+    return None
+
+
+def resolve_temporal_expression(
+    text: str, now: datetime.datetime, tz: datetime.tzinfo
+) -> Optional[TemporalWindow]:
+    """Resolve the date and time mentioned in `text`, relative to `now`.
+
+    Returns None if `text` mentions neither, or if the mention is not reliable:
+    several days that don't agree, a negation, or a pick among offered options.
+    """
+    text = re.sub(r"\s+", " ", text.lower().replace("’", "'"))
+    if _NEGATION.search(text) or _OPTION_PICK.search(text):
+        return None
+    local_now = now.astimezone(tz)
+    today = local_now.date()
+
+    mentions = _resolve_days(text, today)
+    if mentions is None or len(mentions) > 1:
+        return None
+    days = mentions.pop() if mentions else None
+    clock = _resolve_clock(text)
+    part = next(
+        (
+            hours
+            for name, hours in _DAY_PARTS.items()
+            if re.search(rf"\b{name}\b", text)
+        ),
+        None,
+    )
+    if days is None and clock is None and part is None:
+        return None
+
+    def at(date: datetime.date, time: datetime.time) -> datetime.datetime:
+        return datetime.datetime.combine(date, time, tzinfo=tz)
+
+    if days is None:
+        # A time of day alone: the next time it comes round.
+        time = clock[0] if clock else datetime.time(part[0])
+        date = (
+            today if at(today, time) > local_now else today + datetime.timedelta(days=1)
+        )
+        span = 1
+    else:
+        date, span = days
+
+    if clock is not None:
+        time, bound = clock
+        if bound in ("after", "from"):
+            return TemporalWindow(
+                at(date, time), at(date + datetime.timedelta(days=1), datetime.time())
+            )
+        if bound in ("before", "by"):
+            return TemporalWindow(
+                at(date, datetime.time(part[0] if part else 0)), at(date, time)
+            )
+        start = at(date, time)
+        return TemporalWindow(
+            start, start + datetime.timedelta(hours=1), exact_time=True
+        )
+    if part is not None:
+        return TemporalWindow(
+            at(date, datetime.time(part[0])), at(date, datetime.time(part[1]))
+        )
+    return TemporalWindow(
+        at(date, datetime.time()),
+        at(date + datetime.timedelta(days=span), datetime.time()),
+    )
@@ -0,0 +1,314 @@
+"""Ingest of Twilio call-status callbacks.
+
+Every confirmation call reports up to four status events (initiated, ringing,
+answered, completed) to `{APP_URL}/call-status`. The webhook only parses the
+event and appends it to an in-memory buffer; a background task flushes the
+buffer to a `CallStatusStore` in batches, so a campaign's callbacks cost a few
+store round trips per batch rather than per event and never hold up the
+langgraph-api workers.
+
+Stores keep one record per call (the time each status was first seen) plus
+running totals from which the answer rate and the average ring time are
+derived. Twilio retries callbacks, so events are applied idempotently: only the
+first occurrence of a status for a call counts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import email.utils
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Protocol, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which Twilio sends no further events for a call.
+TERMINAL_STATUSES = {"completed", "busy", "no-answer", "failed", "canceled"}
+
+_STATUS_FIELDS = {
+    "initiated": "initiated_at",
+    "ringing": "ringing_at",
+    "in-progress": "answered_at",
+    "answered": "answered_at",
+}
+
+
+@dataclass(frozen=True)
+class CallStatusEvent:
+    """One status callback."""
+
+    call_sid: str
+    status: str
+    timestamp: float
+    """Seconds since the epoch, from Twilio's `Timestamp` when present."""
+    duration: Optional[int] = None
+
+    @classmethod
+    def from_form(cls, form: Mapping[str, str]) -> Optional[CallStatusEvent]:
+        """Parse Twilio's form-encoded callback; None if it isn't a call-status event."""
+        call_sid, status = form.get("CallSid"), form.get("CallStatus")
+        if not call_sid or not status:
+            return None
+        timestamp = None
+        if form.get("Timestamp"):
+            try:
+                timestamp = email.utils.parsedate_to_datetime(
+                    form["Timestamp"]
+                ).timestamp()
+            except (TypeError, ValueError):
+                timestamp = None
+        if timestamp is None:
+            timestamp = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        duration = form.get("CallDuration")
+        return cls(
+            call_sid=call_sid,
+            status=status,
+            timestamp=timestamp,
+            duration=int(duration) if duration and duration.isdigit() else None,
+        )
+
+    @property
+    def field(self) -> str:
+        """Name of the per-call field this event sets."""
+        if self.status in TERMINAL_STATUSES:
+            return "finished_at"
+        return _STATUS_FIELDS.get(self.status, f"{self.status}_at")
+
+
+def _aggregates(totals: Mapping[str, float]) -> dict[str, Any]:
+    finished = totals.get("finished", 0)
+    rung = totals.get("ring_count", 0)
+    return {
+        "calls": int(totals.get("initiated", 0)),
+        "finished": int(finished),
+        "answered": int(totals.get("answered", 0)),
+        "answer_rate": totals.get("answered", 0) / finished if finished else None,
+        "average_ring_seconds": totals.get("ring_seconds", 0) / rung if rung else None,
+        "by_final_status": {
+            key.removeprefix("final:"): int(value)
+            for key, value in totals.items()
+            if key.startswith("final:")
+        },
+    }
+
+
+class CallStatusStore(Protocol):
+    """Storage interface implemented by every backend."""
+
+    async def apply(self, events: Sequence[CallStatusEvent]) -> None:
+        """Record a batch of events."""
+        ...
+
+    async def get_call(self, call_sid: str) -> Optional[dict[str, Any]]:
+        """Get the state of one call."""
+        ...
+
+    async def aggregates(self) -> dict[str, Any]:
+        """Answer rate, average ring time and counts by final status."""
+        ...
+
+
+class InMemoryCallStatusStore:
+    """Process-local store."""
+
+    def __init__(self) -> None:
+        """Create an empty store."""
+        self._calls: dict[str, dict[str, Any]] = {}
+        self._totals: dict[str, float] = {}
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        self._totals[key] = self._totals.get(key, 0) + amount
+
+    async def apply(self, events: Sequence[CallStatusEvent]) -> None:
+        """Record a batch of events."""
+        for event in events:
+            call = self._calls.setdefault(event.call_sid, {})
+            if event.field in call:
+                continue
+            call[event.field] = event.timestamp
+            if event.field == "finished_at" or "finished_at" not in call:
+                call["status"] = event.status
+            for name, value in _counters(event, call).items():
+                self._count(name, value)
+            if event.duration is not None:
+                call["duration"] = event.duration
+
+    async def get_call(self, call_sid: str) -> Optional[dict[str, Any]]:
+        """Get the state of one call."""
+        call = self._calls.get(call_sid)
+        return dict(call) if call is not None else None
+
+    async def aggregates(self) -> dict[str, Any]:
+        """Answer rate, average ring time and counts by final status."""
+        return _aggregates(self._totals)
+
+
+def _counters(event: CallStatusEvent, call: Mapping[str, Any]) -> dict[str, float]:
+    """Totals to bump the first time `event` is seen, given the call's recorded times."""
+    if event.field == "initiated_at":
+        return {"initiated": 1}
+    if event.field == "answered_at":
+        counters = {"answered": 1}
+        rang_at = call.get("ringing_at") or call.get("initiated_at")
+        if rang_at is not None:
+            counters.update(
+                ring_seconds=max(0.0, event.timestamp - float(rang_at)), ring_count=1
+            )
+        return counters
+    if event.field == "finished_at":
+        return {"finished": 1, f"final:{event.status}": 1}
+    return {}
+
+
+class RedisCallStatusStore:
+    """Store backed by Redis: a hash per call and a hash of running totals."""
+
+    def __init__(
+        self, url: str, prefix: str = "call-status", ttl_seconds: int = 7 * 24 * 3600
+    ) -> None:
+        """Connect to the Redis server at `url`; calls expire after `ttl_seconds`."""
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+        self._ttl_seconds = ttl_seconds
+
+    def _key(self, call_sid: str) -> str:
+        return f"{self._prefix}:call:{call_sid}"
+
+    async def apply(self, events: Sequence[CallStatusEvent]) -> None:
+        """Record a batch of events in three pipelined round trips."""
+        if not events:
+            return
+        # Round trip 1: claim each status field; only first occurrences count.
+        async with self._client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.hsetnx(self._key(event.call_sid), event.field, event.timestamp)
+            claimed = await pipe.execute()
+
+        fresh = [event for event, is_new in zip(events, claimed) if is_new]
+        if not fresh:
+            return
+        # Round trip 2 reads the times needed for the ring time; round trip 3
+        # updates the calls and the totals.
+        async with self._client.pipeline(transaction=False) as pipe:
+            for event in fresh:
+                pipe.hgetall(self._key(event.call_sid))
+            calls = await pipe.execute()
+
+        async with self._client.pipeline(transaction=False) as pipe:
+            for event, call in zip(fresh, calls):
+                key = self._key(event.call_sid)
+                fields = {}
+                # Callbacks can arrive out of order; a final status sticks.
+                if event.field == "finished_at" or "finished_at" not in call:
+                    fields["status"] = event.status
+                if event.duration is not None:
+                    fields["duration"] = str(event.duration)
+                if fields:
+                    pipe.hset(key, mapping=fields)
+                pipe.expire(key, self._ttl_seconds)
+                for name, value in _counters(event, call).items():
+                    pipe.hincrbyfloat(f"{self._prefix}:totals", name, value)
+            await pipe.execute()
+
+    async def get_call(self, call_sid: str) -> Optional[dict[str, Any]]:
+        """Get the state of one call."""
+        call = await self._client.hgetall(self._key(call_sid))
+        return call or None
+
+    async def aggregates(self) -> dict[str, Any]:
+        """Answer rate, average ring time and counts by final status."""
+        totals = await self._client.hgetall(f"{self._prefix}:totals")
+        return _aggregates({k: float(v) for k, v in totals.items()})
+
+
+class CallStatusIngest:
+    """Buffers events and writes them to a store in batches from a background task."""
+
+    def __init__(
+        self,
+        store: CallStatusStore,
+        max_batch: int = 500,
+        flush_interval_seconds: float = 0.2,
+        max_buffer: int = 100_000,
+    ) -> None:
+        """Write to `store` in batches of up to `max_batch` events."""
+        self.store = store
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval_seconds
+        self._max_buffer = max_buffer
+        self._buffer: list[CallStatusEvent] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def submit(self, event: CallStatusEvent) -> None:
+        """Queue an event for the next batch (never waits on the store)."""
+        if len(self._buffer) >= self._max_buffer:
+            logger.warning(
+                "Call-status buffer full; dropping event for %s", event.call_sid
+            )
+            return
+        self._buffer.append(event)
+        self._ensure_started()
+        if len(self._buffer) >= self._max_batch and self._wake is not None:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far."""
+        while self._buffer:
+            batch, self._buffer = (
+                self._buffer[: self._max_batch],
+                self._buffer[self._max_batch :],
+            )
+            try:
+                await self.store.apply(batch)
+            except Exception:
+                logger.warning(
+                    "Could not store %d call-status events", len(batch), exc_info=True
+                )
+                # Put the batch back and retry on the next tick.
+                self._buffer[:0] = batch
+                return
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._flush_forever())
+
+    async def _flush_forever(self) -> None:
+        assert self._wake is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+
+_ingest: Optional[CallStatusIngest] = None
+_ingest_lock = threading.Lock()
+
+
+def get_call_status_ingest() -> CallStatusIngest:
+    """Get the process-wide ingest, storing to `CALL_STATUS_STORE` ("memory" or "redis").
+
+    The Redis backend connects to `REDIS_URI` (default `redis://localhost:6379`).
+    """
+    global _ingest
+    with _ingest_lock:
+        if _ingest is None:
+            store: CallStatusStore
+            if os.getenv("CALL_STATUS_STORE", "memory") == "redis":
+                store = RedisCallStatusStore(
+                    os.getenv("REDIS_URI", "redis://localhost:6379")
+                )
+            else:
+                store = InMemoryCallStatusStore()
+            _ingest = CallStatusIngest(store)
+        return _ingest
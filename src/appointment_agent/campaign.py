@@ -0,0 +1,240 @@
+"""Next-day confirmation-call campaign.
+
+Reads a day's appointments from the clinic calendar, keeps one call per patient
+phone number, and places the confirmation calls through the outbound dialer
+with bounded concurrency; no model is involved. Progress is appended to a JSON
+lines file, and every patient is marked *before* being dialed, so re-running the
+campaign after a crash only calls patients who were never dialed (and retries
+those whose call could not be placed).
+
+Run it with:
+
+    python -m appointment_agent.campaign --progress campaign-2025-01-31.jsonl
+
+Phone numbers are read from the `Phone:` line that `book_appointment` writes
+into the event description.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from appointment_agent.availability.freebusy import DEFAULT_CALENDAR, get_timezone
+from appointment_agent.configuration import Configuration
+from appointment_agent.utils import normalize_phone_number, parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+FIND_EVENT = "GOOGLECALENDAR_FIND_EVENT"
+
+_PHONE = re.compile(r"Phone:\s*(\+?[\d\s().-]{7,})")
+
+
+@dataclass(frozen=True)
+class CampaignCall:
+    """One confirmation call of the campaign."""
+
+    phone_number: str
+    start: datetime.datetime
+    patient_name: str = ""
+
+    def instructions(self, tz: datetime.tzinfo) -> str:
+        """Render the appointment time read out in the call, in `tz`."""
+        local = self.start.astimezone(tz)
+        when = local.strftime("%A %d %B at %I:%M %p").replace(" 0", " ")
+        return f"Your appointment is on {when}."
+
+
+def _events(result: Any) -> list[dict[str, Any]]:
+    """Find the list of events in a `GOOGLECALENDAR_FIND_EVENT` result."""
+    data = parse_tool_result(result)
+    stack: list[Any] = [data]
+    while stack:
+        value = stack.pop()
+        if (
+            isinstance(value, list)
+            and value
+            and all(isinstance(v, dict) for v in value)
+        ):
+            if any("start" in v for v in value):
+                return value
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+    return []
+
+
+def _event_start(
+    event: dict[str, Any], tz: datetime.tzinfo
+) -> Optional[datetime.datetime]:
+    start = event.get("start") or {}
+    value = start.get("dateTime") if isinstance(start, dict) else start
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=tz)
+
+
+def plan_calls(
+    events: Iterable[dict[str, Any]], tz: datetime.tzinfo
+) -> list[CampaignCall]:
+    """Turn calendar events into calls: one per phone number, for its earliest appointment."""
+    calls: dict[str, CampaignCall] = {}
+    for event in events:
+        if event.get("status") == "cancelled":
+            continue
+        match = _PHONE.search(event.get("description") or "")
+        start = _event_start(event, tz)
+        if match is None or start is None:
+            continue
+        phone_number = normalize_phone_number(match.group(1))
+        name = str(event.get("summary") or "").removeprefix("Appointment: ")
+        current = calls.get(phone_number)
+        if current is None or start < current.start:
+            calls[phone_number] = CampaignCall(phone_number, start, name)
+    return sorted(calls.values(), key=lambda call: call.start)
+
+
+class CampaignProgress:
+    """Append-only progress log of a campaign."""
+
+    def __init__(self, path: Path) -> None:
+        """Load the progress already recorded at `path`, if any."""
+        self.path = path
+        self.status: dict[str, str] = {}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A torn last line from a crash.
+                self.status[entry["phone_number"]] = entry["status"]
+
+    def should_call(self, phone_number: str) -> bool:
+        """Skip anyone already called or possibly being called when the campaign stopped."""
+        return self.status.get(phone_number) in (None, "failed")
+
+    def mark(self, phone_number: str, status: str, **details: Any) -> None:
+        """Record a status durably before moving on."""
+        self.status[phone_number] = status
+        with self.path.open("a") as f:
+            f.write(
+                json.dumps({"phone_number": phone_number, "status": status, **details})
+                + "\n"
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+
+async def fetch_appointments(
+    day: datetime.date, tz: datetime.tzinfo, calendar_id: str = DEFAULT_CALENDAR
+) -> list[dict[str, Any]]:
+    """Read the events of `day` (in `tz`) from the calendar."""
+    from appointment_agent.nodes._tools import load_tools
+
+    (find_event,) = load_tools([FIND_EVENT])
+    start = datetime.datetime.combine(day, datetime.time(), tzinfo=tz)
+    end = start + datetime.timedelta(days=1)
+    result = await find_event.ainvoke(
+        {
+            "calendar_id": calendar_id,
+            "timeMin": start.isoformat(),
+            "timeMax": end.isoformat(),
+            "single_events": True,
+            "order_by": "startTime",
+            "max_results": 2500,
+        }
+    )
+    return _events(result)
+
+
+async def run_campaign(
+    calls: list[CampaignCall],
+    progress: CampaignProgress,
+    tz: datetime.tzinfo,
+    concurrency: int = 20,
+    clinic_name: Optional[str] = None,
+    language: str = "en",
+) -> dict[str, int]:
+    """Place the campaign's calls, at most `concurrency` at a time."""
+    from appointment_agent.dialer import get_dialer
+
+    dialer = get_dialer()
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"called": 0, "failed": 0, "skipped": 0}
+
+    async def dial(call: CampaignCall) -> None:
+        if not progress.should_call(call.phone_number):
+            counts["skipped"] += 1
+            return
+        async with semaphore:
+            progress.mark(call.phone_number, "dialing", start=call.start.isoformat())
+            result = await dialer.call(
+                call.phone_number,
+                call.instructions(tz),
+                clinic_name=clinic_name,
+                language=language,
+            )
+            if result.get("status") == "success":
+                counts["called"] += 1
+                progress.mark(
+                    call.phone_number, "done", call_sid=result.get("call_sid")
+                )
+            else:
+                counts["failed"] += 1
+                progress.mark(call.phone_number, "failed", error=result.get("message"))
+
+    await asyncio.gather(*(dial(call) for call in calls))
+    return counts
+
+
+async def main(argv: Optional[list[str]] = None) -> dict[str, int]:
+    """Run the campaign for one day from the command line and return its counts."""
+    parser = argparse.ArgumentParser(description="Call every patient booked for a day.")
+    parser.add_argument(
+        "--date", help="Day to confirm (YYYY-MM-DD); tomorrow by default."
+    )
+    parser.add_argument("--timezone", default=os.getenv("CLINIC_TIMEZONE", "UTC"))
+    parser.add_argument("--calendar-id", default=DEFAULT_CALENDAR)
+    parser.add_argument("--clinic-name", default=Configuration.clinic_name)
+    parser.add_argument(
+        "--language", default="en", help="Language of the confirmation message."
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--progress", required=True, help="Progress file, reused to resume."
+    )
+    args = parser.parse_args(argv)
+
+    tz = get_timezone(args.timezone)
+    day = (
+        datetime.date.fromisoformat(args.date)
+        if args.date
+        else datetime.datetime.now(tz).date() + datetime.timedelta(days=1)
+    )
+    calls = plan_calls(await fetch_appointments(day, tz, args.calendar_id), tz)
+    logger.info("Confirming %d patients booked on %s", len(calls), day)
+    counts = await run_campaign(
+        calls,
+        CampaignProgress(Path(args.progress)),
+        tz,
+        args.concurrency,
+        clinic_name=args.clinic_name,
+        language=args.language,
+    )
+    logger.info("Campaign finished: %s", counts)
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Optional
+from typing import Literal, Optional
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
@@ -22,6 +22,245 @@ class Configuration:
         },
     )
 
+    clinic_name: str = field(
+        default="Dental Clinic",
+        metadata={
+            "description": "The clinic the agent is answering for. Sent in the per-call context, "
+            "after the cacheable system prompt."
+        },
+    )
+
+    user_id: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "Identifier of the caller (e.g. their phone number), if known."
+        },
+    )
+
+    prompt_cache: Literal["implicit", "gemini"] = field(
+        default="implicit",
+        metadata={
+            "description": "How the static system prompt is cached. 'implicit' keeps it byte-stable "
+            "so provider prefix caching can hit; 'gemini' also registers it (with the tool schemas) "
+            "as a Gemini context cache."
+        },
+    )
+
+    prompt_cache_ttl_seconds: int = field(
+        default=3600,
+        metadata={
+            "description": "Lifetime of the Gemini context cache created when prompt_cache is 'gemini'."
+        },
+    )
+
+    find_slots_timeout_seconds: float = field(
+        default=15.0,
+        metadata={
+            "description": "Maximum time to wait for a single free-slot lookup before "
+            "returning an error to the model."
+        },
+    )
+
+    availability_cache: Literal["off", "memory", "redis"] = field(
+        default="memory",
+        metadata={
+            "description": "Where free/busy results are cached: 'memory' (per process), "
+            "'redis' (shared via REDIS_URI) or 'off'."
+        },
+    )
+
+    availability_cache_ttl_seconds: int = field(
+        default=60,
+        metadata={"description": "How long cached free/busy results are reused."},
+    )
+
+    availability_index: bool = field(
+        default=False,
+        metadata={
+            "description": "Mirror the clinic calendars into an in-memory interval index and "
+            "answer free-slot queries from it while it is fresh."
+        },
+    )
+
+    availability_index_calendars: list[str] = field(
+        default_factory=lambda: ["primary"],
+        metadata={"description": "Calendars kept in sync by the availability index."},
+    )
+
+    availability_index_horizon_days: int = field(
+        default=14,
+        metadata={
+            "description": "How many days ahead the availability index keeps in sync."
+        },
+    )
+
+    availability_index_max_age_seconds: float = field(
+        default=300.0,
+        metadata={
+            "description": "Age after which indexed days are stale and queries fall back "
+            "to the live calendar."
+        },
+    )
+
+    availability_index_idle_seconds: float = field(
+        default=900.0,
+        metadata={
+            "description": "The availability index stops syncing once no free-slot lookup has "
+            "arrived for this long; the next lookup starts it again."
+        },
+    )
+
+    rank_slots: bool = field(
+        default=True,
+        metadata={
+            "description": "Answer free-slot lookups with a short ranked list of bookable slots "
+            "closest to the requested time instead of the raw free/busy payload."
+        },
+    )
+
+    slot_suggestions: int = field(
+        default=3,
+        metadata={
+            "description": "How many ranked slots to return for each free-slot lookup."
+        },
+    )
+
+    appointment_duration_minutes: int = field(
+        default=60,
+        metadata={
+            "description": "Length of an appointment, used to size the ranked slots."
+        },
+    )
+
+    clinic_timezone: str = field(
+        default="UTC",
+        metadata={"description": "IANA timezone of the clinic's opening hours."},
+    )
+
+    clinic_open_hour: int = field(
+        default=9,
+        metadata={
+            "description": "Hour (clinic time) of the first appointment of the day."
+        },
+    )
+
+    clinic_close_hour: int = field(
+        default=17,
+        metadata={
+            "description": "Hour (clinic time) by which the last appointment must end."
+        },
+    )
+
+    clinic_weekdays: list[int] = field(
+        default_factory=lambda: [0, 1, 2, 3, 4],
+        metadata={"description": "Days the clinic is open, Monday being 0."},
+    )
+
+    idempotency_store: Literal["off", "memory", "redis"] = field(
+        default="memory",
+        metadata={
+            "description": "Where booking idempotency keys are kept: 'memory' (per process), "
+            "'redis' (shared via REDIS_URI) or 'off'."
+        },
+    )
+
+    idempotency_window_seconds: int = field(
+        default=900,
+        metadata={
+            "description": "How long a repeated create-event call for the same thread, attendees "
+            "and time returns the earlier result instead of booking again."
+        },
+    )
+
+    background_jobs: Literal["off", "memory", "redis"] = field(
+        default="memory",
+        metadata={
+            "description": "Where confirmation emails and calls are queued to run in the "
+            "background: 'memory' (per process), 'redis' (durable, via REDIS_URI) or 'off' "
+            "to run them inline."
+        },
+    )
+
+    background_job_workers: int = field(
+        default=4,
+        metadata={
+            "description": "How many background jobs run concurrently in each process."
+        },
+    )
+
+    background_job_max_attempts: int = field(
+        default=3,
+        metadata={
+            "description": "How many times a failing background job is tried before giving up."
+        },
+    )
+
+    payload_store: Literal["off", "memory", "redis"] = field(
+        default="memory",
+        metadata={
+            "description": "Where raw tool payloads are kept when their results are compacted: "
+            "'memory' (per process), 'redis' (shared via REDIS_URI) or 'off' to keep raw "
+            "results in the conversation."
+        },
+    )
+
+    payload_ttl_seconds: int = field(
+        default=24 * 3600,
+        metadata={
+            "description": "How long raw tool payloads can be fetched after the call."
+        },
+    )
+
+    tool_result_max_chars: int = field(
+        default=600,
+        metadata={
+            "description": "Tool results longer than this are replaced by a compact summary "
+            "and a reference to the stored payload."
+        },
+    )
+
+    summarize_after_tokens: int = field(
+        default=6000,
+        metadata={
+            "description": "Once the conversation exceeds this many tokens, older turns are "
+            "folded into a running summary. 0 disables summarization."
+        },
+    )
+
+    summary_keep_tokens: int = field(
+        default=2000,
+        metadata={
+            "description": "Approximate number of tokens of recent turns kept verbatim when "
+            "older turns are summarized."
+        },
+    )
+
+    resolve_dates: bool = field(
+        default=True,
+        metadata={
+            "description": 'Resolve dates and times the patient mentions ("next Tuesday '
+            'afternoon") into a window in the clinic timezone, shown to the model and returned '
+            "as a hint with free-slot lookups that miss it."
+        },
+    )
+
+    prefetch_availability: bool = field(
+        default=True,
+        metadata={
+            "description": "When the patient mentions a date or time, start the free/busy lookup "
+            "for it while the model is still generating, and answer the model's free-slot "
+            "lookup from it."
+        },
+    )
+
+    fast_path: bool = field(
+        default=True,
+        metadata={
+            "description": "Answer farewells, and slot picks or confirmations of an offered slot, "
+            "by rule without calling the model when the outcome is unambiguous."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -0,0 +1,314 @@
+"""Rate-limited dispatcher for outbound calls.
+
+Twilio limits how many calls an account may start per second (CPS); placing
+calls as soon as they are requested makes bursts of bookings fail together.
+Every outbound call goes through an `OutboundDialer` instead: requests wait in
+a priority queue (urgent callbacks before routine confirmations) and leave it
+through a token bucket sized to the account's CPS. A throttling response pauses
+the bucket with exponential backoff plus jitter and puts the request back in
+line.
+
+Set `TWILIO_CALLS_PER_SECOND` (default 1) and `TWILIO_CALLS_BURST` (default 1)
+to match the account's limits. The limit is per account, so with more than one
+langgraph-api worker set `TWILIO_RATE_LIMIT_STORE=redis` to share the bucket
+through Redis (`REDIS_URI`); the default `memory` bucket only limits its own
+process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from appointment_agent.kv import KeyValueStore, get_key_value_store
+
+logger = logging.getLogger(__name__)
+
+# Places one call (phone number, instructions and any extra keyword arguments
+# given to `submit`) and returns the tool-style result dict.
+PlaceCall = Callable[..., Awaitable[dict[str, Any]]]
+
+# Twilio answers 429 with error code 20429 when the account exceeds its CPS.
+_THROTTLED_STATUS = 429
+_THROTTLED_CODE = 20429
+
+
+class Priority(enum.IntEnum):
+    """Dispatch priority; lower values are dialed first."""
+
+    URGENT = 0
+    ROUTINE = 10
+
+
+def is_throttled(result: dict[str, Any]) -> bool:
+    """Check whether a call result reports that Twilio rate limited the request."""
+    return (
+        result.get("http_status") == _THROTTLED_STATUS
+        or result.get("error_code") == _THROTTLED_CODE
+    )
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Create a full bucket."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    async def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for a token and take it."""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SharedTokenBucket:
+    """Rate limit shared by every process through a `KeyValueStore`.
+
+    Time is cut into windows of `burst / rate` seconds, each with `burst`
+    tokens; a token is taken by claiming its key. Pauses are shared too.
+    """
+
+    def __init__(
+        self, store: KeyValueStore, rate: float, burst: int = 1, prefix: str = "dialer"
+    ) -> None:
+        """Share the bucket through `store`, under keys starting with `prefix`."""
+        self.rate = rate
+        self.burst = burst
+        self._store = store
+        self._prefix = prefix
+
+    async def pause(self, seconds: float) -> None:
+        """Hand out no tokens, in any process, for the next `seconds`."""
+        key = f"{self._prefix}:paused_until"
+        until = time.time() + seconds
+        (current,) = await self._store.get_many([key])
+        if current is None or float(current) < until:
+            await self._store.set_many({key: str(until)}, seconds)
+
+    async def acquire(self) -> None:
+        """Wait for a token and take it."""
+        window = self.burst / self.rate
+        while True:
+            now = time.time()
+            (paused_until,) = await self._store.get_many(
+                [f"{self._prefix}:paused_until"]
+            )
+            if paused_until is not None and float(paused_until) > now:
+                await asyncio.sleep(float(paused_until) - now)
+                continue
+            index = int(now // window)
+            for token in range(self.burst):
+                if await self._store.set_if_absent(
+                    f"{self._prefix}:{index}:{token}", "1", 2 * window
+                ):
+                    return
+            await asyncio.sleep((index + 1) * window - now)
+
+
+@dataclass(order=True)
+class CallRequest:
+    """A queued outbound call."""
+
+    priority: int
+    seq: int
+    phone_number: str = field(compare=False)
+    instructions: Optional[str] = field(compare=False, default=None)
+    call_args: dict[str, Any] = field(compare=False, default_factory=dict)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+    attempt: int = field(compare=False, default=0)
+    future: Optional[asyncio.Future[dict[str, Any]]] = field(
+        compare=False, default=None
+    )
+
+
+class OutboundDialer:
+    """Priority queue of outbound calls drained through a token bucket."""
+
+    def __init__(
+        self,
+        place_call: PlaceCall,
+        calls_per_second: float = 1.0,
+        burst: int = 1,
+        max_attempts: int = 5,
+        base_backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 60.0,
+        max_in_flight: int = 50,
+        bucket: Optional[TokenBucket | SharedTokenBucket] = None,
+    ) -> None:
+        """Dial through `place_call`, limited by `bucket` or a `TokenBucket` of the given rate."""
+        self._place_call = place_call
+        self._bucket = bucket or TokenBucket(calls_per_second, burst)
+        self._max_attempts = max_attempts
+        self._base_backoff = base_backoff_seconds
+        self._max_backoff = max_backoff_seconds
+        self._queue: asyncio.PriorityQueue[CallRequest] = asyncio.PriorityQueue()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._calls: set[asyncio.Task[None]] = set()
+        self._latencies: deque[float] = deque(maxlen=1000)
+        self._counts = {"dispatched": 0, "succeeded": 0, "failed": 0, "throttled": 0}
+
+    def submit(
+        self,
+        phone_number: str,
+        instructions: Optional[str] = None,
+        priority: Priority = Priority.ROUTINE,
+        **call_args: Any,
+    ) -> asyncio.Future[dict[str, Any]]:
+        """Queue a call; the returned future resolves to the call result.
+
+        `call_args` (e.g. `clinic_name`, `language`) are passed on to `place_call`.
+        """
+        request = CallRequest(
+            priority=int(priority),
+            seq=next(self._seq),
+            phone_number=phone_number,
+            instructions=instructions,
+            call_args=call_args,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._queue.put_nowait(request)
+        self._ensure_started()
+        assert request.future is not None
+        return request.future
+
+    async def call(
+        self,
+        phone_number: str,
+        instructions: Optional[str] = None,
+        priority: Priority = Priority.ROUTINE,
+        **call_args: Any,
+    ) -> dict[str, Any]:
+        """Queue a call and wait for its result."""
+        return await self.submit(phone_number, instructions, priority, **call_args)
+
+    def metrics(self) -> dict[str, Any]:
+        """Queue depth, counters and dispatch latency (time from request to dial)."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "in_flight": len(self._calls),
+            **self._counts,
+            "dispatch_latency_p50_seconds": percentile(0.5),
+            "dispatch_latency_p95_seconds": percentile(0.95),
+            "dispatch_latency_max_seconds": latencies[-1] if latencies else None,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._dispatch_forever()
+            )
+
+    async def _dispatch_forever(self) -> None:
+        while True:
+            request = await self._queue.get()
+            await self._in_flight.acquire()
+            await self._bucket.acquire()
+            if request.attempt == 0:
+                self._latencies.append(time.monotonic() - request.enqueued_at)
+            self._counts["dispatched"] += 1
+            task = asyncio.get_running_loop().create_task(self._dial(request))
+            self._calls.add(task)
+            task.add_done_callback(self._calls.discard)
+
+    async def _dial(self, request: CallRequest) -> None:
+        assert request.future is not None
+        try:
+            try:
+                result = await self._place_call(
+                    request.phone_number, request.instructions, **request.call_args
+                )
+            except Exception as e:
+                result = {"status": "error", "message": repr(e)}
+        finally:
+            self._in_flight.release()
+
+        if is_throttled(result) and request.attempt + 1 < self._max_attempts:
+            self._counts["throttled"] += 1
+            backoff = min(self._max_backoff, self._base_backoff * 2**request.attempt)
+            # The limit is per account, so slow every call down, not just this one.
+            await self._bucket.pause(random.uniform(backoff / 2, backoff))
+            request.attempt += 1
+            logger.info(
+                "Twilio throttled a call to %s; retry %d",
+                request.phone_number,
+                request.attempt,
+            )
+            self._queue.put_nowait(request)
+            return
+
+        self._counts[
+            "succeeded" if result.get("status") == "success" else "failed"
+        ] += 1
+        if not request.future.done():
+            request.future.set_result(result)
+
+
+_dialers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OutboundDialer] = (
+    weakref.WeakKeyDictionary()
+)
+_dialers_lock = threading.Lock()
+
+
+def get_dialer() -> OutboundDialer:
+    """Get the dialer of the running event loop, placing calls through Twilio."""
+    from appointment_agent.tools.make_confirmation_call import aplace_confirmation_call
+
+    loop = asyncio.get_running_loop()
+    with _dialers_lock:
+        dialer = _dialers.get(loop)
+        if dialer is None:
+            rate = float(os.getenv("TWILIO_CALLS_PER_SECOND", "1"))
+            burst = int(os.getenv("TWILIO_CALLS_BURST", "1"))
+            store = (
+                get_key_value_store("redis")
+                if os.getenv("TWILIO_RATE_LIMIT_STORE", "memory") == "redis"
+                else None
+            )
+            dialer = _dialers[loop] = OutboundDialer(
+                aplace_confirmation_call,
+                calls_per_second=rate,
+                burst=burst,
+                bucket=SharedTokenBucket(store, rate, burst)
+                if store is not None
+                else None,
+            )
+        return dialer
@@ -1,38 +1,110 @@
 """This module defines the state graph for the react agent."""
-from typing import Literal
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal, Union
+
+from langchain_core.messages import HumanMessage
 from langgraph.graph import END, START, StateGraph
-from langgraph.prebuilt import tools_condition
+from langgraph.graph.state import CompiledStateGraph
 
 from appointment_agent.configuration import Configuration
+from appointment_agent.nodes import (
+    book_appointment,
+    extract_facts,
+    fast_path,
+    find_slots,
+    generate_response,
+    schedule_tools_write_node,
+    summarize_conversation,
+)
+from appointment_agent.nodes._tools import FIND_FREE_SLOTS
 from appointment_agent.state import AppointmentAgentState
-from appointment_agent.nodes import generate_response, find_slots, schedule_tools_write_node
+from appointment_agent.tools.book_appointment import BOOK_APPOINTMENT
 
-async def tools_condition(state: AppointmentAgentState) -> Literal["find_slots",  "tools", "__end__"]:
-    """
-    Determine if the conversation should continue to tools or end
+ToolDestination = Literal["find_slots", "book_appointment", "tools"]
+
+
+async def tools_condition(
+    state: AppointmentAgentState,
+) -> Union[list[ToolDestination], Literal["__end__"]]:
+    """Determine which tool nodes should run, or whether the conversation should end.
+
+    Free-slot lookups go to `find_slots`, bookings to `book_appointment` and
+    every other tool call goes to `tools`. When a message mixes them, the nodes
+    run in parallel in the same step and all feed back into `agent`.
     """
     messages = state["messages"]
     last_message = messages[-1]
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-      for call in last_message.tool_calls:
-          tool_name = call.get("name")
-          if tool_name == "GOOGLECALENDAR_FIND_FREE_SLOTS":
-            return "find_slots"
-      return "tools"
+    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+        names = {call.get("name") for call in last_message.tool_calls}
+        destinations: list[ToolDestination] = []
+        if FIND_FREE_SLOTS in names:
+            destinations.append("find_slots")
+        if BOOK_APPOINTMENT in names:
+            destinations.append("book_appointment")
+        if names - {FIND_FREE_SLOTS, BOOK_APPOINTMENT}:
+            destinations.append("tools")
+        return destinations
     return "__end__"
 
+
+async def fast_path_condition(
+    state: AppointmentAgentState,
+) -> Union[list[ToolDestination], Literal["summarize", "__end__"]]:
+    """Route a patient turn after `fast_path`.
+
+    The turn goes to the agent (through `summarize`) unless the fast path
+    already answered it with a reply or a tool call.
+    """
+    if isinstance(state["messages"][-1], HumanMessage):
+        return "summarize"
+    return await tools_condition(state)
+
+
 builder = StateGraph(AppointmentAgentState, config_schema=Configuration)
 
+# Patient turns go through `extract_facts`, which records contact details in
+# `facts`, then `fast_path`, which answers trivial turns without the model.
+builder.add_node("extract_facts", extract_facts)
+builder.add_node("fast_path", fast_path)
+# Every turn of the agent goes through `summarize` first, which folds older
+# turns into a running summary once the conversation gets long.
+builder.add_node("summarize", summarize_conversation)
 builder.add_node("agent", generate_response)
 builder.add_node("find_slots", find_slots)
 builder.add_node("tools", schedule_tools_write_node)
+builder.add_node("book_appointment", book_appointment)
 
-builder.add_edge(START, "agent")
-builder.add_conditional_edges("agent", tools_condition, ["tools", "find_slots", END])
-builder.add_edge("tools", "agent")
-builder.add_edge("find_slots", "agent")
+builder.add_edge(START, "extract_facts")
+builder.add_edge("extract_facts", "fast_path")
+builder.add_conditional_edges(
+    "fast_path",
+    fast_path_condition,
+    ["summarize", "tools", "find_slots", "book_appointment", END],
+)
+builder.add_edge("summarize", "agent")
+builder.add_conditional_edges(
+    "agent", tools_condition, ["tools", "find_slots", "book_appointment", END]
+)
+builder.add_edge("tools", "summarize")
+builder.add_edge("find_slots", "summarize")
+builder.add_edge("book_appointment", "summarize")
 
 appointment_agent_graph = builder.compile()
 
 appointment_agent_graph.name = "appointment_agent_graph"
+
+
+@asynccontextmanager
+async def checkpointed_graph(conn_string: str) -> AsyncIterator[CompiledStateGraph]:
+    """Compile the graph with a `DeltaPostgresSaver` on `conn_string`, creating its tables.
+
+    For running the agent outside langgraph-api, which brings its own checkpointer.
+    """
+    from appointment_agent.checkpointer import DeltaPostgresSaver
+
+    async with DeltaPostgresSaver.from_conn_string(conn_string) as saver:
+        await saver.setup()
+        graph = builder.compile(checkpointer=saver)
+        graph.name = appointment_agent_graph.name
+        yield graph
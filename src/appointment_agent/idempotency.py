@@ -0,0 +1,114 @@
+"""Idempotency keys for booking writes.
+
+The model is told to retry failed tool calls, so a `GOOGLECALENDAR_CREATE_EVENT`
+that timed out locally but went through upstream gets issued again. Every create
+call is keyed on the thread, the calendars involved (organizer and attendees)
+and the event window. The first call claims the key and runs; repeats within the
+window get its result back instead of booking a second event. With the Redis
+store the keys are shared by every worker.
+
+A key is only released when the tool plainly refused the call. A call that
+raised, timed out or returned nothing may still have booked the event upstream,
+so its key is marked uncertain and held until the window expires; repeats get
+`UNCERTAIN` back and are not run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from appointment_agent.availability.cache import event_window
+from appointment_agent.configuration import Configuration
+from appointment_agent.kv import KeyValueStore, get_key_value_store
+from appointment_agent.utils import tool_result_refused, tool_result_succeeded
+
+_PENDING = "__pending__"
+UNCERTAIN = "__uncertain__"
+
+
+class BookingIdempotency:
+    """Claims and remembers create-event calls in a `KeyValueStore`."""
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        window_seconds: float,
+        claim_seconds: float = 60.0,
+        poll_seconds: float = 0.25,
+        prefix: str = "booking",
+    ) -> None:
+        """Remember bookings in `store` for `window_seconds`."""
+        self._store = store
+        self._window_seconds = window_seconds
+        self._claim_seconds = claim_seconds
+        self._poll_seconds = poll_seconds
+        self._prefix = prefix
+
+    def key(self, thread_id: str, args: dict[str, Any]) -> Optional[str]:
+        """Build the idempotency key of a create-event call, if it names a time."""
+        window = event_window(args)
+        if window is None:
+            return None
+        calendars, start, end = window
+        digest = hashlib.sha256(
+            json.dumps([calendars, start.timestamp(), end.timestamp()]).encode()
+        ).hexdigest()[:24]
+        return f"{self._prefix}:{thread_id}:{digest}"
+
+    async def claim(
+        self, key: str, wait_seconds: float = 10.0
+    ) -> tuple[bool, Optional[str]]:
+        """Try to become the call that performs the write for `key`.
+
+        Returns:
+            tuple: `(True, None)` if the caller owns the key and must run the
+            write, `(False, result)` with the earlier result for a repeat
+            (`UNCERTAIN` if its outcome is unknown), or `(False, None)` if
+            another call is still running it.
+        """
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            if await self._store.set_if_absent(key, _PENDING, self._claim_seconds):
+                return True, None
+            (value,) = await self._store.get_many([key])
+            if value is not None and value != _PENDING:
+                return False, value
+            if value == _PENDING and time.monotonic() >= deadline:
+                return False, None
+            if value == _PENDING:
+                await asyncio.sleep(self._poll_seconds)
+
+    async def complete(self, key: str, result: str) -> None:
+        """Remember the result of a successful write for the window."""
+        await self._store.set_many({key: result}, self._window_seconds)
+
+    async def release(self, key: str) -> None:
+        """Release the key of a write the tool refused, so a retry can run."""
+        await self._store.delete_many([key])
+
+    async def mark_uncertain(self, key: str) -> None:
+        """Hold the key of a write whose outcome is unknown until the window expires."""
+        await self._store.set_many({key: UNCERTAIN}, self._window_seconds)
+
+    async def finish(self, key: str, result: Optional[str]) -> None:
+        """Record the outcome of the write for `key` from its tool result (None if there was none)."""
+        if result is not None and tool_result_succeeded(result):
+            await self.complete(key, result)
+        elif result is not None and tool_result_refused(result):
+            await self.release(key)
+        else:
+            await self.mark_uncertain(key)
+
+
+def get_booking_idempotency(
+    configuration: Configuration,
+) -> Optional[BookingIdempotency]:
+    """Get the booking idempotency layer selected by the configuration, if any."""
+    store = get_key_value_store(configuration.idempotency_store)
+    if store is None:
+        return None
+    return BookingIdempotency(store, configuration.idempotency_window_seconds)
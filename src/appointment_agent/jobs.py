@@ -0,0 +1,302 @@
+"""Background jobs for post-booking side effects.
+
+Confirmation emails and calls don't need to finish before the agent answers the
+patient. `schedule_tools_write_node` hands them to a `JobRunner` and replies
+with a "queued" acknowledgement straight away; a few worker tasks on the event
+loop run the tools, retrying failures with exponential backoff. A failed job is
+put back on the queue with a delay rather than held by a sleeping worker.
+
+Two queues are available: an in-process `asyncio.Queue`, and Redis (the
+`langgraph-redis` service from `compose.yaml`) so that queued jobs survive a
+worker restart. Redis jobs are leased while they run; a job whose lease expires
+(its worker died) is put back on the queue by the next worker that polls.
+Workers start as soon as the runner is created, and the web app creates the
+runner of `BACKGROUND_JOBS` at startup, so jobs left from before a restart are
+drained without waiting for a new one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Literal, Mapping, Optional, Protocol
+
+from appointment_agent.configuration import Configuration
+from appointment_agent.utils import parse_tool_result, tool_result_succeeded
+
+logger = logging.getLogger(__name__)
+
+JobBackend = Literal["off", "memory", "redis"]
+
+# Runs the tool named by a job and returns its raw result.
+JobHandler = Callable[[str, dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Job:
+    """A tool call to run in the background."""
+
+    tool: str
+    args: dict[str, Any]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempt: int = 0
+    max_attempts: int = 3
+
+    def dumps(self) -> str:
+        """Serialize the job to JSON."""
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, data: str) -> Job:
+        """Deserialize a job serialized with `dumps`."""
+        return cls(**json.loads(data))
+
+
+def job_result_succeeded(result: Any) -> bool:
+    """Check a tool result: Composio results carry a success flag, local tools a status."""
+    data = parse_tool_result(result)
+    if (
+        data is not None
+        and "status" in data
+        and "successful" not in data
+        and "successfull" not in data
+    ):
+        return data["status"] != "error"
+    return tool_result_succeeded(result)
+
+
+class JobQueue(Protocol):
+    """Queue interface implemented by every backend."""
+
+    async def put(self, job: Job, delay_seconds: float = 0.0) -> None:
+        """Add `job` to the queue, to be taken no sooner than `delay_seconds` from now."""
+        ...
+
+    async def get(self, timeout_seconds: float) -> Optional[Job]:
+        """Take the next job, waiting up to `timeout_seconds`; None if there is none."""
+        ...
+
+    async def ack(self, job: Job) -> None:
+        """Mark a job taken with `get` as done."""
+        ...
+
+
+class InMemoryJobQueue:
+    """Process-local queue; jobs are lost if the process stops."""
+
+    def __init__(self) -> None:
+        """Create an empty queue."""
+        self._queue: Optional[asyncio.Queue[Job]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_queue(self) -> asyncio.Queue[Job]:
+        # Created lazily so the queue binds to the loop that uses it.
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue, self._loop = asyncio.Queue(), loop
+        return self._queue
+
+    async def put(self, job: Job, delay_seconds: float = 0.0) -> None:
+        """Add `job` to the queue, to be taken no sooner than `delay_seconds` from now."""
+        queue = self._get_queue()
+        if delay_seconds > 0:
+            asyncio.get_running_loop().call_later(delay_seconds, queue.put_nowait, job)
+        else:
+            queue.put_nowait(job)
+
+    async def get(self, timeout_seconds: float) -> Optional[Job]:
+        """Take the next job, waiting up to `timeout_seconds`; None if there is none."""
+        try:
+            return await asyncio.wait_for(self._get_queue().get(), timeout_seconds)
+        except asyncio.TimeoutError:
+            return None
+
+    async def ack(self, job: Job) -> None:
+        """Mark a job taken with `get` as done; a no-op, since jobs are not leased."""
+
+
+class RedisJobQueue:
+    """Durable queue backed by a Redis list plus a sorted set of leased jobs."""
+
+    def __init__(
+        self, url: str, name: str = "jobs", lease_seconds: float = 300.0
+    ) -> None:
+        """Connect to the Redis server at `url`; taken jobs are requeued after `lease_seconds`."""
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._queue_key = f"{name}:queue"
+        self._leased_key = f"{name}:leased"
+        self._delayed_key = f"{name}:delayed"
+        self._lease_seconds = lease_seconds
+        self._taken: dict[tuple[str, int], str] = {}
+
+    async def put(self, job: Job, delay_seconds: float = 0.0) -> None:
+        """Add `job` to the queue, to be taken no sooner than `delay_seconds` from now."""
+        if delay_seconds > 0:
+            await self._client.zadd(
+                self._delayed_key, {job.dumps(): time.time() + delay_seconds}
+            )
+        else:
+            await self._client.lpush(self._queue_key, job.dumps())
+
+    async def get(self, timeout_seconds: float) -> Optional[Job]:
+        """Take and lease the next job, waiting up to `timeout_seconds`; None if there is none."""
+        # Leases that expired (their worker died) and delays that are over.
+        await self._requeue_due(self._leased_key)
+        await self._requeue_due(self._delayed_key)
+        item = await self._client.brpop(
+            [self._queue_key], timeout=max(1, int(timeout_seconds))
+        )
+        if item is None:
+            return None
+        data = item[1]
+        await self._client.zadd(
+            self._leased_key, {data: time.time() + self._lease_seconds}
+        )
+        job = Job.loads(data)
+        # The lease is keyed on the exact payload taken off the queue.
+        self._taken[job.id, job.attempt] = data
+        return job
+
+    async def ack(self, job: Job) -> None:
+        """Release the lease of a job taken with `get`."""
+        data = self._taken.pop((job.id, job.attempt), None)
+        if data is not None:
+            await self._client.zrem(self._leased_key, data)
+
+    async def _requeue_due(self, key: str) -> None:
+        due = await self._client.zrangebyscore(key, "-inf", time.time())
+        for data in due:
+            # Only the worker that removes the entry requeues the job.
+            if await self._client.zrem(key, data):
+                await self._client.lpush(self._queue_key, data)
+
+
+class JobRunner:
+    """Worker tasks draining a `JobQueue`."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        workers: int = 4,
+        base_delay_seconds: float = 1.0,
+        max_delay_seconds: float = 30.0,
+    ) -> None:
+        """Run jobs from `queue` through `handler` on `workers` worker tasks."""
+        self.queue = queue
+        self._handler = handler
+        self._workers = workers
+        self._base_delay = base_delay_seconds
+        self._max_delay = max_delay_seconds
+        self._tasks: list[asyncio.Task[None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(
+        self, tool: str, args: Mapping[str, Any], max_attempts: int = 3
+    ) -> Job:
+        """Queue a tool call and make sure the workers are running."""
+        job = Job(tool=tool, args=dict(args), max_attempts=max_attempts)
+        await self.queue.put(job)
+        self.ensure_started()
+        return job
+
+    def ensure_started(self) -> None:
+        """Start the worker tasks on the running event loop, once."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._tasks, self._loop = [], loop
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self._workers:
+            self._tasks.append(loop.create_task(self._work()))
+
+    async def run_once(self, job: Job) -> bool:
+        """Run one attempt of `job`; return whether it succeeded."""
+        try:
+            result = await self._handler(job.tool, job.args)
+        except Exception:
+            logger.warning("Job %s (%s) raised", job.id, job.tool, exc_info=True)
+            return False
+        if job_result_succeeded(result):
+            return True
+        logger.warning("Job %s (%s) failed: %s", job.id, job.tool, result)
+        return False
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.queue.get(timeout_seconds=5.0)
+            except Exception:
+                logger.warning("Could not read the job queue", exc_info=True)
+                await asyncio.sleep(self._base_delay)
+                continue
+            if job is None:
+                continue
+            succeeded = await self.run_once(job)
+            try:
+                # Requeue before acking so a crash in between retries the job
+                # rather than dropping it.
+                if not succeeded:
+                    await self._retry(job)
+                await self.queue.ack(job)
+            except Exception:
+                logger.warning("Could not update job %s", job.id, exc_info=True)
+
+    async def _retry(self, job: Job) -> None:
+        if job.attempt + 1 >= job.max_attempts:
+            logger.error(
+                "Job %s (%s) gave up after %d attempts",
+                job.id,
+                job.tool,
+                job.max_attempts,
+            )
+            return
+        delay = min(self._max_delay, self._base_delay * 2**job.attempt)
+        # Delayed on the queue, not slept on: the lease of this attempt is
+        # released right after, so it can't expire while the backoff runs.
+        await self.queue.put(
+            Job(**{**asdict(job), "attempt": job.attempt + 1}),
+            random.uniform(delay / 2, delay),
+        )
+
+
+_runners: dict[str, JobRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def get_job_runner(
+    configuration: Configuration, handler: JobHandler
+) -> Optional[JobRunner]:
+    """Get the process-wide job runner for the configured backend, or None if "off".
+
+    Its workers are started on the running event loop, if there is one. The
+    Redis backend connects to `REDIS_URI` (default `redis://localhost:6379`).
+    """
+    backend = configuration.background_jobs
+    if backend == "off":
+        return None
+    with _runners_lock:
+        runner = _runners.get(backend)
+        if runner is None:
+            if backend == "redis":
+                queue: JobQueue = RedisJobQueue(
+                    os.getenv("REDIS_URI", "redis://localhost:6379")
+                )
+            else:
+                queue = InMemoryJobQueue()
+            runner = _runners[backend] = JobRunner(
+                queue, handler, workers=configuration.background_job_workers
+            )
+    try:
+        runner.ensure_started()
+    except RuntimeError:
+        pass  # No running event loop; `submit` starts the workers.
+    return runner
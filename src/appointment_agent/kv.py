@@ -0,0 +1,154 @@
+"""Small TTL key-value stores shared by the agent's caches.
+
+Two backends are available: an in-process dictionary, and Redis (the
+`langgraph-redis` service from `compose.yaml`) when state has to be shared
+between langgraph-api workers. Redis needs the optional `redis` package.
+"""
+
+import os
+import threading
+import time
+from typing import Iterable, Literal, Mapping, Optional, Protocol, Sequence
+
+KeyValueBackend = Literal["off", "memory", "redis"]
+
+
+class KeyValueStore(Protocol):
+    """Minimal async interface implemented by every backend."""
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[str]]:
+        """Return the values for `keys`, None for missing or expired keys."""
+        ...
+
+    async def set_many(self, items: Mapping[str, str], ttl_seconds: float) -> None:
+        """Store `items`, each expiring after `ttl_seconds`."""
+        ...
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove `keys` if present."""
+        ...
+
+    async def set_if_absent(self, key: str, value: str, ttl_seconds: float) -> bool:
+        """Store `key` only if it is missing; return whether it was stored."""
+        ...
+
+
+class InMemoryKeyValueStore:
+    """Process-local TTL store."""
+
+    def __init__(self, max_entries: int = 50_000) -> None:
+        """Create an empty store holding at most `max_entries` keys."""
+        self._max_entries = max_entries
+        self._data: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[str]]:
+        """Return the values for `keys`, None for missing or expired keys."""
+        now = time.monotonic()
+        values: list[Optional[str]] = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[0] <= now:
+                    self._data.pop(key, None)
+                    values.append(None)
+                else:
+                    values.append(entry[1])
+        return values
+
+    async def set_many(self, items: Mapping[str, str], ttl_seconds: float) -> None:
+        """Store `items`, each expiring after `ttl_seconds`."""
+        expires_at = time.monotonic() + ttl_seconds
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (expires_at, value)
+            if len(self._data) > self._max_entries:
+                self._evict()
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove `keys` if present."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    async def set_if_absent(self, key: str, value: str, ttl_seconds: float) -> bool:
+        """Store `key` only if it is missing; return whether it was stored."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data[key] = (now + ttl_seconds, value)
+            return True
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the ones closest to expiry."""
+        now = time.monotonic()
+        self._data = {k: v for k, v in self._data.items() if v[0] > now}
+        overflow = len(self._data) - self._max_entries
+        if overflow > 0:
+            for key, _ in sorted(self._data.items(), key=lambda kv: kv[1][0])[
+                :overflow
+            ]:
+                del self._data[key]
+
+
+class RedisKeyValueStore:
+    """TTL store backed by Redis, shared by every worker using the same server."""
+
+    def __init__(self, url: str) -> None:
+        """Connect to the Redis server at `url`."""
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[str]]:
+        """Return the values for `keys`, None for missing or expired keys."""
+        if not keys:
+            return []
+        return list(await self._client.mget(list(keys)))
+
+    async def set_many(self, items: Mapping[str, str], ttl_seconds: float) -> None:
+        """Store `items`, each expiring after `ttl_seconds`."""
+        if not items:
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, px=int(ttl_seconds * 1000))
+            await pipe.execute()
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove `keys` if present."""
+        keys = list(keys)
+        if keys:
+            await self._client.delete(*keys)
+
+    async def set_if_absent(self, key: str, value: str, ttl_seconds: float) -> bool:
+        """Store `key` only if it is missing; return whether it was stored."""
+        return bool(
+            await self._client.set(key, value, px=int(ttl_seconds * 1000), nx=True)
+        )
+
+
+_stores: dict[str, KeyValueStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_key_value_store(backend: KeyValueBackend) -> Optional[KeyValueStore]:
+    """Get the process-wide store for `backend`, or None if it is "off".
+
+    The Redis backend connects to `REDIS_URI` (default `redis://localhost:6379`).
+    """
+    if backend == "off":
+        return None
+    with _stores_lock:
+        store = _stores.get(backend)
+        if store is None:
+            if backend == "redis":
+                store = RedisKeyValueStore(
+                    os.getenv("REDIS_URI", "redis://localhost:6379")
+                )
+            else:
+                store = InMemoryKeyValueStore()
+            _stores[backend] = store
+        return store
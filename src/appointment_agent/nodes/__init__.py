@@ -8,7 +8,19 @@ These nodes are included in the `__all__` list to specify the public API of this
 """
 
 from appointment_agent.nodes._tools import schedule_tools_write_node
-from appointment_agent.nodes.generate_response import generate_response
+from appointment_agent.nodes.book_appointment import book_appointment
+from appointment_agent.nodes.facts import extract_facts
+from appointment_agent.nodes.fast_path import fast_path
 from appointment_agent.nodes.find_slots import find_slots
+from appointment_agent.nodes.generate_response import generate_response
+from appointment_agent.nodes.summarize import summarize_conversation
 
-__all__ = ["schedule_tools_write_node", "generate_response", "find_slots"]
+__all__ = [
+    "schedule_tools_write_node",
+    "generate_response",
+    "find_slots",
+    "book_appointment",
+    "summarize_conversation",
+    "extract_facts",
+    "fast_path",
+]
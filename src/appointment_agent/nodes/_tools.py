@@ -1,41 +1,328 @@
 """This module defines the tools for agent."""
 
-import os
-import dotenv
+import asyncio
+import json
 import logging
+import os
+import threading
+from typing import Optional
 
+import dotenv
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
 from langgraph.prebuilt import ToolNode
-from composio_langgraph import Action, ComposioToolSet
+
+from appointment_agent.availability import (
+    get_availability_cache,
+    get_availability_index,
+)
+from appointment_agent.availability.cache import event_window
+from appointment_agent.availability.prefetch import discard_prefetches
+from appointment_agent.configuration import Configuration
+from appointment_agent.idempotency import (
+    UNCERTAIN,
+    BookingIdempotency,
+    get_booking_idempotency,
+)
+from appointment_agent.jobs import get_job_runner
+from appointment_agent.nodes.facts import facts_from_booking
+from appointment_agent.payloads import compact_tool_messages
+from appointment_agent.state import AppointmentAgentState, BookingFacts
+from appointment_agent.tools.book_appointment import BOOK_APPOINTMENT
+from appointment_agent.tools.composio_tools import load_composio_tools
+from appointment_agent.tools.fetch_tool_payload import fetch_tool_payload
 from appointment_agent.tools.make_confirmation_call import make_confirmation_call
+from appointment_agent.utils import tool_result_id, tool_result_succeeded
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
+    format="%(asctime)s [%(levelname)s] %(message)s",
 )
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 dotenv.load_dotenv()
 
-# Initialize ComposioToolSet with API key from environment variables
-composio_toolset = ComposioToolSet(api_key=os.getenv("COMPOSIO_API_KEY"))
+FIND_FREE_SLOTS = "GOOGLECALENDAR_FIND_FREE_SLOTS"
+CREATE_EVENT = "GOOGLECALENDAR_CREATE_EVENT"
+
+# Side effects of a booking that the patient doesn't need to wait for; with
+# background jobs enabled they are queued instead of run inline.
+BACKGROUND_TOOLS = {"GMAIL_CREATE_EMAIL_DRAFT", "make_confirmation_call"}
+
+# Composio actions used by the agent
+SCHEDULE_ACTIONS = [
+    FIND_FREE_SLOTS,
+    CREATE_EVENT,
+    "GMAIL_CREATE_EMAIL_DRAFT",
+]
+
+# Composio actions used to undo a partial booking; not offered to the model.
+COMPENSATION_ACTIONS = ["GMAIL_DELETE_DRAFT"]
+
+# Tools are built lazily, on first use, from a local schema snapshot so that
+# importing the graph never waits on the Composio API. With COMPOSIO_FAKE_TOOLS
+# set, offline stand-ins backed by an in-memory calendar are used instead.
+_schedule_tools: Optional[list[BaseTool]] = None
+_compensation_tools: Optional[list[BaseTool]] = None
+_schedule_tools_write_tool_node: Optional[ToolNode] = None
+# Reentrant: building the tool node loads the schedule tools under the same lock.
+_tools_lock = threading.RLock()
+
+
+def load_tools(actions: list[str]) -> list[BaseTool]:
+    """Build tools for Composio `actions`, or their offline fakes."""
+    if os.getenv("COMPOSIO_FAKE_TOOLS", "").lower() in ("1", "true", "yes"):
+        from appointment_agent.tools.fake_composio import create_fake_tools
+
+        logger.info("Using offline fake Composio tools")
+        return create_fake_tools(actions=actions)
+    return load_composio_tools(actions)
+
+
+def get_schedule_tools() -> list[BaseTool]:
+    """Get every scheduling tool the agent can call."""
+    global _schedule_tools
+    with _tools_lock:
+        if _schedule_tools is None:
+            _schedule_tools = load_tools(SCHEDULE_ACTIONS)
+        return _schedule_tools
+
+
+def get_compensation_tools() -> dict[str, BaseTool]:
+    """Get the tools used to undo a partial booking, by name."""
+    global _compensation_tools
+    with _tools_lock:
+        if _compensation_tools is None:
+            _compensation_tools = load_tools(COMPENSATION_ACTIONS)
+        return {tool.name: tool for tool in _compensation_tools}
+
+
+def get_schedule_tools_write() -> list[BaseTool]:
+    """Get the scheduling tools that change data (everything but free-slot lookups)."""
+    return [tool for tool in get_schedule_tools() if tool.name != FIND_FREE_SLOTS]
+
 
-# Get the required tools
-schedule_tools_set = composio_toolset.get_tools(
-    actions=[
-        Action.GOOGLECALENDAR_FIND_FREE_SLOTS,
-        Action.GOOGLECALENDAR_CREATE_EVENT,
-        Action.GMAIL_CREATE_EMAIL_DRAFT
+def get_schedule_tools_write_tool_node() -> ToolNode:
+    """Get the `ToolNode` running the write tools, the confirmation call and payload fetches."""
+    global _schedule_tools_write_tool_node
+    with _tools_lock:
+        if _schedule_tools_write_tool_node is None:
+            _schedule_tools_write_tool_node = ToolNode(
+                get_schedule_tools_write()
+                + [make_confirmation_call, fetch_tool_payload]
+            )
+        return _schedule_tools_write_tool_node
+
+
+async def run_background_tool(name: str, args: dict) -> object:
+    """Run a write tool (or the confirmation call) for a background job."""
+    return await get_schedule_tools_write_tool_node().tools_by_name[name].ainvoke(args)
+
+
+async def record_booking(configuration: Configuration, args: dict) -> None:
+    """Mark the window of a create-event call busy in the availability index, cache and prefetches."""
+    window = event_window(args)
+    if window is None:
+        return
+    discard_prefetches(*window)
+    if configuration.availability_index:
+        get_availability_index(
+            configuration.availability_index_max_age_seconds
+        ).add_event(*window)
+    cache = get_availability_cache(configuration)
+    if cache is not None:
+        try:
+            await cache.invalidate(*window)
+        except Exception:
+            logger.warning("Could not invalidate cached availability", exc_info=True)
+
+
+async def _claim_bookings(
+    calls: list[dict], thread_id: str, idempotency: Optional[BookingIdempotency]
+) -> tuple[dict[str, str], dict[str, Optional[str]], dict[str, str]]:
+    """Claim the idempotency keys of the create-event calls in `calls`.
+
+    Returns:
+        tuple: The keys owned by this node per call id, the earlier result (or
+        None if it is still in flight) per call id answered without running,
+        and, for repeats inside `calls`, the id of the call they repeat.
+    """
+    owned: dict[str, str] = {}
+    answered: dict[str, Optional[str]] = {}
+    repeats: dict[str, str] = {}
+    if idempotency is None:
+        return owned, answered, repeats
+
+    first_call: dict[str, str] = {}
+    for call in calls:
+        if call.get("name") != CREATE_EVENT:
+            continue
+        key = idempotency.key(thread_id, call.get("args") or {})
+        if key is None:
+            continue
+        if key in first_call:
+            repeats[call["id"]] = first_call[key]
+        else:
+            first_call[key] = call["id"]
+
+    claims = await asyncio.gather(*(idempotency.claim(key) for key in first_call))
+    for (key, call_id), (is_owner, previous) in zip(first_call.items(), claims):
+        if is_owner:
+            owned[call_id] = key
+        else:
+            answered[call_id] = previous
+    return owned, answered, repeats
+
+
+async def schedule_tools_write_node(
+    state: AppointmentAgentState, config: RunnableConfig
+):
+    """Run the write tools and update cached availability for the booked windows.
+
+    Free-slot lookups and bookings in the same message are left to `find_slots`
+    and `book_appointment`, which run in parallel with this node. Create-event
+    calls repeating a booking already made in this thread get the earlier result
+    instead of booking again.
+    """
+    last_message = state["messages"][-1]
+    write_calls = [
+        call
+        for call in last_message.tool_calls
+        if call.get("name") not in (FIND_FREE_SLOTS, BOOK_APPOINTMENT)
     ]
-)
+    if not write_calls:
+        return {"messages": []}
 
-# Separate out 
-schedule_tools_write = composio_toolset.get_tools(
-    actions=[
-        Action.GOOGLECALENDAR_CREATE_EVENT,
-        Action.GMAIL_CREATE_EMAIL_DRAFT
+    configuration = Configuration.from_runnable_config(config)
+    idempotency = get_booking_idempotency(configuration)
+    thread_id = str((config.get("configurable") or {}).get("thread_id") or "")
+    owned, answered, repeats = await _claim_bookings(
+        write_calls, thread_id, idempotency
+    )
+    runner = get_job_runner(configuration, run_background_tool)
+    background_calls = [
+        call
+        for call in write_calls
+        if runner is not None and call.get("name") in BACKGROUND_TOOLS
     ]
-)
+    run_calls = [
+        call
+        for call in write_calls
+        if call["id"] not in answered
+        and call["id"] not in repeats
+        and call not in background_calls
+    ]
+
+    results: dict[str, ToolMessage] = {}
+    try:
+        if run_calls:
+            output = await get_schedule_tools_write_tool_node().ainvoke(
+                {
+                    **state,
+                    "messages": [
+                        *state["messages"][:-1],
+                        last_message.model_copy(update={"tool_calls": run_calls}),
+                    ],
+                },
+                config,
+            )
+            results = {message.tool_call_id: message for message in output["messages"]}
+    finally:
+        for call_id, key in owned.items():
+            message = results.get(call_id)
+            content = message.content if message is not None else None
+            try:
+                await idempotency.finish(
+                    key,
+                    content
+                    if content is None or isinstance(content, str)
+                    else json.dumps(content),
+                )
+            except Exception:
+                logger.warning(
+                    "Could not record booking idempotency key", exc_info=True
+                )
+
+    def reply(call: dict) -> ToolMessage:
+        source = repeats.get(call["id"], call["id"])
+        if source == call["id"] and source in results:
+            return results[source]
+        previous = (
+            results[source].content if source in results else answered.get(source)
+        )
+        if previous == UNCERTAIN:
+            return ToolMessage(
+                name=call["name"],
+                tool_call_id=call["id"],
+                content="Error: an earlier attempt at this booking did not report back and may "
+                "have gone through. Do not retry it; check the calendar for this time and offer "
+                "another one if it still shows as free.",
+                status="error",
+            )
+        if previous is None:
+            return ToolMessage(
+                name=call["name"],
+                tool_call_id=call["id"],
+                content="Error: this booking is already being created. Do not retry it; "
+                "check the calendar before booking again.",
+                status="error",
+            )
+        return ToolMessage(name=call["name"], tool_call_id=call["id"], content=previous)
+
+    # Queue the side effects only once the bookings in the same step went through.
+    booking_failed = any(
+        call.get("name") == CREATE_EVENT
+        and not (
+            call["id"] in results and tool_result_succeeded(results[call["id"]].content)
+        )
+        for call in run_calls
+    )
+    for call in background_calls:
+        if booking_failed:
+            results[call["id"]] = ToolMessage(
+                name=call["name"],
+                tool_call_id=call["id"],
+                content="Error: not sent because the booking in this step failed.",
+                status="error",
+            )
+            continue
+        job = await runner.submit(
+            call["name"],
+            call.get("args") or {},
+            configuration.background_job_max_attempts,
+        )
+        results[call["id"]] = ToolMessage(
+            name=call["name"],
+            tool_call_id=call["id"],
+            content=json.dumps(
+                {
+                    "status": "queued",
+                    "job_id": job.id,
+                    "message": "Queued; it will be completed in the background.",
+                }
+            ),
+        )
+
+    messages = [reply(call) for call in write_calls]
+
+    # Update even when the call reports an error: a timed-out create may still
+    # have gone through upstream, and a stale "free" answer is worse than one
+    # extra calendar lookup.
+    facts = BookingFacts()
+    for call in run_calls:
+        if call.get("name") == CREATE_EVENT:
+            await record_booking(configuration, call.get("args") or {})
+            content = results[call["id"]].content if call["id"] in results else None
+            facts.update(
+                facts_from_booking(
+                    call.get("args") or {},
+                    "booked" if tool_result_succeeded(content) else "failed",
+                    tool_result_id(content),
+                )
+            )
 
-schedule_tools_write_node = ToolNode(schedule_tools_write + [make_confirmation_call])
+    update = {"messages": await compact_tool_messages(messages, configuration)}
+    return {**update, "facts": facts} if facts else update
@@ -0,0 +1,258 @@
+"""This module defines the `book_appointment` node, which runs a whole booking in one step.
+
+Booking used to take one model turn per tool: create the event, then draft the
+email, then place the call. This node runs them as a single transaction: the
+event and the email draft are created concurrently, the draft is deleted again
+if the event could not be created, and the confirmation call is only placed once
+the event exists. The model gets one summary back.
+"""
+
+import asyncio
+import datetime
+import json
+from typing import Any
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import ValidationError
+
+from appointment_agent.availability.freebusy import (
+    get_timezone,
+    parse_calendar_datetime,
+)
+from appointment_agent.configuration import Configuration
+from appointment_agent.idempotency import UNCERTAIN, get_booking_idempotency
+from appointment_agent.jobs import get_job_runner, job_result_succeeded
+from appointment_agent.nodes._tools import (
+    CREATE_EVENT,
+    get_compensation_tools,
+    get_schedule_tools_write_tool_node,
+    record_booking,
+    run_background_tool,
+)
+from appointment_agent.nodes.facts import facts_from_booking
+from appointment_agent.state import AppointmentAgentState, BookingFacts
+from appointment_agent.tools.book_appointment import (
+    BOOK_APPOINTMENT,
+    BookAppointmentRequest,
+)
+from appointment_agent.utils import parse_tool_result, tool_result_id
+
+EMAIL_DRAFT = "GMAIL_CREATE_EMAIL_DRAFT"
+DELETE_DRAFT = "GMAIL_DELETE_DRAFT"
+CONFIRMATION_CALL = "make_confirmation_call"
+
+
+def _error(result: Any) -> str:
+    data = parse_tool_result(result)
+    if data is None:
+        return str(result)
+    return str(data.get("error") or data.get("message") or data)
+
+
+def _is_today(request: BookAppointmentRequest) -> bool:
+    tz = get_timezone(request.timezone)
+    start = parse_calendar_datetime(request.start_datetime, tz)
+    return start.astimezone(tz).date() == datetime.datetime.now(tz).date()
+
+
+def build_tool_args(
+    request: BookAppointmentRequest, configuration: Configuration
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Build the create-event and email-draft arguments of a booking."""
+    duration = request.duration_minutes or configuration.appointment_duration_minutes
+    start = parse_calendar_datetime(
+        request.start_datetime, get_timezone(request.timezone)
+    )
+    when = start.strftime("%A %d %B %Y at %I:%M %p").replace(" 0", " ")
+    event_args = {
+        "start_datetime": request.start_datetime,
+        "timezone": request.timezone,
+        "event_duration_hour": duration // 60,
+        "event_duration_minutes": duration % 60,
+        "summary": f"Appointment: {request.patient_name}",
+        # The confirmation campaign reads the phone number back from here.
+        "description": "\n".join(
+            line
+            for line in (
+                request.reason,
+                f"Phone: {request.phone_number}" if request.phone_number else None,
+            )
+            if line
+        ),
+        "attendees": [request.patient_email],
+    }
+    draft_args = {
+        "recipient_email": request.patient_email,
+        "subject": f"Your appointment at {configuration.clinic_name}",
+        "body": (
+            f"Dear {request.patient_name},\n\n"
+            f"Your appointment at {configuration.clinic_name} is confirmed for {when} "
+            f"({request.timezone}), lasting {duration} minutes.\n"
+            "Please arrive 10 minutes early. If you need to reschedule or cancel, "
+            "let us know at least 24 hours in advance.\n\n"
+            f"Kind regards,\n{configuration.clinic_name}"
+        ),
+    }
+    return event_args, draft_args
+
+
+async def _invoke(name: str, args: dict[str, Any]) -> Any:
+    """Run a write tool, turning exceptions into an error result."""
+    try:
+        return (
+            await get_schedule_tools_write_tool_node().tools_by_name[name].ainvoke(args)
+        )
+    except Exception as e:
+        return {"status": "error", "message": repr(e)}
+
+
+async def run_booking(
+    request: BookAppointmentRequest, configuration: Configuration, thread_id: str
+) -> dict[str, Any]:
+    """Run a booking transaction and summarize what happened."""
+    event_args, draft_args = build_tool_args(request, configuration)
+    summary: dict[str, Any] = {
+        "start": request.start_datetime,
+        "timezone": request.timezone,
+    }
+
+    idempotency = get_booking_idempotency(configuration)
+    key = idempotency.key(thread_id, event_args) if idempotency is not None else None
+    if key is not None:
+        is_owner, previous = await idempotency.claim(key)
+        if not is_owner:
+            if previous is None:
+                return {
+                    **summary,
+                    "status": "in_progress",
+                    "message": "This booking is already being made. Do not retry it.",
+                }
+            if previous == UNCERTAIN:
+                return {
+                    **summary,
+                    "status": "uncertain",
+                    "message": "An earlier attempt at this booking did not report back and may "
+                    "have gone through. Do not retry it; check the calendar for this time.",
+                }
+            return {
+                **summary,
+                "status": "already_booked",
+                "event_id": tool_result_id(previous),
+            }
+
+    event, draft = None, None
+    try:
+        event, draft = await asyncio.gather(
+            _invoke(CREATE_EVENT, event_args), _invoke(EMAIL_DRAFT, draft_args)
+        )
+    finally:
+        if key is not None:
+            await idempotency.finish(
+                key, json.dumps(event, default=str) if event is not None else None
+            )
+    # A timed-out create may still have gone through upstream.
+    await record_booking(configuration, event_args)
+
+    draft_ok = job_result_succeeded(draft)
+    if not job_result_succeeded(event):
+        summary.update(status="failed", error=_error(event))
+        draft_id = tool_result_id(draft) if draft_ok else None
+        if draft_id:
+            deleted = await _compensate(draft_id)
+            summary["email_draft"] = "deleted" if deleted else "orphaned"
+        return summary
+
+    summary.update(status="booked", event_id=tool_result_id(event))
+    runner = get_job_runner(configuration, run_background_tool)
+    if draft_ok:
+        summary["email_draft"] = "created"
+    elif runner is not None:
+        await runner.submit(
+            EMAIL_DRAFT, draft_args, configuration.background_job_max_attempts
+        )
+        summary["email_draft"] = "queued"
+    else:
+        summary["email_draft"] = f"failed: {_error(draft)}"
+
+    if not request.phone_number:
+        summary["confirmation_call"] = "skipped: no phone number"
+    else:
+        call_args = {
+            "phone_number": request.phone_number,
+            "instructions": request.call_instructions,
+            "clinic_name": configuration.clinic_name,
+            # Same-day appointments are confirmed ahead of the routine queue.
+            "urgent": _is_today(request),
+        }
+        if runner is not None:
+            await runner.submit(
+                CONFIRMATION_CALL, call_args, configuration.background_job_max_attempts
+            )
+            summary["confirmation_call"] = "queued"
+        else:
+            call = await _invoke(CONFIRMATION_CALL, call_args)
+            summary["confirmation_call"] = (
+                "placed" if job_result_succeeded(call) else f"failed: {_error(call)}"
+            )
+    return summary
+
+
+async def _compensate(draft_id: str) -> bool:
+    """Delete an email draft left behind by a failed booking."""
+    try:
+        result = await get_compensation_tools()[DELETE_DRAFT].ainvoke(
+            {"draft_id": draft_id}
+        )
+    except Exception:
+        return False
+    return job_result_succeeded(result)
+
+
+async def book_appointment(state: AppointmentAgentState, config: RunnableConfig):
+    """Run every booking requested by the last message and reply with one summary each."""
+    configuration = Configuration.from_runnable_config(config)
+    thread_id = str((config.get("configurable") or {}).get("thread_id") or "")
+    calls = [
+        call
+        for call in state["messages"][-1].tool_calls
+        if call.get("name") == BOOK_APPOINTMENT
+    ]
+
+    facts = BookingFacts()
+
+    async def run(call: dict[str, Any]) -> ToolMessage:
+        try:
+            request = BookAppointmentRequest.model_validate(call.get("args") or {})
+            result = await run_booking(request, configuration, thread_id)
+        except (ValidationError, ValueError) as e:
+            return ToolMessage(
+                name=BOOK_APPOINTMENT,
+                tool_call_id=call["id"],
+                content=f"Error: {repr(e)}\n Please fix your mistakes.",
+                status="error",
+            )
+        except Exception as e:
+            # Every tool call needs a reply, or the next model call rejects the history.
+            return ToolMessage(
+                name=BOOK_APPOINTMENT,
+                tool_call_id=call["id"],
+                content=f"Error: the booking could not be completed: {repr(e)}. Check the "
+                "calendar before booking again.",
+                status="error",
+            )
+        status = "booked" if result["status"] == "already_booked" else result["status"]
+        facts.update(
+            facts_from_booking(request.model_dump(), status, result.get("event_id"))
+        )
+        return ToolMessage(
+            name=BOOK_APPOINTMENT,
+            tool_call_id=call["id"],
+            content=json.dumps(result, ensure_ascii=False),
+            status="success"
+            if result["status"] in ("booked", "already_booked")
+            else "error",
+        )
+
+    messages = list(await asyncio.gather(*(run(call) for call in calls)))
+    return {"messages": messages, "facts": facts} if facts else {"messages": messages}
@@ -0,0 +1,155 @@
+"""This module defines the `extract_facts` node and the helpers that keep `facts` up to date.
+
+Details such as the patient's email or the chosen slot used to be re-read by
+the model from the whole transcript on every turn. They are now kept as typed
+fields in `AppointmentAgentState.facts`: `extract_facts` picks contact details
+out of each patient turn with regular expressions (and resolves any date or
+time mentioned into a window), and the tool nodes record
+the slots they offered and the bookings they made. The model gets them as a
+short block in its call context.
+"""
+
+import datetime
+import re
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from appointment_agent.availability.freebusy import get_timezone
+from appointment_agent.availability.temporal import resolve_temporal_expression
+from appointment_agent.configuration import Configuration
+from appointment_agent.state import (
+    AppointmentAgentState,
+    BookingFacts,
+    RequestedWindow,
+    SlotOption,
+)
+from appointment_agent.utils import (
+    get_message_text,
+    normalize_phone_number,
+    parse_tool_result,
+)
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w@])\+?\d[\d\s().-]{6,}\d")
+# Without one of these words, only a full-length number (10+ digits) is taken as a phone number.
+_PHONE_CUE = re.compile(
+    r"\b(?:phone|number|mobile|cell|call me|reach me)\b", re.IGNORECASE
+)
+# Dates written with digits only: 2025-01-30, 30/01/2025, 15 01 2025.
+_DIGIT_DATE = re.compile(
+    r"\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\b|\b[0-3]?\d[-/. ][01]?\d[-/. ](?:\d{4}|\d{2})\b"
+)
+_NAME = re.compile(
+    r"\b(?i:my name is|my name's|this is)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)*)"
+)
+# Capitalized words that follow "this is" without being a name.
+_NOT_NAMES = {
+    "Calling",
+    "Fine",
+    "Good",
+    "Great",
+    "Perfect",
+    "Urgent",
+    "About",
+    "For",
+    "Regarding",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+    "Today",
+    "Tomorrow",
+    "The",
+    "A",
+    "An",
+    "My",
+    "Not",
+    "Just",
+}
+
+
+def facts_from_text(text: str) -> BookingFacts:
+    """Pick contact details out of something the patient said."""
+    facts = BookingFacts()
+    if email := _EMAIL.search(text):
+        facts["email"] = email.group(0).rstrip(".").lower()
+    # Search with the emails and dates removed so their digits aren't taken for a number.
+    digits_only = _DIGIT_DATE.sub(" ", _EMAIL.sub(" ", text))
+    min_digits = 7 if _PHONE_CUE.search(text) else 10
+    for match in _PHONE.finditer(digits_only):
+        if len(re.sub(r"\D", "", match.group(0))) >= min_digits:
+            facts["phone_number"] = normalize_phone_number(match.group(0))
+            break
+    name = _NAME.search(text)
+    if name and name.group(1).split()[0] not in _NOT_NAMES:
+        facts["patient_name"] = name.group(1)
+    return facts
+
+
+def facts_from_slot_result(content: Any) -> Optional[BookingFacts]:
+    """Record the slots offered by a ranked availability check."""
+    data = parse_tool_result(content)
+    if not data or not isinstance(data.get("options"), list):
+        return None
+    facts = BookingFacts(
+        offered_slots=[
+            SlotOption(
+                start=option["start"], end=option["end"], label=option.get("label", "")
+            )
+            for option in data["options"]
+            if isinstance(option, dict) and "start" in option and "end" in option
+        ],
+    )
+    if data.get("requested"):
+        facts["requested_slot"] = data["requested"]
+    if data.get("timezone"):
+        facts["timezone"] = data["timezone"]
+    return facts
+
+
+def facts_from_booking(
+    args: dict[str, Any], status: str, event_id: Optional[str]
+) -> BookingFacts:
+    """Record a booking attempt from the arguments it was made with."""
+    attendees = args.get("attendees") or []
+    facts = {
+        "patient_name": args.get("patient_name"),
+        "email": args.get("patient_email") or (attendees[0] if attendees else None),
+        "phone_number": args.get("phone_number"),
+        "chosen_slot": args.get("start_datetime"),
+        "timezone": args.get("timezone"),
+        "booking_status": status,
+        "event_id": event_id,
+    }
+    return BookingFacts(**{key: value for key, value in facts.items() if value})
+
+
+async def extract_facts(state: AppointmentAgentState, config: RunnableConfig):
+    """Pick booking facts out of the patient's latest turn."""
+    configuration = Configuration.from_runnable_config(config)
+    facts = BookingFacts()
+    texts = []
+    for message in reversed(state["messages"]):
+        if isinstance(message, AIMessage):
+            break
+        if isinstance(message, HumanMessage):
+            text = get_message_text(message)
+            texts.insert(0, text)
+            # Walking backwards, so earlier messages of the turn must not override later ones.
+            facts = BookingFacts(**{**facts_from_text(text), **facts})
+
+    if configuration.resolve_dates and texts:
+        tz = get_timezone(configuration.clinic_timezone)
+        window = resolve_temporal_expression(
+            " ".join(texts), datetime.datetime.now(datetime.timezone.utc), tz
+        )
+        if window is not None:
+            facts["requested_window"] = RequestedWindow(
+                start=window.start.isoformat(), end=window.end.isoformat()
+            )
+    return {"facts": facts} if facts else {}
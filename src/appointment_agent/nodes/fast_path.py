@@ -0,0 +1,232 @@
+"""This module defines the `fast_path` node, which answers trivial turns without the model.
+
+Most turns of a live call are short: "yes", "that's fine", "the second one",
+"no thanks, bye". Each used to cost a full model round trip. `fast_path` runs
+before the agent and recognizes these turns with a few rules, using the booking
+facts and the slots offered in the previous reply:
+
+- a farewell is answered directly and ends the turn;
+- picking one of the offered slots, or agreeing to the one slot the agent's
+  last reply proposed, books it through `book_appointment` (only when the patient's
+  name, email and phone number are already known).
+
+Anything that is not clear-cut is left to the model.
+"""
+
+import datetime
+import re
+import uuid
+from typing import Optional, Sequence
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from appointment_agent.availability.freebusy import (
+    get_timezone,
+    parse_calendar_datetime,
+)
+from appointment_agent.configuration import Configuration
+from appointment_agent.prompts import FAST_PATH_FAREWELL, FAST_PATH_FAREWELL_BOOKED
+from appointment_agent.state import AppointmentAgentState, BookingFacts, SlotOption
+from appointment_agent.tools.book_appointment import BOOK_APPOINTMENT
+from appointment_agent.utils import get_message_text
+
+# Longer utterances are left to the model; they usually say more than one thing.
+_MAX_WORDS = 12
+
+_FAREWELL = re.compile(
+    r"^(?:(?:no|nope|nah)[,.!]?\s*(?:thanks?|thank you)?[,.!]?\s*)?"
+    r"(?:(?:that'?s|that is) all(?: for now)?|nothing else|(?:good)?\s?bye(?: bye)?|have a (?:good|nice|great) day)"
+    r"(?:[,.!]?\s*(?:thanks?|thank you|bye|goodbye))*[.!]*$"
+)
+_THANKS = re.compile(
+    r"^(?:great|perfect|ok(?:ay)?|lovely)?[,.!]?\s*(?:thanks?|thank you)(?: (?:so much|very much))?[.!]*$"
+)
+_AFFIRMATION = re.compile(
+    r"^(?=.*\b(?:yes|yeah|yep|yup|sure|ok|okay|perfect|great|fine|alright|correct|works|good|"
+    r"go ahead|book it|please do|let'?s do)\b)"
+    r"(?:yes|yeah|yep|yup|sure|ok(?:ay)?|perfect|great|fine|alright|correct)?[,.!]?\s*"
+    r"(?:please|that'?s (?:fine|good|great|perfect)|that works|sounds good|go ahead|book it|please do|"
+    r"let'?s do (?:it|that)|yes)?[,.!]?\s*(?:please|thanks?|thank you)?[.!]*$"
+)
+# Words that make a short answer mean something else than agreeing or picking.
+_HEDGES = re.compile(
+    r"\b(?:no|not|don'?t|instead|other|else|another|change|cancel|wait|actually|but|if|"
+    r"hold on|hang on|give me|(?:a|one|just a) (?:second|sec|minute|moment)|sec|minute|moment)\b|\?"
+)
+
+_ORDINALS = {
+    **{word: i for i, word in enumerate(["first", "second", "third"])},
+    **{word: i for i, word in enumerate(["1st", "2nd", "3rd"])},
+    **{
+        f"{prefix} {number}": i
+        for prefix in ("option", "number")
+        for i, numbers in enumerate([("1", "one"), ("2", "two"), ("3", "three")])
+        for number in numbers
+    },
+}
+# An ordinal only picks a slot when it is the whole answer: "the second one", "option 2".
+_ORDINAL = re.compile(
+    r"^(?:(?:yes|ok(?:ay)?)[,.!]?\s*)?(?:(?:i'?ll take|let'?s (?:do|go with)|i'?d like)\s+)?(?:the\s+)?"
+    r"(?P<ordinal>" + "|".join(re.escape(k) for k in _ORDINALS) + r"|last)"
+    r"(?:\s+(?:one|option|slot|time))?(?:[,.!]?\s*(?:please|thanks?|thank you))?[.!]*$"
+)
+_TIME = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(?![\d:]|st\b|nd\b|rd\b|th\b)"
+)
+_WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+_WEEKDAY = re.compile(r"\b(" + "|".join(_WEEKDAYS) + r")\b")
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower().replace("’", "'"))
+
+
+def match_options(
+    text: str, options: Sequence[SlotOption], tz: datetime.tzinfo
+) -> list[SlotOption]:
+    """Find the offered slots that `text` could refer to.
+
+    An answer that is just an ordinal ("the second one") picks by position;
+    mentioned weekdays and times narrow the options down. Text that names none
+    of them matches nothing.
+    """
+    text = _normalize(text)
+    if ordinal := _ORDINAL.match(text):
+        ordinal = ordinal.group("ordinal")
+        index = len(options) - 1 if ordinal == "last" else _ORDINALS[ordinal]
+        return [options[index]] if index < len(options) else []
+
+    weekdays = {_WEEKDAYS.index(day) for day in _WEEKDAY.findall(text)}
+    times = []
+    for hour, minute, meridiem in _TIME.findall(text):
+        hour, minute = int(hour), int(minute or 0)
+        if hour > 23 or minute > 59:
+            continue
+        if meridiem.startswith("p") and hour < 12:
+            hour += 12
+        elif meridiem.startswith("a") and hour == 12:
+            hour = 0
+        # Without am/pm, "2" means 2pm during clinic hours.
+        times.append(
+            {(hour, minute)}
+            if meridiem or hour >= 12
+            else {(hour, minute), (hour + 12, minute)}
+        )
+    if not weekdays and not times:
+        return []
+
+    matches = []
+    for option in options:
+        start = parse_calendar_datetime(option["start"], tz).astimezone(tz)
+        if weekdays and start.weekday() not in weekdays:
+            continue
+        if times and not any(
+            (start.hour, start.minute) in candidates for candidates in times
+        ):
+            continue
+        matches.append(option)
+    return matches
+
+
+def _previous_reply(messages: Sequence[AnyMessage]) -> Optional[AIMessage]:
+    """Get the agent's reply the latest patient message answers."""
+    for message in reversed(messages[:-1]):
+        if isinstance(message, AIMessage):
+            return None if message.tool_calls else message
+        if not isinstance(message, HumanMessage):
+            return None
+    return None
+
+
+def _proposed_slot(
+    reply: AIMessage, options: Sequence[SlotOption], tz: datetime.tzinfo
+) -> Optional[SlotOption]:
+    """Get the one slot the agent's reply proposed, if it proposed exactly one."""
+    matches = match_options(get_message_text(reply), options, tz)
+    return matches[0] if len(matches) == 1 else None
+
+
+def _offered_in(reply: AIMessage, slot: SlotOption, tz: datetime.tzinfo) -> bool:
+    """Check that the agent's reply names `slot`'s time (and its weekday, if it names any)."""
+    text = _normalize(get_message_text(reply))
+    return bool(_TIME.search(text)) and bool(match_options(text, [slot], tz))
+
+
+def _booking_call(slot: SlotOption, facts: BookingFacts, tz_name: str) -> AIMessage:
+    tz = get_timezone(tz_name)
+    start = (
+        parse_calendar_datetime(slot["start"], tz).astimezone(tz).replace(tzinfo=None)
+    )
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": BOOK_APPOINTMENT,
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "args": {
+                    "start_datetime": start.isoformat(),
+                    "timezone": tz_name,
+                    "patient_name": facts["patient_name"],
+                    "patient_email": facts["email"],
+                    "phone_number": facts["phone_number"],
+                },
+            }
+        ],
+    )
+
+
+def classify_turn(
+    messages: Sequence[AnyMessage], facts: BookingFacts, configuration: Configuration
+) -> Optional[AIMessage]:
+    """Answer the latest patient message by rule, or return None to leave it to the model."""
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    text = _normalize(get_message_text(messages[-1]))
+    if not text or len(text.split()) > _MAX_WORDS:
+        return None
+
+    booked = facts.get("booking_status") == "booked"
+    if _FAREWELL.match(text) or (booked and _THANKS.match(text)):
+        template = FAST_PATH_FAREWELL_BOOKED if booked else FAST_PATH_FAREWELL
+        return AIMessage(content=template.format(clinic_name=configuration.clinic_name))
+
+    reply = _previous_reply(messages)
+    options = facts.get("offered_slots") or []
+    if (
+        reply is None
+        or not options
+        or "booking_status" in facts
+        or _HEDGES.search(text)
+        or not all(facts.get(key) for key in ("patient_name", "email", "phone_number"))
+    ):
+        return None
+
+    tz_name = facts.get("timezone") or configuration.clinic_timezone
+    tz = get_timezone(tz_name)
+    if _AFFIRMATION.match(text):
+        slot = _proposed_slot(reply, options, tz)
+    else:
+        matches = match_options(text, options, tz)
+        slot = matches[0] if len(matches) == 1 else None
+        # Options left over from an earlier lookup must not be booked by position.
+        if slot is not None and not _offered_in(reply, slot, tz):
+            slot = None
+    return _booking_call(slot, facts, tz_name) if slot is not None else None
+
+
+async def fast_path(state: AppointmentAgentState, config: RunnableConfig):
+    """Answer trivial patient turns by rule instead of calling the model."""
+    configuration = Configuration.from_runnable_config(config)
+    if not configuration.fast_path:
+        return {}
+    message = classify_turn(state["messages"], state.get("facts") or {}, configuration)
+    return {"messages": [message]} if message is not None else {}
@@ -1,39 +1,387 @@
-"""It includes a basic Tavily search function."""
+"""This module defines the `find_slots` node, which checks calendar availability."""
 
-from dotenv import find_dotenv, load_dotenv
+import asyncio
+import datetime
+import json
+from typing import Any, Optional
 
-from langchain_core.messages import ToolMessage
+from dotenv import find_dotenv, load_dotenv
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 
-from appointment_agent.state import AppointmentAgentState
-from appointment_agent.nodes._tools import schedule_tools_set
+from appointment_agent.availability import (
+    AvailabilityCache,
+    AvailabilityIndex,
+    get_availability_cache,
+    get_availability_index,
+    parse_free_slots_args,
+)
+from appointment_agent.availability.freebusy import (
+    FreeBusyQuery,
+    Interval,
+    build_free_busy_response,
+    get_timezone,
+    parse_free_busy_response,
+)
+from appointment_agent.availability.index import busy_from_tool
+from appointment_agent.availability.prefetch import (
+    AvailabilityPrefetch,
+    get_prefetch,
+    register_prefetch,
+)
+from appointment_agent.availability.ranking import (
+    clinic_hours_from_config,
+    rank_slots,
+    summarize_ranked_slots,
+)
+from appointment_agent.availability.temporal import (
+    TemporalWindow,
+    resolve_temporal_expression,
+)
+from appointment_agent.configuration import Configuration
+from appointment_agent.nodes._tools import FIND_FREE_SLOTS, get_schedule_tools
+from appointment_agent.nodes.facts import facts_from_slot_result
+from appointment_agent.payloads import compact_tool_messages
+from appointment_agent.state import AppointmentAgentState, BookingFacts
+from appointment_agent.utils import get_message_text
 
 _: bool = load_dotenv(find_dotenv())
 
-async def find_slots(state: AppointmentAgentState):
+# Days looked up by a speculative prefetch, from the start of the requested day.
+_PREFETCH_DAYS = 3
+
+
+async def _lookup_busy(
+    tool: Any,
+    query: FreeBusyQuery,
+    args: dict[str, Any],
+    cache: Optional[AvailabilityCache],
+    index: Optional[AvailabilityIndex],
+    prefetch: Optional[AvailabilityPrefetch] = None,
+) -> tuple[Optional[dict[str, list[Interval]]], Any]:
+    """Get busy intervals for `query` from the index, a prefetch or the cache, else from the live tool.
+
+    With a cache, only the days missing from it are fetched.
+
+    Returns:
+        tuple: The busy intervals per calendar, or None together with the raw
+        tool result if the response could not be parsed.
+    """
+    busy = index.lookup(query) if index is not None else None
+    if busy is not None:
+        return busy, None
+
+    if prefetch is not None and prefetch.covers(query):
+        busy = await prefetch.busy_for(query)
+        if busy is not None:
+            return busy, None
+
+    fetch_query = query
+    if cache is not None:
+        busy, fetch_query = await cache.lookup(query)
+        if busy is not None:
+            return busy, None
+
+    # Composio tools are synchronous, so `ainvoke` runs them in a worker thread.
+    res = await tool.ainvoke(fetch_query.to_args(args))
+    busy = parse_free_busy_response(res, query.tz)
+    if busy is None:
+        # Failed or unrecognized response: pass it through uncached.
+        return None, res
+    if index is not None:
+        index.load(fetch_query, busy)
+    if cache is None:
+        return busy, None
+
+    await cache.store(fetch_query, busy)
+    # The fetched days may only be part of the query; the rest was cached.
+    cached, _ = await cache.lookup(query)
+    if cached is None:
+        return None, await tool.ainvoke(query.to_args(args))
+    return cached, None
+
+
+def _ranking_anchor(
+    query: FreeBusyQuery, requested: Optional[TemporalWindow] = None
+) -> Optional[datetime.datetime]:
+    """Get the time the patient asked for, which ranked slots are ordered around.
+
+    The window resolved from the patient's words wins over the query when it
+    falls inside it. A start at midnight covers whole days rather than a
+    requested time, so there is nothing to rank around.
     """
-    Determine if the conversation should continue to tools or end
+    # Each is checked in its own timezone: the window is in the clinic's.
+    if (
+        requested is not None
+        and requested.start.time() != datetime.time()
+        and query.start <= requested.start < query.end
+    ):
+        return requested.start
+    if query.start.astimezone(query.tz).time() != datetime.time():
+        return query.start
+    return None
+
+
+async def _lookup_free_slots(
+    tool: Any,
+    args: dict[str, Any],
+    configuration: Configuration,
+    cache: Optional[AvailabilityCache],
+    index: Optional[AvailabilityIndex],
+    requested: Optional[TemporalWindow] = None,
+    prefetch: Optional[AvailabilityPrefetch] = None,
+) -> Any:
+    """Answer a free-slot query, as ranked slots if enabled and the requested time is known.
+
+    The query is always run as the model sent it. If it misses the window the
+    patient asked for (usually by landing in the wrong week), the window is
+    returned next to the result as a hint.
     """
+    query = parse_free_slots_args(args)
+    if query is None:
+        return await tool.ainvoke(args)
+    result = await _answer_free_slots(
+        tool, query, args, configuration, cache, index, requested, prefetch
+    )
+    if requested is None or (
+        query.start < requested.end and requested.start < query.end
+    ):
+        return result
+    hint = (
+        f"The patient asked about {requested.start.isoformat()} to {requested.end.isoformat()}, "
+        "which this lookup does not cover. Check that window too if that is what they meant."
+    )
+    if isinstance(result, dict):
+        return {**result, "hint": hint}
+    return f"{result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)}\n\nHint: {hint}"
+
+
+async def _answer_free_slots(
+    tool: Any,
+    query: FreeBusyQuery,
+    args: dict[str, Any],
+    configuration: Configuration,
+    cache: Optional[AvailabilityCache],
+    index: Optional[AvailabilityIndex],
+    requested: Optional[TemporalWindow],
+    prefetch: Optional[AvailabilityPrefetch],
+) -> Any:
+    hours = clinic_hours_from_config(configuration)
+    anchor = _ranking_anchor(query, requested)
+    if not configuration.rank_slots or anchor is None:
+        busy, raw = await _lookup_busy(tool, query, args, cache, index, prefetch)
+        return raw if busy is None else build_free_busy_response(query, busy)
+
+    # Look from the start of the requested day so earlier alternatives on the
+    # same day can be offered too.
+    search = query.with_window(
+        min(query.start, hours.day_start(query.start)), query.end
+    )
+    busy, raw = await _lookup_busy(tool, search, args, cache, index, prefetch)
+    if busy is None:
+        return raw
+
+    duration = datetime.timedelta(minutes=configuration.appointment_duration_minutes)
+    slots = rank_slots(
+        requested=anchor,
+        window_start=search.start,
+        window_end=search.end,
+        busy=[interval for intervals in busy.values() for interval in intervals],
+        duration=duration,
+        hours=hours,
+        limit=configuration.slot_suggestions,
+    )
+    return summarize_ranked_slots(anchor, slots, duration, hours)
+
+
+async def _run_slot_query(
+    tool: Any,
+    call: dict[str, Any],
+    configuration: Configuration,
+    cache: Optional[AvailabilityCache],
+    index: Optional[AvailabilityIndex],
+    requested: Optional[TemporalWindow] = None,
+    prefetch: Optional[AvailabilityPrefetch] = None,
+) -> ToolMessage:
+    """Run a single free-slot lookup without blocking the event loop."""
+    tool_name = call.get("name")
+    tool_id = call.get("id")
+    timeout = configuration.find_slots_timeout_seconds
+
+    try:
+        res = await asyncio.wait_for(
+            _lookup_free_slots(
+                tool,
+                call.get("args") or {},
+                configuration,
+                cache,
+                index,
+                requested,
+                prefetch,
+            ),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        return ToolMessage(
+            name=tool_name,
+            tool_call_id=tool_id,
+            content=f"Error: the availability check timed out after {timeout:g} seconds. Please try again.",
+            status="error",
+        )
+    except Exception as e:
+        return ToolMessage(
+            name=tool_name,
+            tool_call_id=tool_id,
+            content=f"Error: {repr(e)}\n Please fix your mistakes.",
+            status="error",
+        )
+
+    return ToolMessage(
+        name=tool_name,
+        tool_call_id=tool_id,
+        content=res if isinstance(res, str) else json.dumps(res, ensure_ascii=False),
+    )
+
+
+def _requested_window(
+    messages: list[Any], configuration: Configuration
+) -> Optional[TemporalWindow]:
+    """Resolve the date or time mentioned in the patient's latest message, if any."""
+    if not configuration.resolve_dates:
+        return None
+    patient = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    if patient is None:
+        return None
+    return resolve_temporal_expression(
+        get_message_text(patient),
+        datetime.datetime.now(datetime.timezone.utc),
+        get_timezone(configuration.clinic_timezone),
+    )
+
+
+def _get_index(tool: Any, configuration: Configuration) -> Optional[AvailabilityIndex]:
+    """Get the availability index, started syncing, if it is enabled."""
+    if not configuration.availability_index:
+        return None
+    index = get_availability_index(configuration.availability_index_max_age_seconds)
+    index.ensure_sync(
+        busy_from_tool(tool),
+        configuration.availability_index_calendars,
+        configuration.availability_index_horizon_days,
+        configuration.clinic_timezone,
+        idle_seconds=configuration.availability_index_idle_seconds,
+    )
+    return index
+
+
+def _thread_id(config: RunnableConfig) -> Optional[str]:
+    thread_id = (config.get("configurable") or {}).get("thread_id")
+    return str(thread_id) if thread_id is not None else None
+
+
+async def _prefetch_busy(
+    tool: Any,
+    query: FreeBusyQuery,
+    cache: Optional[AvailabilityCache],
+    index: Optional[AvailabilityIndex],
+) -> Optional[dict[str, list[Interval]]]:
+    busy, _ = await _lookup_busy(tool, query, query.to_args(), cache, index)
+    return busy
+
+
+def start_availability_prefetch(
+    messages: list[Any], configuration: Configuration, config: RunnableConfig
+) -> Optional[AvailabilityPrefetch]:
+    """Start looking up the days the patient just mentioned, before the model asks for them.
+
+    Must be called from a running event loop. Returns the prefetch, or None if
+    the latest message names no date or time or the lookup is not needed.
+    """
+    thread_id = _thread_id(config)
+    if not configuration.prefetch_availability or thread_id is None:
+        return None
+    requested = _requested_window(messages, configuration)
+    if requested is None:
+        return None
+
+    hours = clinic_hours_from_config(configuration)
+    start = hours.day_start(requested.start)
+    query = FreeBusyQuery(
+        calendars=tuple(configuration.availability_index_calendars),
+        start=start,
+        end=max(requested.end, start + datetime.timedelta(days=_PREFETCH_DAYS)),
+        timezone=configuration.clinic_timezone,
+    )
+    current = get_prefetch(thread_id, configuration.availability_cache_ttl_seconds)
+    if current is not None and current.covers(query):
+        return current
+
+    tool = next(
+        (tool for tool in get_schedule_tools() if tool.name == FIND_FREE_SLOTS), None
+    )
+    if tool is None:
+        return None
+    index = _get_index(tool, configuration)
+    if index is not None and index.lookup(query) is not None:
+        return None
+
+    task = asyncio.create_task(
+        _prefetch_busy(tool, query, get_availability_cache(configuration), index)
+    )
+    prefetch = AvailabilityPrefetch(query, task)
+    register_prefetch(thread_id, prefetch)
+    return prefetch
+
+
+async def find_slots(state: AppointmentAgentState, config: RunnableConfig):
+    """Run every free-slot lookup requested by the last message concurrently."""
+    configuration = Configuration.from_runnable_config(config)
+    cache = get_availability_cache(configuration)
     messages = state["messages"]
     last_message = messages[-1]
 
-    tool_messages = []
+    if not (hasattr(last_message, "tool_calls") and last_message.tool_calls):
+        return {"messages": []}
+
+    find_free_slots_tool = next(
+        (tool for tool in get_schedule_tools() if tool.name == FIND_FREE_SLOTS), None
+    )
 
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-      for call in last_message.tool_calls:
-          tool_name = call.get("name")
-          tool_id = call.get("id")
-          args = call.get("args")
+    index = _get_index(find_free_slots_tool, configuration)
 
-          find_free_slots_tool = next((tool for tool in schedule_tools_set if tool.name == tool_name), None)
+    calls = [
+        call for call in last_message.tool_calls if call.get("name") == FIND_FREE_SLOTS
+    ]
+    requested = _requested_window(messages, configuration)
+    thread_id = _thread_id(config)
+    prefetch = (
+        get_prefetch(thread_id, configuration.availability_cache_ttl_seconds)
+        if configuration.prefetch_availability and thread_id is not None
+        else None
+    )
 
-          if tool_name == "GOOGLECALENDAR_FIND_FREE_SLOTS":
-              res = find_free_slots_tool.invoke(args)
-              tool_msg = ToolMessage(
-                    name=tool_name,
-                    tool_call_id=tool_id,
-                    content=res,
-                )
-              tool_messages.append(tool_msg)
-              
-    return {"messages": tool_messages}
+    tool_messages = await asyncio.gather(
+        *(
+            _run_slot_query(
+                find_free_slots_tool,
+                call,
+                configuration,
+                cache,
+                index,
+                requested,
+                prefetch,
+            )
+            for call in calls
+        )
+    )
 
+    update = {"messages": await compact_tool_messages(tool_messages, configuration)}
+    # The last ranked answer is what the patient was just offered; after an
+    # unranked answer, the options of an earlier lookup are no longer on offer.
+    update["facts"] = BookingFacts(offered_slots=[])
+    for message in reversed(tool_messages):
+        facts = facts_from_slot_result(message.content)
+        if facts is not None:
+            update["facts"] = facts
+            break
+    return update
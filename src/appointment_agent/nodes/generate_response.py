@@ -1,29 +1,50 @@
 """This module contains the `generate_response` function which is responsible for generating a response."""
 
-from typing import cast
-import datetime
+import functools
+from typing import Any, cast
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import AIMessage, trim_messages
+from langchain_core.messages import AIMessage, HumanMessage, trim_messages
 from langchain_core.runnables import RunnableConfig
+from langchain_google_genai import ChatGoogleGenerativeAI
 
+from appointment_agent.configuration import Configuration
+from appointment_agent.nodes._tools import get_schedule_tools
+from appointment_agent.nodes.find_slots import start_availability_prefetch
+from appointment_agent.prompt_cache import assemble_prompt, get_gemini_cached_content
 from appointment_agent.state import AppointmentAgentState
-from appointment_agent.prompts import AGENT_SYSTEM
-from appointment_agent.nodes._tools import schedule_tools_set
-
+from appointment_agent.tools.book_appointment import BookAppointmentRequest
+from appointment_agent.tools.fetch_tool_payload import fetch_tool_payload
 from appointment_agent.tools.make_confirmation_call import make_confirmation_call
+from react_agent.utils import count_message_tokens
+
+
+@functools.lru_cache(maxsize=1)
+def get_model() -> ChatGoogleGenerativeAI:
+    """Create the chat model on first use rather than at import time."""
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp")
+    # return ChatOpenAI(model="gpt-4o", temperature=1)
+
+
+def get_agent_tools() -> list[Any]:
+    """Get every tool the agent can call."""
+    return get_schedule_tools() + [
+        make_confirmation_call,
+        BookAppointmentRequest,
+        fetch_tool_payload,
+    ]
 
-model = ChatGoogleGenerativeAI(model = "gemini-2.0-flash-exp")
-# model = ChatOpenAI(model="gpt-4o", temperature=1)
 
-# Bind tools to the model
-model_with_tools = model.bind_tools(schedule_tools_set + [make_confirmation_call])
+@functools.lru_cache(maxsize=1)
+def get_model_with_tools() -> Any:
+    """Bind tools to the model."""
+    return get_model().bind_tools(get_agent_tools())
+
 
 async def generate_response(
     state: AppointmentAgentState, config: RunnableConfig
 ) -> dict[str, list[AIMessage]]:
     """Generate a response based on the given state and configuration.
-    
+
     Args:
         state (AppointmentAgentState): The current state of the react graph.
         config (RunnableConfig): The configuration for running the model.
@@ -31,25 +52,54 @@ async def generate_response(
     Returns:
         dict[str, list[AIMessage]]: A dictionary containing the model's response messages.
     """
+    configuration = Configuration.from_runnable_config(config)
+
+    # A mentioned date usually means a free-slot lookup comes next; start it now
+    # so it runs while the model is generating.
+    if state["messages"] and isinstance(state["messages"][-1], HumanMessage):
+        start_availability_prefetch(state["messages"], configuration, config)
 
-    # Format the system prompt. Customize this to change the agent's behavior.
-    today_datetime = datetime.datetime.now().isoformat()
-    system_message = AGENT_SYSTEM.format(today_datetime=today_datetime)
+    # The system prompt is static so the provider can cache it; per-call details
+    # are sent in a trailing call-context segment.
+    system_message = configuration.system_prompt
 
     trimmedStateMessages = trim_messages(
         state["messages"],
         max_tokens=60000,  # adjust for model's context window minus system & files message
         strategy="last",
-        token_counter=model,
+        token_counter=count_message_tokens,
         include_system=False,  # Not needed since systemMessage is added separately
         allow_partial=True,
     )
 
+    cached_content = None
+    if configuration.prompt_cache == "gemini":
+        cached_content = await get_gemini_cached_content(
+            get_model(),
+            system_message,
+            get_agent_tools(),
+            configuration.prompt_cache_ttl_seconds,
+        )
+
+    # With a context cache the prompt and tools already live on the provider side.
+    runnable = (
+        get_model().bind(cached_content=cached_content)
+        if cached_content
+        else get_model_with_tools()
+    )
+
     # Get the model's response
     response = cast(
         AIMessage,
-        await model_with_tools.ainvoke(
-            [{"role": "system", "content": system_message}, *trimmedStateMessages],
+        await runnable.ainvoke(
+            assemble_prompt(
+                system_message,
+                trimmedStateMessages,
+                configuration,
+                cached_content,
+                state.get("summary"),
+                state.get("facts"),
+            ),
             config,
         ),
     )
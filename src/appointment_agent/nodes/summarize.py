@@ -0,0 +1,141 @@
+"""This module defines the `summarize_conversation` node, which bounds the prompt size.
+
+Without it the whole call is re-sent to the model every turn until
+`trim_messages` starts cutting turns off, by which point the model has lost the
+early details (the email, the agreed slot). Once the conversation grows past
+`summarize_after_tokens`, the older turns are folded into a structured running
+summary kept in state, and removed from the message list. The model gets the
+summary in its call context and the recent turns verbatim, so the prompt stays
+roughly the same size however long the call runs.
+"""
+
+import functools
+import logging
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+from pydantic import BaseModel, Field
+
+from appointment_agent.configuration import Configuration
+from appointment_agent.prompt_cache import render_summary
+from appointment_agent.prompts import SUMMARY_SYSTEM
+from appointment_agent.state import AppointmentAgentState, ConversationSummary
+from appointment_agent.utils import get_message_text
+from react_agent.utils import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Longest tool result quoted in the transcript handed to the summarizer.
+_MAX_TOOL_RESULT_CHARS = 500
+
+
+class RunningSummary(BaseModel):
+    """Running summary of a scheduling call."""
+
+    patient: Optional[str] = Field(
+        default=None,
+        description="Patient's name, email and phone number, as far as known.",
+    )
+    requested_slot: Optional[str] = Field(
+        default=None,
+        description="Day and time the patient asked for or agreed to, with timezone.",
+    )
+    booking_status: Optional[str] = Field(
+        default=None,
+        description="Whether the appointment is booked (with its time and event id), pending or not started.",
+    )
+    notes: Optional[str] = Field(
+        default=None,
+        description="Anything else needed to finish the call, e.g. the reason for the visit.",
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_summary_model() -> Any:
+    """Get the chat model used to write summaries, with structured output."""
+    from appointment_agent.nodes.generate_response import get_model
+
+    return get_model().with_structured_output(RunningSummary)
+
+
+def split_for_summary(messages: Sequence[AnyMessage], keep_tokens: int) -> int:
+    """Find where the verbatim window starts; messages before it are summarized.
+
+    The window always starts at a patient turn, so a tool call is never
+    separated from its result, and always holds at least the latest turn.
+    Returns 0 if there is nothing to fold.
+    """
+    turns = [
+        i for i, message in enumerate(messages) if isinstance(message, HumanMessage)
+    ]
+    cut = 0
+    for start in reversed(turns):
+        if cut and count_message_tokens(messages[start:]) > keep_tokens:
+            break
+        cut = start
+    return cut
+
+
+def render_transcript(messages: Sequence[AnyMessage]) -> str:
+    """Render messages as a plain transcript for the summarizer."""
+    lines = []
+    for message in messages:
+        text = get_message_text(message)
+        if isinstance(message, HumanMessage):
+            lines.append(f"Patient: {text}")
+        elif isinstance(message, AIMessage):
+            if text:
+                lines.append(f"Sam: {text}")
+            for call in message.tool_calls:
+                lines.append(f"Sam called {call['name']} with {call['args']}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Result of {message.name}: {text[:_MAX_TOOL_RESULT_CHARS]}")
+    return "\n".join(lines)
+
+
+async def summarize_conversation(state: AppointmentAgentState, config: RunnableConfig):
+    """Fold the older turns into the running summary once the conversation gets long."""
+    configuration = Configuration.from_runnable_config(config)
+    messages = state["messages"]
+    if (
+        not configuration.summarize_after_tokens
+        or count_message_tokens(messages) <= configuration.summarize_after_tokens
+    ):
+        return {}
+
+    cut = split_for_summary(messages, configuration.summary_keep_tokens)
+    if cut == 0:
+        return {}
+
+    folded = messages[:cut]
+    try:
+        summary = await get_summary_model().ainvoke(
+            [
+                SystemMessage(
+                    content=SUMMARY_SYSTEM.format(
+                        previous=render_summary(state.get("summary")) or "(none)"
+                    )
+                ),
+                HumanMessage(content=render_transcript(folded)),
+            ],
+            # Not part of the reply, so keep it out of the streamed tokens.
+            {**config, "tags": [*(config.get("tags") or []), TAG_NOSTREAM]},
+        )
+    except Exception:
+        # trim_messages still bounds the prompt; try again next turn.
+        logger.warning("Could not summarize the conversation", exc_info=True)
+        return {}
+
+    return {
+        "summary": ConversationSummary(**summary.model_dump()),
+        "messages": [RemoveMessage(id=message.id) for message in folded],
+    }
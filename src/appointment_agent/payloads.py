@@ -0,0 +1,175 @@
+"""Compact tool results, with the raw payloads kept in a side store.
+
+Composio responses carry far more than the agent needs (request echoes, links,
+every attendee field), and a `ToolMessage` holding one is re-sent with every
+later prompt and written into every checkpoint. Large results are therefore
+replaced by a short summary of the fields the agent acts on. The raw payload is
+stored under a content-addressed reference (`payload_ref`), which the model can
+pass to the `fetch_tool_payload` tool if it ever needs the details.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from appointment_agent.configuration import Configuration
+from appointment_agent.kv import KeyValueStore, get_key_value_store
+from appointment_agent.utils import parse_tool_result
+
+FETCH_TOOL_PAYLOAD = "fetch_tool_payload"
+
+# Longest error text kept in a summary.
+_MAX_ERROR_CHARS = 300
+# Most busy intervals listed per calendar in a free/busy summary.
+_MAX_BUSY_INTERVALS = 20
+
+
+class PayloadStore:
+    """Content-addressed store of raw tool payloads in a `KeyValueStore`."""
+
+    def __init__(
+        self, store: KeyValueStore, ttl_seconds: float, prefix: str = "payload"
+    ) -> None:
+        """Keep payloads in `store` for `ttl_seconds`."""
+        self._store = store
+        self._ttl_seconds = ttl_seconds
+        self._prefix = prefix
+
+    @staticmethod
+    def ref(payload: str) -> str:
+        """Get the reference of a payload; equal payloads share one."""
+        return "sha256:" + hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    async def put(self, payload: str) -> str:
+        """Store a payload and return its reference."""
+        ref = self.ref(payload)
+        await self._store.set_many(
+            {f"{self._prefix}:{ref}": payload}, self._ttl_seconds
+        )
+        return ref
+
+    async def get(self, ref: str) -> Optional[str]:
+        """Get a stored payload, None if unknown or expired."""
+        (payload,) = await self._store.get_many([f"{self._prefix}:{ref}"])
+        return payload
+
+
+def get_payload_store(configuration: Configuration) -> Optional[PayloadStore]:
+    """Get the payload store selected by the configuration, if any."""
+    store = get_key_value_store(configuration.payload_store)
+    if store is None:
+        return None
+    return PayloadStore(store, configuration.payload_ttl_seconds)
+
+
+def _response_data(data: dict[str, Any]) -> dict[str, Any]:
+    inner = data.get("data")
+    if isinstance(inner, dict):
+        response = inner.get("response_data", inner)
+        if isinstance(response, dict):
+            return response
+    return {}
+
+
+def _summarize_free_busy(response: dict[str, Any]) -> dict[str, Any]:
+    summary: dict[str, Any] = {
+        "timeMin": response.get("timeMin"),
+        "timeMax": response.get("timeMax"),
+    }
+    busy: dict[str, Any] = {}
+    for calendar, value in (response.get("calendars") or {}).items():
+        intervals = (value or {}).get("busy") or []
+        busy[calendar] = [
+            [interval.get("start"), interval.get("end")]
+            for interval in intervals[:_MAX_BUSY_INTERVALS]
+            if isinstance(interval, dict)
+        ]
+        if len(intervals) > _MAX_BUSY_INTERVALS:
+            busy[f"{calendar}:more"] = len(intervals) - _MAX_BUSY_INTERVALS
+    summary["busy"] = busy
+    return summary
+
+
+def _event_time(value: Any) -> Any:
+    return (
+        value.get("dateTime") or value.get("date") if isinstance(value, dict) else value
+    )
+
+
+def _summarize_event(response: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "event_id": response.get("id"),
+        "status": response.get("status"),
+        "start": _event_time(response.get("start")),
+        "end": _event_time(response.get("end")),
+    }
+
+
+def _summarize_draft(response: dict[str, Any]) -> dict[str, Any]:
+    return {"draft_id": response.get("id")}
+
+
+_SUMMARIZERS: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+    "GOOGLECALENDAR_FIND_FREE_SLOTS": _summarize_free_busy,
+    "GOOGLECALENDAR_CREATE_EVENT": _summarize_event,
+    "GMAIL_CREATE_EMAIL_DRAFT": _summarize_draft,
+}
+
+
+def summarize_tool_result(
+    name: Optional[str], content: Any
+) -> Optional[dict[str, Any]]:
+    """Reduce a Composio result to the fields the agent acts on; None if it isn't one."""
+    data = parse_tool_result(content)
+    if data is None or not ({"successful", "successfull", "error"} & data.keys()):
+        return None
+    successful = bool(data.get("successful", data.get("successfull"))) and not data.get(
+        "error"
+    )
+    if not successful:
+        error = data.get("error") or data.get("message") or "unknown error"
+        return {"successful": False, "error": str(error)[:_MAX_ERROR_CHARS]}
+    summarize = _SUMMARIZERS.get(name or "")
+    response = _response_data(data)
+    if summarize is not None:
+        return {"successful": True, **summarize(response)}
+    return {"successful": True, **({"id": response["id"]} if "id" in response else {})}
+
+
+async def compact_tool_message(
+    message: ToolMessage, store: PayloadStore, max_chars: int
+) -> ToolMessage:
+    """Replace a large tool result by its summary and a reference to the stored payload."""
+    content = message.content
+    if (
+        message.name == FETCH_TOOL_PAYLOAD
+        or not isinstance(content, str)
+        or len(content) <= max_chars
+    ):
+        return message
+    summary = summarize_tool_result(message.name, content)
+    if summary is None:
+        return message
+    summary["payload_ref"] = await store.put(content)
+    return message.model_copy(
+        update={"content": json.dumps(summary, ensure_ascii=False)}
+    )
+
+
+async def compact_tool_messages(
+    messages: Sequence[BaseMessage], configuration: Configuration
+) -> list[BaseMessage]:
+    """Compact every large tool result in `messages`, if a payload store is configured."""
+    store = get_payload_store(configuration)
+    if store is None:
+        return list(messages)
+    return [
+        await compact_tool_message(message, store, configuration.tool_result_max_chars)
+        if isinstance(message, ToolMessage)
+        else message
+        for message in messages
+    ]
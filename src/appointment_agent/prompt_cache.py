@@ -0,0 +1,190 @@
+"""Prompt assembly that keeps the system prompt cacheable by the provider.
+
+The system prompt and the tool schemas form a large prefix that is identical for
+every turn of every call. Keeping it byte-stable lets provider-side prefix caches
+hit; everything that changes per call (time, caller, clinic) is rendered into a
+small trailing call-context segment instead.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage
+
+from appointment_agent.availability.freebusy import get_timezone
+from appointment_agent.configuration import Configuration
+from appointment_agent.prompts import (
+    AGENT_BOOKING_FACTS,
+    AGENT_CALL_CONTEXT,
+    AGENT_CONVERSATION_SUMMARY,
+)
+from appointment_agent.state import BookingFacts, ConversationSummary
+
+logger = logging.getLogger(__name__)
+
+# Re-create a Gemini context cache this long before it expires.
+_REFRESH_MARGIN_SECONDS = 60
+
+# After a failed registration, don't retry for this long (e.g. prompt below the
+# provider's minimum cacheable size, or a model without caching support).
+_RETRY_AFTER_SECONDS = 300
+
+# cache key -> (cached content name, monotonic expiry)
+_gemini_caches: dict[tuple[Any, ...], tuple[str, float]] = {}
+_gemini_failures: dict[tuple[Any, ...], float] = {}
+_gemini_pending: dict[tuple[Any, ...], "asyncio.Task[Optional[str]]"] = {}
+
+
+def render_call_context(
+    configuration: Configuration,
+    summary: Optional[ConversationSummary] = None,
+    facts: Optional[BookingFacts] = None,
+) -> str:
+    """Render the volatile, per-call part of the system prompt.
+
+    The time is given in the clinic's timezone, the one dates are resolved in,
+    and truncated to the minute so that consecutive turns of a call usually
+    produce the same segment as well. The known booking facts and the
+    running summary of the earlier turns, if any, are appended.
+    """
+    tz = get_timezone(configuration.clinic_timezone)
+    now = datetime.datetime.now(tz).replace(second=0, microsecond=0)
+    context = AGENT_CALL_CONTEXT.format(
+        today_datetime=now.isoformat(),
+        timezone=configuration.clinic_timezone,
+        clinic_name=configuration.clinic_name,
+        caller=configuration.user_id or "unknown",
+    )
+    return context + render_facts(facts) + render_summary(summary)
+
+
+def render_facts(facts: Optional[BookingFacts]) -> str:
+    """Render the known booking facts as a short block; empty if none are known."""
+    if not facts:
+        return ""
+    lines = []
+    for key, value in facts.items():
+        if key == "offered_slots":
+            value = "; ".join(slot.get("label") or slot["start"] for slot in value)
+        elif key == "requested_window":
+            value = f"{value['start']} to {value['end']}"
+        if value:
+            lines.append(f"- {key.replace('_', ' ')}: {value}")
+    return AGENT_BOOKING_FACTS.format(facts="\n".join(lines)) if lines else ""
+
+
+def render_summary(summary: Optional[ConversationSummary]) -> str:
+    """Render the running summary of the earlier turns; empty if there is none."""
+    if not summary:
+        return ""
+    return AGENT_CONVERSATION_SUMMARY.format(
+        **{
+            field: summary.get(field) or "unknown"
+            for field in ("patient", "requested_slot", "booking_status", "notes")
+        }
+    )
+
+
+def assemble_prompt(
+    system_prompt: str,
+    messages: Sequence[AnyMessage],
+    configuration: Configuration,
+    cached_content: Optional[str] = None,
+    summary: Optional[ConversationSummary] = None,
+    facts: Optional[BookingFacts] = None,
+) -> list[AnyMessage]:
+    """Build the model input with the static prompt first and the call context last.
+
+    Args:
+        system_prompt (str): The static system prompt.
+        messages (Sequence[AnyMessage]): The (trimmed) conversation history.
+        configuration (Configuration): The configuration for the current run.
+        cached_content (Optional[str]): Name of a Gemini context cache holding the
+            static prompt and tools. Gemini rejects system instructions next to
+            cached content, so the call context is sent as a leading user turn.
+        summary (Optional[ConversationSummary]): Running summary of the turns no
+            longer in `messages`.
+        facts (Optional[BookingFacts]): What is known about the booking so far.
+    """
+    call_context = render_call_context(configuration, summary, facts)
+    if cached_content:
+        return [HumanMessage(content=call_context), *messages]
+    return [
+        SystemMessage(content=system_prompt),
+        *messages,
+        SystemMessage(content=call_context),
+    ]
+
+
+async def get_gemini_cached_content(
+    model: Any, system_prompt: str, tools: Sequence[Any], ttl_seconds: int
+) -> Optional[str]:
+    """Return the name of a Gemini context cache for the static prompt prefix.
+
+    The cache is registered once per process (per model, prompt and tool set)
+    and re-created shortly before it expires. Returns None if registration
+    fails, in which case callers should fall back to sending the full prompt.
+
+    Args:
+        model: A `ChatGoogleGenerativeAI` instance.
+        system_prompt (str): The static system prompt.
+        tools (Sequence[Any]): The tools the model would otherwise be bound to.
+        ttl_seconds (int): Lifetime of the cache.
+    """
+    key = (
+        model.model,
+        system_prompt,
+        tuple(getattr(t, "name", repr(t)) for t in tools),
+    )
+    now = time.monotonic()
+
+    entry = _gemini_caches.get(key)
+    if entry and entry[1] - _REFRESH_MARGIN_SECONDS > now:
+        return entry[0]
+    if _gemini_failures.get(key, 0.0) > now:
+        return None
+
+    # Concurrent turns share a single registration request.
+    pending = _gemini_pending.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(
+            _create_gemini_cache(key, model, system_prompt, tools, ttl_seconds)
+        )
+        _gemini_pending[key] = pending
+        pending.add_done_callback(lambda _: _gemini_pending.pop(key, None))
+    return await asyncio.shield(pending)
+
+
+async def _create_gemini_cache(
+    key: tuple[Any, ...],
+    model: Any,
+    system_prompt: str,
+    tools: Sequence[Any],
+    ttl_seconds: int,
+) -> Optional[str]:
+    """Register the static prompt and tool schemas with Gemini context caching."""
+    from google.genai import types
+    from langchain_google_genai._function_utils import (
+        convert_to_genai_function_declarations,
+    )
+
+    try:
+        cache = await model.client.aio.caches.create(
+            model=model.model,
+            config=types.CreateCachedContentConfig(
+                display_name="appointment-agent-system-prompt",
+                system_instruction=system_prompt,
+                tools=convert_to_genai_function_declarations(tools),
+                ttl=f"{ttl_seconds}s",
+            ),
+        )
+    except Exception:
+        logger.warning("Could not register Gemini context cache", exc_info=True)
+        _gemini_failures[key] = time.monotonic() + _RETRY_AFTER_SECONDS
+        return None
+
+    _gemini_caches[key] = (cache.name, time.monotonic() + ttl_seconds)
+    return cache.name
@@ -2,8 +2,72 @@
 
 from __future__ import annotations
 
+from typing import Any, Optional
+
 from langgraph.graph import MessagesState
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+
+class ConversationSummary(TypedDict, total=False):
+    """Running summary of the turns folded out of the message window."""
+
+    patient: Optional[str]
+    requested_slot: Optional[str]
+    booking_status: Optional[str]
+    notes: Optional[str]
+
+
+class SlotOption(TypedDict):
+    """A bookable slot offered to the patient."""
+
+    start: str
+    end: str
+    label: str
+
+
+class RequestedWindow(TypedDict):
+    """When the patient asked to come in, resolved from what they said."""
+
+    start: str
+    end: str
+
+
+class BookingFacts(TypedDict, total=False):
+    """What the agent has learned about the booking so far."""
+
+    patient_name: str
+    email: str
+    phone_number: str
+    requested_slot: str
+    """Start of the slot the patient last asked for (ISO format)."""
+    requested_window: RequestedWindow
+    """Window the patient's latest mention of a date or time resolves to."""
+    timezone: str
+    offered_slots: list[SlotOption]
+    """Slots offered by the last availability check, best first."""
+    chosen_slot: str
+    """Start of the slot being booked (ISO format)."""
+    event_id: str
+    booking_status: str
+    """"booked", "failed" or "in_progress"."""
+
+
+def merge_facts(
+    left: Optional[BookingFacts], right: Optional[BookingFacts]
+) -> BookingFacts:
+    """Merge fact updates; later values win and None never erases a known fact."""
+    merged: dict[str, Any] = dict(left or {})
+    merged.update(
+        {key: value for key, value in (right or {}).items() if value is not None}
+    )
+    return BookingFacts(**merged)
 
 
 class AppointmentAgentState(MessagesState):
-    pass
\ No newline at end of file
+    """The state of the appointment agent's graph."""
+
+    summary: NotRequired[ConversationSummary]
+    """Summary of the earlier part of the call, kept up to date by `summarize_conversation`."""
+
+    facts: NotRequired[Annotated[BookingFacts, merge_facts]]
+    """Booking facts, filled in by `extract_facts` and the tool nodes."""
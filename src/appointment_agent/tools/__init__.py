@@ -1,6 +1,7 @@
 """This package contains the nodes for the react agent."""
 
-from appointment_agent.tools.user_profile_finder import user_profile_finder
+from appointment_agent.tools.fetch_tool_payload import fetch_tool_payload
 from appointment_agent.tools.make_confirmation_call import make_confirmation_call
+from appointment_agent.tools.user_profile_finder import user_profile_finder
 
-__all__ = ["user_profile_finder", "make_confirmation_call"]
+__all__ = ["user_profile_finder", "make_confirmation_call", "fetch_tool_payload"]
@@ -0,0 +1,42 @@
+"""Schema of the `book_appointment` tool.
+
+The model calls it once the patient has agreed on a slot; the `book_appointment`
+node then creates the event, prepares the confirmation email and places the
+confirmation call in one step.
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+BOOK_APPOINTMENT = "book_appointment"
+
+
+class BookAppointmentRequest(BaseModel):
+    """Book an appointment the patient agreed to.
+
+    Creates the calendar event, prepares the confirmation email and, if a phone
+    number is given, places the confirmation call.
+    """
+
+    model_config = ConfigDict(title=BOOK_APPOINTMENT)
+
+    start_datetime: str = Field(
+        description="Start of the appointment in ISO format, e.g. 2025-01-30T19:00:00."
+    )
+    timezone: str = Field(default="UTC", description="Timezone of start_datetime.")
+    duration_minutes: Optional[int] = Field(
+        default=None,
+        description="Length of the appointment; the clinic default if omitted.",
+    )
+    patient_name: str = Field(description="Full name of the patient.")
+    patient_email: str = Field(description="Email address of the patient.")
+    phone_number: Optional[str] = Field(
+        default=None,
+        description="Phone number for the confirmation call, in E.164 format.",
+    )
+    reason: Optional[str] = Field(default=None, description="Reason for the visit.")
+    call_instructions: Optional[str] = Field(
+        default=None,
+        description="Additional instructions to read out in the confirmation call.",
+    )
@@ -0,0 +1,118 @@
+"""Load Composio tools from a local schema snapshot.
+
+`ComposioToolSet.get_tools` fetches every action schema from the Composio API,
+which makes importing the graph slow and fails outright when Composio is
+unreachable. Instead, the schemas are fetched once, written to a snapshot file
+keyed by the Composio version and the requested actions, and the tools are
+built from that snapshot. Actions are still executed through Composio.
+
+Set `COMPOSIO_SCHEMA_CACHE_DIR` to choose where snapshots live (for example a
+directory baked into the container image).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.tools import StructuredTool
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes.
+SNAPSHOT_FORMAT = 1
+
+_toolset: Optional[Any] = None
+_toolset_lock = threading.Lock()
+
+
+def get_composio_toolset() -> Any:
+    """Get the process-wide `ComposioToolSet`, creating it on first use."""
+    global _toolset
+    with _toolset_lock:
+        if _toolset is None:
+            from composio_langgraph import ComposioToolSet
+
+            _toolset = ComposioToolSet(api_key=os.getenv("COMPOSIO_API_KEY"))
+        return _toolset
+
+
+def _snapshot_path(action_names: Sequence[str]) -> Path:
+    import composio
+
+    directory = Path(
+        os.getenv("COMPOSIO_SCHEMA_CACHE_DIR")
+        or Path.home() / ".cache" / "appointment_agent"
+    )
+    digest = hashlib.sha256(
+        json.dumps([SNAPSHOT_FORMAT, sorted(action_names)]).encode()
+    ).hexdigest()[:16]
+    return directory / f"composio-schemas-{composio.__version__}-{digest}.json"
+
+
+def _read_snapshot(path: Path) -> Optional[list[dict[str, Any]]]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return data.get("schemas")
+
+
+def _write_snapshot(path: Path, schemas: list[dict[str, Any]]) -> None:
+    """Write the snapshot atomically so concurrent workers never read half a file."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False) as f:
+            json.dump({"format": SNAPSHOT_FORMAT, "schemas": schemas}, f)
+        os.replace(f.name, path)
+    except OSError:
+        logger.warning(
+            "Could not write Composio schema snapshot to %s", path, exc_info=True
+        )
+
+
+def load_action_schemas(actions: Sequence[Any]) -> list[dict[str, Any]]:
+    """Get the schemas of `actions` from the snapshot, fetching them if missing."""
+    names = [getattr(action, "slug", None) or str(action) for action in actions]
+    path = _snapshot_path(names)
+    schemas = _read_snapshot(path)
+    if schemas is None:
+        logger.info("Fetching Composio schemas for %s", ", ".join(names))
+        schemas = [
+            schema.model_dump(exclude_none=True)
+            for schema in get_composio_toolset().get_action_schemas(actions=actions)
+        ]
+        _write_snapshot(path, schemas)
+    return schemas
+
+
+def _tool_from_schema(schema: dict[str, Any]) -> StructuredTool:
+    """Build a LangChain tool that executes a Composio action."""
+    from composio.utils.shared import json_schema_to_model
+
+    action = schema["name"]
+
+    def execute(**kwargs: Any) -> dict[str, Any]:
+        return get_composio_toolset().execute_action(action=action, params=kwargs)
+
+    return StructuredTool.from_function(
+        func=execute,
+        name=action,
+        description=schema["description"],
+        args_schema=json_schema_to_model(json_schema=schema["parameters"]),
+        handle_tool_error=True,
+        handle_validation_error=True,
+    )
+
+
+def load_composio_tools(actions: Sequence[Any]) -> list[StructuredTool]:
+    """Build LangChain tools for `actions` from the local schema snapshot."""
+    return [_tool_from_schema(schema) for schema in load_action_schemas(actions)]
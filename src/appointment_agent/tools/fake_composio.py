@@ -0,0 +1,357 @@
+"""Offline stand-ins for the Composio tools used by the appointment agent.
+
+Set `COMPOSIO_FAKE_TOOLS=1` to serve `GOOGLECALENDAR_FIND_FREE_SLOTS`,
+`GOOGLECALENDAR_CREATE_EVENT`, `GOOGLECALENDAR_FIND_EVENT`,
+`GMAIL_CREATE_EMAIL_DRAFT` and `GMAIL_DELETE_DRAFT` from an in-memory calendar
+instead of Composio, e.g. to run the graph in tests or to benchmark it without
+network access. Responses mimic the Composio payloads. Latency and
+failures can be injected with:
+
+- `COMPOSIO_FAKE_LATENCY_MS`: mean latency of every call (default 0).
+- `COMPOSIO_FAKE_JITTER_MS`: uniform jitter added on top (default 0).
+- `COMPOSIO_FAKE_FAILURE_RATE`: probability that a call fails (default 0).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import itertools
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from appointment_agent.availability.freebusy import (
+    DEFAULT_CALENDAR,
+    Interval,
+    build_free_busy_response,
+    get_timezone,
+    parse_calendar_datetime,
+    parse_free_slots_args,
+)
+
+
+@dataclass
+class FakeEvent:
+    """An event in the fake calendar."""
+
+    id: str
+    start: datetime.datetime
+    end: datetime.datetime
+    summary: str = ""
+    description: str = ""
+    attendees: list[str] = field(default_factory=list)
+
+
+class FakeCalendar:
+    """In-memory calendars and mailbox backing the fake tools."""
+
+    def __init__(self) -> None:
+        """Create empty calendars and an empty mailbox."""
+        self.events: dict[str, list[FakeEvent]] = {}
+        self.drafts: list[dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self, prefix: str) -> str:
+        """Return a new unique identifier."""
+        return f"{prefix}{next(self._ids)}"
+
+    def add_event(self, calendars: list[str], event: FakeEvent) -> None:
+        """Add `event` to each of `calendars`."""
+        with self._lock:
+            for calendar in calendars:
+                self.events.setdefault(calendar, []).append(event)
+
+    def busy(
+        self, calendar: str, start: datetime.datetime, end: datetime.datetime
+    ) -> list[Interval]:
+        """Return the busy intervals of `calendar` overlapping `[start, end)`."""
+        with self._lock:
+            events = list(self.events.get(calendar, []))
+        return sorted(
+            (e.start, e.end) for e in events if e.end > start and e.start < end
+        )
+
+
+_default_calendar: Optional[FakeCalendar] = None
+_default_calendar_lock = threading.Lock()
+
+
+def get_fake_calendar() -> FakeCalendar:
+    """Get the process-wide calendar shared by fake tools created without one."""
+    global _default_calendar
+    with _default_calendar_lock:
+        if _default_calendar is None:
+            _default_calendar = FakeCalendar()
+        return _default_calendar
+
+
+@dataclass
+class FakeToolsetConfig:
+    """Latency and failure injection for the fake tools."""
+
+    latency_seconds: float = 0.0
+    jitter_seconds: float = 0.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> FakeToolsetConfig:
+        """Read the configuration from the `COMPOSIO_FAKE_*` environment variables."""
+        return cls(
+            latency_seconds=float(os.getenv("COMPOSIO_FAKE_LATENCY_MS", "0")) / 1000,
+            jitter_seconds=float(os.getenv("COMPOSIO_FAKE_JITTER_MS", "0")) / 1000,
+            failure_rate=float(os.getenv("COMPOSIO_FAKE_FAILURE_RATE", "0")),
+        )
+
+
+class FindFreeSlotsRequest(BaseModel):
+    """Arguments of `GOOGLECALENDAR_FIND_FREE_SLOTS`."""
+
+    time_min: str = Field(
+        description="Start of the interval, e.g. 2025,01,30,18,00,00."
+    )
+    time_max: str = Field(description="End of the interval, e.g. 2025,02,02,18,00,00.")
+    timezone: str = Field(default="UTC", description="Timezone of the interval.")
+    items: list[str] = Field(
+        default_factory=lambda: [DEFAULT_CALENDAR], description="Calendar ids to query."
+    )
+
+
+class CreateEventRequest(BaseModel):
+    """Arguments of `GOOGLECALENDAR_CREATE_EVENT`."""
+
+    start_datetime: str = Field(
+        description="Start of the event, e.g. 2025-01-30T19:00:00."
+    )
+    event_duration_hour: int = Field(default=0, description="Event duration in hours.")
+    event_duration_minutes: int = Field(
+        default=30, description="Event duration in minutes."
+    )
+    timezone: Optional[str] = Field(default=None, description="Timezone of the event.")
+    summary: Optional[str] = Field(default=None, description="Title of the event.")
+    description: Optional[str] = Field(
+        default=None, description="Description of the event."
+    )
+    attendees: Optional[list[str]] = Field(default=None, description="Attendee emails.")
+    calendar_id: str = Field(
+        default=DEFAULT_CALENDAR, description="Calendar to create the event in."
+    )
+
+
+class FindEventRequest(BaseModel):
+    """Arguments of `GOOGLECALENDAR_FIND_EVENT`."""
+
+    calendar_id: str = Field(
+        default=DEFAULT_CALENDAR, description="Calendar to search."
+    )
+    timeMin: Optional[str] = Field(
+        default=None, description="Lower bound of the event end, RFC3339."
+    )
+    timeMax: Optional[str] = Field(
+        default=None, description="Upper bound of the event start, RFC3339."
+    )
+    single_events: bool = Field(default=True, description="Expand recurring events.")
+    order_by: Optional[str] = Field(
+        default=None, description="Sort order, e.g. startTime."
+    )
+    max_results: int = Field(
+        default=10, description="Maximum number of events returned."
+    )
+
+
+class CreateEmailDraftRequest(BaseModel):
+    """Arguments of `GMAIL_CREATE_EMAIL_DRAFT`."""
+
+    recipient_email: str = Field(description="Email address of the recipient.")
+    subject: str = Field(description="Subject of the email.")
+    body: str = Field(description="Body of the email.")
+
+
+class DeleteDraftRequest(BaseModel):
+    """Arguments of `GMAIL_DELETE_DRAFT`."""
+
+    draft_id: str = Field(description="Id of the draft to delete.")
+
+
+def _ok(data: dict[str, Any]) -> dict[str, Any]:
+    return {"successfull": True, "data": {"response_data": data}, "error": None}
+
+
+def _failure(action: str) -> dict[str, Any]:
+    return {"successfull": False, "data": {}, "error": f"Injected failure in {action}"}
+
+
+def create_fake_tools(
+    calendar: Optional[FakeCalendar] = None,
+    config: Optional[FakeToolsetConfig] = None,
+    actions: Optional[Sequence[str]] = None,
+) -> list[StructuredTool]:
+    """Create fake Composio tools backed by `calendar`.
+
+    Args:
+        calendar (Optional[FakeCalendar]): The calendar to serve; the process-wide one by default.
+        config (Optional[FakeToolsetConfig]): Latency and failure injection settings;
+            read from the environment by default.
+        actions (Optional[Sequence[str]]): The actions to create, in order; all of them by default.
+    """
+    calendar = calendar or get_fake_calendar()
+    config = config or FakeToolsetConfig.from_env()
+    rng = random.Random(config.seed)
+
+    def find_free_slots(**kwargs: Any) -> dict[str, Any]:
+        query = parse_free_slots_args(kwargs)
+        if query is None:
+            return {
+                "successfull": False,
+                "data": {},
+                "error": "Invalid time_min/time_max",
+            }
+        busy = {c: calendar.busy(c, query.start, query.end) for c in query.calendars}
+        return build_free_busy_response(query, busy)
+
+    def create_event(**kwargs: Any) -> dict[str, Any]:
+        tz = get_timezone(kwargs.get("timezone"))
+        start = parse_calendar_datetime(kwargs["start_datetime"], tz)
+        end = start + datetime.timedelta(
+            hours=kwargs.get("event_duration_hour") or 0,
+            minutes=kwargs.get("event_duration_minutes") or 0,
+        )
+        attendees = list(kwargs.get("attendees") or [])
+        event = FakeEvent(
+            id=calendar.next_id("evt"),
+            start=start,
+            end=end,
+            summary=kwargs.get("summary") or "",
+            description=kwargs.get("description") or "",
+            attendees=attendees,
+        )
+        calendar.add_event(
+            [kwargs.get("calendar_id") or DEFAULT_CALENDAR, *attendees], event
+        )
+        return _ok(
+            {
+                "kind": "calendar#event",
+                "id": event.id,
+                "status": "confirmed",
+                "summary": event.summary,
+                "start": {"dateTime": start.isoformat(), "timeZone": str(tz)},
+                "end": {"dateTime": end.isoformat(), "timeZone": str(tz)},
+                "attendees": [
+                    {"email": a, "responseStatus": "needsAction"} for a in attendees
+                ],
+            }
+        )
+
+    def find_event(**kwargs: Any) -> dict[str, Any]:
+        calendar_id = kwargs.get("calendar_id") or DEFAULT_CALENDAR
+        with calendar._lock:
+            events = list(calendar.events.get(calendar_id, []))
+        if kwargs.get("timeMin"):
+            start = parse_calendar_datetime(kwargs["timeMin"], datetime.timezone.utc)
+            events = [e for e in events if e.end > start]
+        if kwargs.get("timeMax"):
+            end = parse_calendar_datetime(kwargs["timeMax"], datetime.timezone.utc)
+            events = [e for e in events if e.start < end]
+        events.sort(key=lambda e: e.start)
+        items = [
+            {
+                "id": e.id,
+                "status": "confirmed",
+                "summary": e.summary,
+                "description": e.description,
+                "start": {"dateTime": e.start.isoformat()},
+                "end": {"dateTime": e.end.isoformat()},
+                "attendees": [{"email": a} for a in e.attendees],
+            }
+            for e in events[: kwargs.get("max_results") or 10]
+        ]
+        return _ok({"items": items})
+
+    def create_email_draft(**kwargs: Any) -> dict[str, Any]:
+        draft = {"id": calendar.next_id("r-"), **kwargs}
+        calendar.drafts.append(draft)
+        return _ok({"id": draft["id"], "message": {"labelIds": ["DRAFT"]}})
+
+    def delete_draft(**kwargs: Any) -> dict[str, Any]:
+        before = len(calendar.drafts)
+        calendar.drafts[:] = [
+            d for d in calendar.drafts if d["id"] != kwargs["draft_id"]
+        ]
+        if len(calendar.drafts) == before:
+            return {"successfull": False, "data": {}, "error": "Draft not found"}
+        return _ok({})
+
+    def delay() -> float:
+        return max(0.0, config.latency_seconds + rng.uniform(0, config.jitter_seconds))
+
+    def fails() -> bool:
+        return config.failure_rate > 0 and rng.random() < config.failure_rate
+
+    def make_tool(
+        name: str,
+        description: str,
+        args_schema: type[BaseModel],
+        handler: Callable[..., dict[str, Any]],
+    ) -> StructuredTool:
+        def run(**kwargs: Any) -> dict[str, Any]:
+            time.sleep(delay())
+            return _failure(name) if fails() else handler(**kwargs)
+
+        async def arun(**kwargs: Any) -> dict[str, Any]:
+            await asyncio.sleep(delay())
+            return _failure(name) if fails() else handler(**kwargs)
+
+        return StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=name,
+            description=description,
+            args_schema=args_schema,
+            handle_tool_error=True,
+            handle_validation_error=True,
+        )
+
+    tools = [
+        make_tool(
+            "GOOGLECALENDAR_FIND_FREE_SLOTS",
+            "Find free slots in a google calendar based on for a specific time period.",
+            FindFreeSlotsRequest,
+            find_free_slots,
+        ),
+        make_tool(
+            "GOOGLECALENDAR_CREATE_EVENT",
+            "Create a new event in a google calendar.",
+            CreateEventRequest,
+            create_event,
+        ),
+        make_tool(
+            "GOOGLECALENDAR_FIND_EVENT",
+            "Find events in a google calendar based on a search query and time range.",
+            FindEventRequest,
+            find_event,
+        ),
+        make_tool(
+            "GMAIL_CREATE_EMAIL_DRAFT",
+            "Create a draft email using gmail's api.",
+            CreateEmailDraftRequest,
+            create_email_draft,
+        ),
+        make_tool(
+            "GMAIL_DELETE_DRAFT",
+            "Delete a draft email using gmail's api.",
+            DeleteDraftRequest,
+            delete_draft,
+        ),
+    ]
+    if actions is None:
+        return tools
+    by_name = {tool.name: tool for tool in tools}
+    return [by_name[action] for action in actions]
@@ -0,0 +1,25 @@
+"""Fetches the raw payload behind a compacted tool result."""
+
+from typing import Annotated
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolArg, tool
+
+
+@tool(parse_docstring=False)
+async def fetch_tool_payload(
+    payload_ref: str,
+    config: Annotated[RunnableConfig, InjectedToolArg],
+) -> str:
+    """Get the full raw result behind a tool result's payload_ref.
+
+    Only needed when the summary lacks a detail the patient asked about.
+    """
+    from appointment_agent.configuration import Configuration
+    from appointment_agent.payloads import get_payload_store
+
+    store = get_payload_store(Configuration.from_runnable_config(config))
+    payload = await store.get(payload_ref) if store is not None else None
+    if payload is None:
+        return "Error: this payload is no longer available."
+    return payload
@@ -1,74 +1,272 @@
+"""The `make_confirmation_call` tool: appointment confirmation calls through Twilio."""
+
+import asyncio
+import functools
+import json
+import logging
 import os
-from twilio.rest import Client
+import threading
+import weakref
+from typing import Any, Optional
+from xml.sax.saxutils import escape
+
 from dotenv import load_dotenv
+from langchain_core.tools import StructuredTool
+from twilio.rest import Client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
 
-def make_confirmation_call(phone_number: str, instructions: str = None):
-    """
-    Makes a confirmation call for a dental appointment using the Twilio API.
-    
-    Parameters:
-        phone_number (str): The recipient's phone number (E.164 format).
-        instructions (str, optional): Additional instructions to include in the call.
-    
-    Returns:
-        dict: The API response as a dictionary (call SID and status).
-    """
-    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER):
-        return {
-            "status": "error",
-            "message": "Twilio credentials are not set in environment variables."
-        }
-    
-    # Default confirmation message
-    confirmation_message = (
-        "Hello! This is a call from your Dental Clinic. "
+# Default confirmation message per language; {clinic_name} is filled in once per clinic.
+CONFIRMATION_MESSAGES = {
+    "en": (
+        "Hello! This is a call from your {clinic_name}. "
         "This is a confirmation of your upcoming dental appointment. "
         "Please arrive 10 minutes before your scheduled time. "
         "If you need to reschedule or cancel, please call us at least 24 hours in advance. "
         "Thank you and we look forward to seeing you soon!"
+    ),
+}
+CONFIRMATION_VOICES = {"en": ("Polly.Joanna", "en-US")}
+
+# Pre-synthesized recordings of the static message, by (clinic, language); set
+# with `register_confirmation_audio` or the CONFIRMATION_AUDIO_URLS environment
+# variable ({"<clinic>|<language>": "<url>"}).
+_confirmation_audio: dict[tuple[str, str], str] = {}
+for _key, _url in json.loads(os.getenv("CONFIRMATION_AUDIO_URLS") or "{}").items():
+    _clinic, _, _language = _key.partition("|")
+    _confirmation_audio[_clinic, _language or "en"] = _url
+
+# One client per process (and one async client per event loop), so calls reuse
+# pooled HTTPS connections instead of paying a TLS handshake each time.
+_client: Optional[Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Client]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def get_twilio_client() -> Client:
+    """Get the shared Twilio client, backed by a pooled `requests` session."""
+    global _client
+    with _clients_lock:
+        if _client is None:
+            from twilio.http.http_client import TwilioHttpClient
+
+            _client = Client(
+                TWILIO_ACCOUNT_SID,
+                TWILIO_AUTH_TOKEN,
+                http_client=TwilioHttpClient(pool_connections=True, timeout=30),
+            )
+        return _client
+
+
+def get_async_twilio_client() -> Client:
+    """Get the Twilio client for the running event loop, backed by a pooled aiohttp session."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            from twilio.http.async_http_client import AsyncTwilioHttpClient
+
+            client = _async_clients[loop] = Client(
+                TWILIO_ACCOUNT_SID,
+                TWILIO_AUTH_TOKEN,
+                http_client=AsyncTwilioHttpClient(pool_connections=True, timeout=30),
+            )
+        return client
+
+
+def register_confirmation_audio(clinic_name: str, language: str, url: str) -> None:
+    """Play the recording at `url` instead of synthesizing the static message."""
+    _confirmation_audio[clinic_name, language] = url
+    _confirmation_prefix.cache_clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _confirmation_prefix(clinic_name: str, language: str) -> str:
+    """Render the static part of the confirmation TwiML, once per clinic and language."""
+    audio = _confirmation_audio.get((clinic_name, language))
+    if audio:
+        return f"<Response><Play>{escape(audio)}</Play>"
+    voice, voice_language = CONFIRMATION_VOICES.get(language, CONFIRMATION_VOICES["en"])
+    message = CONFIRMATION_MESSAGES.get(language, CONFIRMATION_MESSAGES["en"])
+    return (
+        f'<Response><Say voice="{voice}" language="{voice_language}">'
+        f"{escape(message.format(clinic_name=clinic_name))}</Say>"
     )
-    
+
+
+def build_confirmation_twiml(
+    instructions: Optional[str] = None,
+    clinic_name: Optional[str] = None,
+    language: str = "en",
+) -> str:
+    """Render the TwiML read out in a confirmation call.
+
+    Only the instructions are rendered per call; they are spliced in after the
+    cached static message. Without `clinic_name`, the default of
+    `Configuration.clinic_name` is used.
+    """
+    from appointment_agent.configuration import Configuration
+
+    twiml = _confirmation_prefix(clinic_name or Configuration.clinic_name, language)
+
     # Add any additional instructions if provided
     if instructions and isinstance(instructions, str):
-        confirmation_message += f" Additional instructions: {instructions}"
-    
-    try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        call = client.calls.create(
-            to=phone_number,
-            from_=TWILIO_FROM_NUMBER,
-            twiml=f'<Response><Say voice="Polly.Joanna">{confirmation_message}</Say></Response>',
-            timeout=30,  # Wait up to 30 seconds for the call to be answered
-            status_callback=f"{os.getenv('APP_URL', '')}/call-status",  # Optional: for call status updates
-            status_events=['initiated', 'ringing', 'answered', 'completed']
+        voice, voice_language = CONFIRMATION_VOICES.get(
+            language, CONFIRMATION_VOICES["en"]
         )
-        
+        twiml += (
+            f'<Say voice="{voice}" language="{voice_language}">'
+            f"Additional instructions: {escape(instructions)}</Say>"
+        )
+
+    return twiml + "</Response>"
+
+
+def _call_params(
+    phone_number: str,
+    instructions: Optional[str],
+    clinic_name: Optional[str],
+    language: str,
+) -> dict[str, Any]:
+    return {
+        "to": phone_number,
+        "from_": TWILIO_FROM_NUMBER,
+        "twiml": build_confirmation_twiml(instructions, clinic_name, language),
+        "timeout": 30,  # Wait up to 30 seconds for the call to be answered
+        "status_callback": f"{os.getenv('APP_URL', '')}/call-status",  # Optional: for call status updates
+        "status_events": ["initiated", "ringing", "answered", "completed"],
+    }
+
+
+def _missing_credentials() -> Optional[dict[str, Any]]:
+    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER):
         return {
-            "status": "success",
-            "call_sid": call.sid,
-            "call_status": call.status,
-            "message": "Appointment confirmation call initiated"
+            "status": "error",
+            "message": "Twilio credentials are not set in environment variables.",
         }
-        
+    return None
+
+
+def _call_placed(call: Any) -> dict[str, Any]:
+    return {
+        "status": "success",
+        "call_sid": call.sid,
+        "call_status": call.status,
+        "message": "Appointment confirmation call initiated",
+    }
+
+
+def _call_failed(phone_number: str, e: Exception) -> dict[str, Any]:
+    # Log the error and return a user-friendly message
+    error_message = str(e)
+    logger.warning("Error making call to %s: %s", phone_number, error_message)
+
+    # Provide more specific error messages for common issues
+    if "not a valid phone number" in error_message.lower():
+        error_message = "The provided phone number is not valid. Please check the number and try again."
+    elif "calls to this number are not allowed" in error_message.lower():
+        error_message = "Calls to this number are not allowed. Please verify the number with Twilio."
+
+    return {
+        "status": "error",
+        "message": f"Failed to make the call: {error_message}",
+        "error_type": type(e).__name__,
+        # Lets the dialer tell throttling (HTTP 429) apart from other errors.
+        "http_status": getattr(e, "status", None),
+        "error_code": getattr(e, "code", None),
+    }
+
+
+def place_confirmation_call(
+    phone_number: str,
+    instructions: Optional[str] = None,
+    clinic_name: Optional[str] = None,
+    language: str = "en",
+    urgent: bool = False,
+) -> dict[str, Any]:
+    """Make a confirmation call for a dental appointment using the Twilio API.
+
+    Parameters:
+        phone_number (str): The recipient's phone number (E.164 format).
+        instructions (str, optional): Additional instructions to include in the call.
+        clinic_name (str, optional): The clinic the call is made for.
+        language (str): Language of the confirmation message, e.g. "en".
+        urgent (bool): Dial ahead of routine calls; only matters when the call
+            waits in the outbound dialer's queue, so it is unused here.
+
+    Returns:
+        dict: The API response as a dictionary (call SID and status).
+    """
+    error = _missing_credentials()
+    if error:
+        return error
+    try:
+        call = get_twilio_client().calls.create(
+            **_call_params(phone_number, instructions, clinic_name, language)
+        )
     except Exception as e:
-        # Log the error and return a user-friendly message
-        error_message = str(e)
-        print(f"Error making call to {phone_number}: {error_message}")
-        
-        # Provide more specific error messages for common issues
-        if "not a valid phone number" in error_message.lower():
-            error_message = "The provided phone number is not valid. Please check the number and try again."
-        elif "calls to this number are not allowed" in error_message.lower():
-            error_message = "Calls to this number are not allowed. Please verify the number with Twilio."
-            
-        return {
-            "status": "error",
-            "message": f"Failed to make the call: {error_message}",
-            "error_type": type(e).__name__
-        }
\ No newline at end of file
+        return _call_failed(phone_number, e)
+    return _call_placed(call)
+
+
+async def aplace_confirmation_call(
+    phone_number: str,
+    instructions: Optional[str] = None,
+    clinic_name: Optional[str] = None,
+    language: str = "en",
+) -> dict[str, Any]:
+    """Async version of `place_confirmation_call`; doesn't block the event loop."""
+    error = _missing_credentials()
+    if error:
+        return error
+    try:
+        call = await get_async_twilio_client().calls.create_async(
+            **_call_params(phone_number, instructions, clinic_name, language)
+        )
+    except Exception as e:
+        return _call_failed(phone_number, e)
+    return _call_placed(call)
+
+
+async def _dial_confirmation_call(
+    phone_number: str,
+    instructions: Optional[str] = None,
+    clinic_name: Optional[str] = None,
+    language: str = "en",
+    urgent: bool = False,
+) -> dict[str, Any]:
+    """Place a confirmation call through the rate-limited outbound dialer."""
+    from appointment_agent.dialer import Priority, get_dialer
+
+    error = _missing_credentials()
+    if error:
+        return error
+    return await get_dialer().call(
+        phone_number,
+        instructions,
+        Priority.URGENT if urgent else Priority.ROUTINE,
+        clinic_name=clinic_name,
+        language=language,
+    )
+
+
+make_confirmation_call = StructuredTool.from_function(
+    func=place_confirmation_call,
+    coroutine=_dial_confirmation_call,
+    name="make_confirmation_call",
+    description=(
+        "Makes a confirmation call for a dental appointment using the Twilio API. "
+        "phone_number is the recipient's phone number (E.164 format); instructions are "
+        "additional instructions to include in the call; clinic_name is the clinic the "
+        "appointment is at; language is the patient's language code (default en); set "
+        "urgent for appointments later today, so the call is placed ahead of routine ones."
+    ),
+)
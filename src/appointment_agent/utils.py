@@ -1,5 +1,9 @@
 """Utility & helper functions."""
 
+import json
+import re
+from typing import Any, Optional
+
 from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage
@@ -27,13 +31,61 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
 
     if model == "gpt-4o-audio-preview":
         return init_chat_model(
-            model, 
-            model_provider=provider, 
-            temperature=0.5, 
+            model,
+            model_provider=provider,
+            temperature=0.5,
             model_kwargs={
                 "modalities": ["text", "audio"],
                 "audio": {"voice": "alloy", "format": "wav"},
-            }
+            },
         )
 
     return init_chat_model(model, model_provider=provider, temperature=0.5)
+
+
+def normalize_phone_number(value: str) -> str:
+    """Strip formatting from a phone number so duplicates compare equal."""
+    digits = re.sub(r"[^\d+]", "", value)
+    return digits if digits.startswith("+") else f"+{digits}"
+
+
+def parse_tool_result(content: Any) -> Optional[dict[str, Any]]:
+    """Parse a Composio tool result (a dict or its JSON encoding) into a dict.
+
+    Returns None if the content is not a JSON object.
+    """
+    if isinstance(content, dict):
+        return content
+    if isinstance(content, str):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def tool_result_succeeded(content: Any) -> bool:
+    """Check whether a Composio tool result reports success."""
+    data = parse_tool_result(content)
+    if data is None:
+        return False
+    # Older Composio releases spell the flag "successfull".
+    return bool(data.get("successful", data.get("successfull"))) and not data.get(
+        "error"
+    )
+
+
+def tool_result_refused(content: Any) -> bool:
+    """Check whether a Composio tool result reports that the action was refused with an error."""
+    data = parse_tool_result(content)
+    if data is None or not data.get("error"):
+        return False
+    return not data.get("successful", data.get("successfull", False))
+
+
+def tool_result_id(content: Any) -> Optional[str]:
+    """Get the id of the resource created by a Composio action, if any."""
+    data = parse_tool_result(content) or {}
+    response = (data.get("data") or {}).get("response_data") or data.get("data") or {}
+    return response.get("id") if isinstance(response, dict) else None
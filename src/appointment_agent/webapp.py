@@ -0,0 +1,126 @@
+"""Custom HTTP routes served by langgraph-api next to the graphs.
+
+Registered through `http.app` in `langgraph.json`:
+
+- `POST /call-status`: Twilio call-status callbacks (see `call_status`).
+- `GET /call-status/stats`: answer rate, average ring time and final statuses.
+- `GET /call-status/{call_sid}`: the recorded state of one call.
+- `GET /dialer/stats`: queue depth, counters and dispatch latency of this
+  worker's outbound dialer.
+
+When `BACKGROUND_JOBS` is `memory` or `redis`, the background job workers start
+with the app, so a durable queue left over from a restart is drained right away.
+
+Whenever `TWILIO_AUTH_TOKEN` is set, callbacks whose `X-Twilio-Signature`
+doesn't match are rejected; `APP_URL` must be the public base URL Twilio calls.
+Set `TWILIO_VALIDATE_WEBHOOKS=false` to turn the check off, e.g. behind a proxy
+that rewrites URLs.
+
+The `GET` routes expose call outcomes and phone numbers, so they need
+`Authorization: Bearer <STATUS_API_TOKEN>`; without `STATUS_API_TOKEN` they
+reject every request.
+"""
+
+import contextlib
+import hmac
+import os
+from typing import AsyncIterator
+from urllib.parse import parse_qsl
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from appointment_agent.call_status import CallStatusEvent, get_call_status_ingest
+from appointment_agent.dialer import get_dialer
+
+
+def _signature_is_valid(request: Request, form: dict[str, str]) -> bool:
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    if not auth_token or os.getenv("TWILIO_VALIDATE_WEBHOOKS", "").lower() in (
+        "0",
+        "false",
+        "no",
+    ):
+        return True
+    from twilio.request_validator import RequestValidator
+
+    url = f"{os.getenv('APP_URL', '').rstrip('/')}{request.url.path}"
+    validator = RequestValidator(auth_token)
+    return validator.validate(url, form, request.headers.get("X-Twilio-Signature", ""))
+
+
+def _token_is_valid(request: Request) -> bool:
+    token = os.getenv("STATUS_API_TOKEN")
+    if not token:
+        return False
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        credentials.encode(), token.encode()
+    )
+
+
+async def receive_call_status(request: Request) -> Response:
+    """Accept a call-status callback; it is stored by the next batch flush."""
+    # Parsed by hand: Starlette's form parser needs python-multipart.
+    form = dict(parse_qsl((await request.body()).decode()))
+    if not _signature_is_valid(request, form):
+        return Response(status_code=403)
+    event = CallStatusEvent.from_form(form)
+    if event is None:
+        return Response(status_code=400)
+    get_call_status_ingest().submit(event)
+    return Response(status_code=204)
+
+
+async def call_status_stats(request: Request) -> Response:
+    """Return the call-status aggregates."""
+    if not _token_is_valid(request):
+        return Response(status_code=403)
+    ingest = get_call_status_ingest()
+    await ingest.flush()
+    return JSONResponse(await ingest.store.aggregates())
+
+
+async def call_status(request: Request) -> Response:
+    """Return the recorded state of one call."""
+    if not _token_is_valid(request):
+        return Response(status_code=403)
+    call = await get_call_status_ingest().store.get_call(
+        request.path_params["call_sid"]
+    )
+    if call is None:
+        return JSONResponse({"error": "unknown call"}, status_code=404)
+    return JSONResponse(call)
+
+
+async def dialer_stats(request: Request) -> Response:
+    """Return the metrics of this worker's outbound dialer."""
+    if not _token_is_valid(request):
+        return Response(status_code=403)
+    return JSONResponse(get_dialer().metrics())
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    """Start the background job workers of `BACKGROUND_JOBS`, if set."""
+    backend = os.getenv("BACKGROUND_JOBS", "off")
+    if backend != "off":
+        from appointment_agent.configuration import Configuration
+        from appointment_agent.jobs import get_job_runner
+        from appointment_agent.nodes._tools import run_background_tool
+
+        get_job_runner(Configuration(background_jobs=backend), run_background_tool)
+    yield
+
+
+app = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route("/call-status", receive_call_status, methods=["POST"]),
+        Route("/call-status/stats", call_status_stats, methods=["GET"]),
+        Route("/call-status/{call_sid}", call_status, methods=["GET"]),
+        Route("/dialer/stats", dialer_stats, methods=["GET"]),
+    ],
+)
@@ -29,6 +29,10 @@ class Configuration:
             "Should be in the form: provider/model-name."
         },
     )
+    temperature: float = field(
+        default=0.5,
+        metadata={"description": "The sampling temperature of the language model."},
+    )
     max_search_results: int = field(
         default=10,
         metadata={
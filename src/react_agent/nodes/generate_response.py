@@ -8,7 +8,7 @@ from langchain_core.runnables import RunnableConfig
 from react_agent.configuration import Configuration
 from react_agent.nodes._tools import react_tools
 from react_agent.state import ReactGraphAnnotation
-from react_agent.utils import load_chat_model
+from react_agent.utils import count_message_tokens, get_bound_chat_model
 
 
 async def generate_response(
@@ -16,7 +16,7 @@ async def generate_response(
 ) -> dict[str, list[AIMessage]]:
     """Generate a response based on the given state and configuration.
 
-    This function initializes a chat model with tool bindings, formats the system prompt,
+    This function gets a shared chat model with tool bindings, formats the system prompt,
     trims the state messages to fit within the model's context window, and invokes the model
     to generate a response. If the state indicates it's the last step and the model still
     wants to use a tool, it returns a message indicating that an answer could not be found.
@@ -30,8 +30,10 @@ async def generate_response(
     """
     configuration = Configuration.from_runnable_config(config)
 
-    # Initialize the model with tool binding. Change the model or add more tools here.
-    model = load_chat_model(configuration.model).bind_tools(react_tools)
+    # Get the model with tool binding. Change the model or add more tools here.
+    model = get_bound_chat_model(
+        configuration.model, react_tools, temperature=configuration.temperature
+    )
 
     # Format the system prompt. Customize this to change the agent's behavior.
     system_message = configuration.system_prompt
@@ -40,7 +42,7 @@ async def generate_response(
         state.messages,
         max_tokens=40000,  # adjust for model's context window minus system & files message
         strategy="last",
-        token_counter=model,
+        token_counter=count_message_tokens,
         include_system=False,  # Not needed since systemMessage is added separately
         allow_partial=True,
     )
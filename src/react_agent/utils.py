@@ -1,8 +1,28 @@
 """Utility & helper functions."""
 
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Sequence
+
 from langchain.chat_models import init_chat_model
-from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
 from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import Runnable
+
+# Upper bound on the number of per-message token counts kept in memory.
+_TOKEN_CACHE_SIZE = 8192
+
+_token_cache: "OrderedDict[Hashable, int]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+# Upper bound on the number of distinct bound chat models kept alive.
+_BOUND_MODEL_CACHE_SIZE = 16
+
+_bound_models: "OrderedDict[Hashable, Runnable[LanguageModelInput, BaseMessage]]" = (
+    OrderedDict()
+)
+_bound_models_lock = threading.Lock()
 
 
 def get_message_text(msg: BaseMessage) -> str:
@@ -17,23 +37,101 @@ def get_message_text(msg: BaseMessage) -> str:
         return "".join(txts).strip()
 
 
-def load_chat_model(fully_specified_name: str) -> BaseChatModel:
+def load_chat_model(
+    fully_specified_name: str, temperature: float = 0.5
+) -> BaseChatModel:
     """Load a chat model from a fully specified name.
 
     Args:
         fully_specified_name (str): String in the format 'provider/model'.
+        temperature (float): Sampling temperature for the model.
     """
     provider, model = fully_specified_name.split("/", maxsplit=1)
 
     if model == "gpt-4o-audio-preview":
         return init_chat_model(
-            model, 
-            model_provider=provider, 
-            temperature=0.5, 
+            model,
+            model_provider=provider,
+            temperature=temperature,
             model_kwargs={
                 "modalities": ["text", "audio"],
                 "audio": {"voice": "alloy", "format": "wav"},
-            }
+            },
         )
 
-    return init_chat_model(model, model_provider=provider, temperature=0.5)
+    return init_chat_model(model, model_provider=provider, temperature=temperature)
+
+
+def get_bound_chat_model(
+    fully_specified_name: str, tools: Sequence[Any], temperature: float = 0.5
+) -> Runnable[LanguageModelInput, BaseMessage]:
+    """Get a chat model with `tools` bound, reusing a process-wide instance.
+
+    Models are keyed by (provider/model, temperature, tool names) and kept in a
+    bounded LRU, so every turn and every thread shares one client and its
+    connection pool instead of creating a new client and converting the tool
+    schemas again on each graph step.
+
+    Args:
+        fully_specified_name (str): String in the format 'provider/model'.
+        tools (Sequence[Any]): The tools to bind to the model.
+        temperature (float): Sampling temperature for the model.
+    """
+    key = (
+        fully_specified_name,
+        temperature,
+        tuple(getattr(tool, "name", repr(tool)) for tool in tools),
+    )
+    with _bound_models_lock:
+        bound = _bound_models.get(key)
+        if bound is not None:
+            _bound_models.move_to_end(key)
+            return bound
+
+    # Build outside the lock; if another thread won the race, use its model.
+    bound = load_chat_model(fully_specified_name, temperature).bind_tools(list(tools))
+    with _bound_models_lock:
+        bound = _bound_models.setdefault(key, bound)
+        _bound_models.move_to_end(key)
+        while len(_bound_models) > _BOUND_MODEL_CACHE_SIZE:
+            _bound_models.popitem(last=False)
+    return bound
+
+
+def _token_cache_key(msg: BaseMessage) -> Hashable:
+    """Build a cheap cache key that changes if a message is replaced in place."""
+    content = msg.content
+    tool_calls = getattr(msg, "tool_calls", None) or ()
+    return (msg.id, msg.type, len(content), len(tool_calls))
+
+
+def count_message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Estimate the number of tokens in a list of messages locally.
+
+    Intended as the `token_counter` for `trim_messages`. Counts are estimated
+    with `count_tokens_approximately` and memoized per message id, so on each
+    turn only the messages added since the previous turn are measured and no
+    request is sent to the model provider.
+
+    Args:
+        messages (Sequence[BaseMessage]): The messages to count.
+    """
+    total = 0
+    for msg in messages:
+        if not msg.id:
+            total += count_tokens_approximately([msg])
+            continue
+
+        key = _token_cache_key(msg)
+        with _token_cache_lock:
+            cached = _token_cache.get(key)
+            if cached is not None:
+                _token_cache.move_to_end(key)
+        if cached is None:
+            cached = count_tokens_approximately([msg])
+            with _token_cache_lock:
+                _token_cache[key] = cached
+                if len(_token_cache) > _TOKEN_CACHE_SIZE:
+                    _token_cache.popitem(last=False)
+        total += cached
+    return total
@@ -0,0 +1,201 @@
+"""Round trips through `DeltaPostgresSaver`; needs Postgres at `DATABASE_URI`."""
+
+import importlib
+import itertools
+import os
+import uuid
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("DATABASE_URI"), reason="DATABASE_URI is not set"
+)
+
+# `appointment_agent.nodes` re-exports the nodes under their modules' names.
+generate_response = importlib.import_module("appointment_agent.nodes.generate_response")
+summarize = importlib.import_module("appointment_agent.nodes.summarize")
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    replies = (AIMessage(content=f"Reply {i}") for i in itertools.count())
+    monkeypatch.setattr(
+        generate_response,
+        "get_model_with_tools",
+        lambda: GenericFakeChatModel(messages=replies),
+    )
+    monkeypatch.setattr(
+        summarize,
+        "get_summary_model",
+        lambda: RunnableLambda(
+            lambda _: summarize.RunningSummary(notes="Earlier turns")
+        ),
+    )
+
+
+def _config(thread_id: str, **configurable) -> dict:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            # Small enough that every few turns are folded into the summary.
+            "summarize_after_tokens": 60,
+            "summary_keep_tokens": 20,
+            "fast_path": False,
+            "prefetch_availability": False,
+            **configurable,
+        }
+    }
+
+
+async def _turn(graph, config: dict, text: str) -> list:
+    result = await graph.ainvoke({"messages": [HumanMessage(content=text)]}, config)
+    return result["messages"]
+
+
+def _at(config: dict, checkpoint: dict) -> dict:
+    """Point `config` at the checkpoint of another config."""
+    checkpoint_id = checkpoint["configurable"]["checkpoint_id"]
+    return {"configurable": {**config["configurable"], "checkpoint_id": checkpoint_id}}
+
+
+def _texts(messages: list) -> list[str]:
+    return [message.content for message in messages]
+
+
+@pytest.mark.asyncio
+async def test_history_survives_summaries_resumes_and_forks(fake_models) -> None:
+    from appointment_agent.graph import checkpointed_graph
+
+    config = _config(str(uuid.uuid4()))
+    async with checkpointed_graph(os.environ["DATABASE_URI"]) as graph:
+        seen = []
+        for i in range(4):
+            seen = await _turn(
+                graph, config, f"Turn {i}: I would like an appointment next week."
+            )
+        state = await graph.aget_state(config)
+        # Older turns were removed (a rewrite, so a snapshot) and summarized.
+        assert state.values["summary"]["notes"] == "Earlier turns"
+        assert len(state.values["messages"]) < 8
+        assert _texts(state.values["messages"]) == _texts(seen)
+        history = [snapshot async for snapshot in graph.aget_state_history(config)]
+
+    # A new connection has no cached log tips, so appends are found by digest.
+    async with checkpointed_graph(os.environ["DATABASE_URI"]) as graph:
+        resumed = await _turn(graph, config, "Turn 4: Tuesday works.")
+        assert _texts(resumed)[-2] == "Turn 4: Tuesday works."
+        assert _texts((await graph.aget_state(config)).values["messages"]) == _texts(
+            resumed
+        )
+
+        # Fork from the checkpoint after the first turn.
+        first = next(
+            s for s in reversed(history) if len(s.values.get("messages", [])) == 2
+        )
+        forked = await _turn(
+            graph, _at(config, first.config), "Turn 1b: Actually, Friday."
+        )
+        assert _texts(forked)[:3] == [
+            *_texts(first.values["messages"]),
+            "Turn 1b: Actually, Friday.",
+        ]
+        assert _texts((await graph.aget_state(config)).values["messages"]) == _texts(
+            forked
+        )
+
+        # The original branch is untouched.
+        head = await graph.aget_state(_at(config, history[0].config))
+        assert _texts(head.values["messages"]) == _texts(seen)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_from_one_parent_keep_both_histories() -> None:
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    from appointment_agent.checkpointer import DeltaPostgresSaver
+
+    thread_id = str(uuid.uuid4())
+    hello = HumanMessage(content="Hello", id="1")
+    async with (
+        DeltaPostgresSaver.from_conn_string(os.environ["DATABASE_URI"]) as first,
+        DeltaPostgresSaver.from_conn_string(os.environ["DATABASE_URI"]) as second,
+    ):
+        await first.setup()
+
+        def checkpoint(messages: list) -> dict:
+            return {**empty_checkpoint(), "channel_values": {"messages": messages}}
+
+        root = checkpoint([hello])
+        parent = await first.aput(
+            {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+            root,
+            {},
+            {},
+        )
+        # Both savers append a different reply to the same parent; the second
+        # loses the optimistic update of the log and starts a new one.
+        branches = {}
+        for saver, text in (
+            (first, "From the first worker"),
+            (second, "From the second worker"),
+        ):
+            messages = [hello, AIMessage(content=text, id=text)]
+            branches[text] = await saver.aput(parent, checkpoint(messages), {}, {})
+
+        for text, config in branches.items():
+            stored = await first.aget_tuple(config)
+            assert _texts(stored.checkpoint["channel_values"]["messages"]) == [
+                "Hello",
+                text,
+            ]
+
+
+@pytest.mark.asyncio
+async def test_another_worker_appends_to_the_same_log() -> None:
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    from appointment_agent.checkpointer import DeltaPostgresSaver
+
+    thread_id = str(uuid.uuid4())
+    hello = HumanMessage(content="Hello", id="1")
+    reply = AIMessage(content="Hi there", id="2")
+
+    def checkpoint(messages: list) -> dict:
+        return {**empty_checkpoint(), "channel_values": {"messages": messages}}
+
+    async def message_log(saver, config: dict) -> str:
+        async with saver._cursor() as cur:
+            await cur.execute(
+                "SELECT message_log FROM delta_checkpoints WHERE checkpoint_id = %s",
+                (config["configurable"]["checkpoint_id"],),
+            )
+            return (await cur.fetchone())[0]
+
+    async with (
+        DeltaPostgresSaver.from_conn_string(os.environ["DATABASE_URI"]) as first,
+        DeltaPostgresSaver.from_conn_string(os.environ["DATABASE_URI"]) as second,
+    ):
+        await first.setup()
+        root = await first.aput(
+            {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+            checkpoint([hello]),
+            {},
+            {},
+        )
+        # `second` has no cached tip, so it checks the last stored message.
+        appended = await second.aput(root, checkpoint([hello, reply]), {}, {})
+        assert await message_log(second, appended) == await message_log(second, root)
+
+        # An edited last message is a rewrite and starts a new log.
+        edited = AIMessage(content="Hi there!", id="2")
+        third = DeltaPostgresSaver(first.conn)
+        rewritten = await third.aput(appended, checkpoint([hello, edited]), {}, {})
+        assert await message_log(third, rewritten) != await message_log(third, root)
+        stored = await first.aget_tuple(rewritten)
+        assert _texts(stored.checkpoint["channel_values"]["messages"]) == [
+            "Hello",
+            "Hi there!",
+        ]
@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+import importlib
+
+from appointment_agent.availability.cache import (
+    AvailabilityCache,
+    get_availability_cache,
+)
+from appointment_agent.availability.freebusy import FreeBusyQuery
+from appointment_agent.configuration import Configuration
+from appointment_agent.kv import InMemoryKeyValueStore
+
+UTC = datetime.timezone.utc
+kv = importlib.import_module("appointment_agent.kv")
+
+
+def _at(day: int, hour: int = 0) -> datetime.datetime:
+    return datetime.datetime(2030, 1, day, hour, tzinfo=UTC)
+
+
+def _query(
+    calendar: str, start: datetime.datetime, end: datetime.datetime
+) -> FreeBusyQuery:
+    return FreeBusyQuery(calendars=(calendar,), start=start, end=end, timezone="UTC")
+
+
+def test_queries_are_answered_from_day_buckets() -> None:
+    async def run() -> None:
+        cache = AvailabilityCache(InMemoryKeyValueStore(), ttl_seconds=60)
+        # A three-day lookup fills the buckets of the 10th to the 12th.
+        await cache.store(
+            _query("primary", _at(10), _at(13)),
+            {"primary": [(_at(10, 9), _at(10, 10)), (_at(11, 23), _at(12, 1))]},
+        )
+
+        # A hit within one day, clipped to nothing outside it.
+        busy, missing = await cache.lookup(_query("primary", _at(10, 8), _at(10, 18)))
+        assert missing is None
+        assert busy == {"primary": [(_at(10, 9), _at(10, 10))]}
+
+        # A window spanning two buckets joins both halves of the overnight event.
+        busy, missing = await cache.lookup(_query("primary", _at(11, 12), _at(12, 12)))
+        assert missing is None
+        assert busy == {
+            "primary": [(_at(11, 23), _at(12, 0)), (_at(12, 0), _at(12, 1))]
+        }
+
+        # Only the missing whole days are fetched.
+        busy, missing = await cache.lookup(_query("primary", _at(12, 8), _at(14, 8)))
+        assert busy is None
+        assert (missing.start, missing.end) == (_at(13), _at(15))
+
+    asyncio.run(run())
+
+
+def test_a_booking_evicts_the_overlapping_bucket() -> None:
+    from appointment_agent.nodes._tools import record_booking
+
+    configuration = Configuration(availability_cache="memory")
+
+    async def run() -> None:
+        cache = get_availability_cache(configuration)
+        await cache.store(
+            _query("evict@example.com", _at(10), _at(12)), {"evict@example.com": []}
+        )
+        await record_booking(
+            configuration,
+            {
+                "calendar_id": "evict@example.com",
+                "start_datetime": "2030-01-11T15:00:00",
+                "timezone": "UTC",
+                "event_duration_hour": 1,
+            },
+        )
+        _, missing = await cache.lookup(_query("evict@example.com", _at(10), _at(12)))
+        assert (missing.start, missing.end) == (_at(11), _at(12))
+        busy, _ = await cache.lookup(_query("evict@example.com", _at(10), _at(11)))
+        assert busy == {"evict@example.com": []}
+
+    asyncio.run(run())
+
+
+def test_buckets_expire_after_the_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(kv.time, "monotonic", lambda: now[0])
+
+    async def run() -> None:
+        cache = AvailabilityCache(InMemoryKeyValueStore(), ttl_seconds=60)
+        await cache.store(_query("primary", _at(10), _at(11)), {"primary": []})
+        assert (await cache.lookup(_query("primary", _at(10), _at(11))))[1] is None
+        now[0] += 61
+        assert (await cache.lookup(_query("primary", _at(10), _at(11))))[1] is not None
+
+    asyncio.run(run())
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+
+from appointment_agent.availability.freebusy import FreeBusyQuery
+from appointment_agent.availability.index import AvailabilityIndex
+
+UTC = datetime.timezone.utc
+
+
+def _at(hour: int, minute: int = 0, day: int = 7) -> datetime.datetime:
+    return datetime.datetime(2030, 1, day, hour, minute, tzinfo=UTC)
+
+
+def _day_query(*calendars: str, day: int = 7) -> FreeBusyQuery:
+    return FreeBusyQuery(
+        calendars=calendars,
+        start=_at(0, day=day),
+        end=_at(0, day=day + 1),
+        timezone="UTC",
+    )
+
+
+def _loaded_index() -> AvailabilityIndex:
+    index = AvailabilityIndex(max_age_seconds=300)
+    index.load(
+        _day_query("primary", "hygienist"),
+        {
+            "primary": [(_at(9), _at(10)), (_at(9, 30), _at(11))],
+            "hygienist": [(_at(13), _at(14))],
+        },
+    )
+    return index
+
+
+def test_lookup_answers_fresh_days_and_clips_to_the_query() -> None:
+    index = _loaded_index()
+    query = FreeBusyQuery(
+        calendars=("primary",), start=_at(10), end=_at(12), timezone="UTC"
+    )
+    assert index.lookup(query) == {"primary": [(_at(10), _at(11))]}
+
+    # Unknown calendars and days never pulled fall back to the live tool.
+    assert index.lookup(_day_query("dentist")) is None
+    assert index.lookup(_day_query("primary", day=8)) is None
+    # So do days older than the max age.
+    index.max_age_seconds = -1
+    assert index.lookup(query) is None
+
+
+def test_free_between_needs_every_calendar_free() -> None:
+    index = _loaded_index()
+    calendars = ["primary", "hygienist"]
+
+    assert index.free_between(calendars, _at(8), _at(15)) == [
+        (_at(8), _at(9)),
+        (_at(11), _at(13)),
+        (_at(14), _at(15)),
+    ]
+    assert index.free_between(
+        calendars, _at(8), _at(15), datetime.timedelta(hours=2)
+    ) == [(_at(11), _at(13))]
+
+
+def test_nearest_free_orders_gaps_by_distance() -> None:
+    index = _loaded_index()
+    calendars = ["primary", "hygienist"]
+    hour = datetime.timedelta(hours=1)
+
+    # The later gap starts 15 minutes away, the earlier one ended 45 minutes ago.
+    assert index.nearest_free(calendars, _at(13, 45), hour, horizon=3 * hour) == [
+        (_at(14), _at(16, 45)),
+        (_at(11), _at(13)),
+    ]
+    # A gap containing the requested time comes first.
+    assert index.nearest_free(calendars, _at(12), hour, horizon=3 * hour) == [
+        (_at(11), _at(13)),
+        (_at(14), _at(15)),
+    ]
+
+
+def test_sync_restarts_on_new_settings_and_stops_when_idle() -> None:
+    pulled = []
+
+    async def fetch(query):
+        pulled.append(query.calendars)
+        return {calendar: [] for calendar in query.calendars}
+
+    async def run() -> None:
+        # Synced days go stale at once, so every pass of the loop pulls again.
+        index = AvailabilityIndex(max_age_seconds=0)
+        index.ensure_sync(fetch, ["primary"], 1, idle_seconds=0.05)
+        first = index._sync_task
+        index.ensure_sync(fetch, ["primary"], 1, idle_seconds=0.05)
+        assert index._sync_task is first
+
+        index.ensure_sync(fetch, ["primary", "hygienist"], 1, idle_seconds=0.05)
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        assert pulled == [("primary", "hygienist")]
+
+        # No lookups for longer than idle_seconds: the loop ends after its sleep.
+        await asyncio.wait_for(index._sync_task, timeout=3)
+        assert len(pulled) == 1
+
+    asyncio.run(run())
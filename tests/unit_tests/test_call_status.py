@@ -0,0 +1,90 @@
+from starlette.testclient import TestClient
+from twilio.request_validator import RequestValidator
+
+from appointment_agent import call_status
+from appointment_agent.webapp import app
+
+
+def test_call_status_aggregates(monkeypatch) -> None:
+    monkeypatch.delenv("TWILIO_AUTH_TOKEN", raising=False)
+    monkeypatch.setenv("STATUS_API_TOKEN", "reader")
+    monkeypatch.setattr(
+        call_status,
+        "_ingest",
+        call_status.CallStatusIngest(call_status.InMemoryCallStatusStore()),
+    )
+    events = [
+        ("CA1", "initiated", "Thu, 10 Jan 2030 10:00:00 +0000"),
+        ("CA1", "ringing", "Thu, 10 Jan 2030 10:00:01 +0000"),
+        ("CA1", "in-progress", "Thu, 10 Jan 2030 10:00:05 +0000"),
+        ("CA1", "in-progress", "Thu, 10 Jan 2030 10:00:05 +0000"),  # Twilio retry
+        ("CA1", "completed", "Thu, 10 Jan 2030 10:01:00 +0000"),
+        ("CA2", "initiated", "Thu, 10 Jan 2030 10:00:00 +0000"),
+        ("CA2", "no-answer", "Thu, 10 Jan 2030 10:00:30 +0000"),
+    ]
+    with TestClient(app) as client:
+        for sid, status, timestamp in events:
+            response = client.post(
+                "/call-status",
+                data={"CallSid": sid, "CallStatus": status, "Timestamp": timestamp},
+            )
+            assert response.status_code == 204
+        auth = {"Authorization": "Bearer reader"}
+        stats = client.get("/call-status/stats", headers=auth).json()
+        call = client.get("/call-status/CA1", headers=auth).json()
+
+    assert stats["calls"] == 2
+    assert stats["answer_rate"] == 0.5
+    assert stats["average_ring_seconds"] == 4.0
+    assert stats["by_final_status"] == {"completed": 1, "no-answer": 1}
+    assert call["status"] == "completed"
+
+
+def test_callbacks_must_be_signed_when_an_auth_token_is_set(monkeypatch) -> None:
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "secret")
+    monkeypatch.setenv("APP_URL", "https://clinic.example.com")
+    monkeypatch.delenv("TWILIO_VALIDATE_WEBHOOKS", raising=False)
+    monkeypatch.setattr(
+        call_status,
+        "_ingest",
+        call_status.CallStatusIngest(call_status.InMemoryCallStatusStore()),
+    )
+    form = {
+        "CallSid": "CA1",
+        "CallStatus": "ringing",
+        "Timestamp": "Thu, 10 Jan 2030 10:00:01 +0000",
+    }
+    signature = RequestValidator("secret").compute_signature(
+        "https://clinic.example.com/call-status", form
+    )
+    with TestClient(app) as client:
+        assert client.post("/call-status", data=form).status_code == 403
+        signed = client.post(
+            "/call-status", data=form, headers={"X-Twilio-Signature": signature}
+        )
+        assert signed.status_code == 204
+        monkeypatch.setenv("TWILIO_VALIDATE_WEBHOOKS", "false")
+        assert client.post("/call-status", data=form).status_code == 204
+
+
+def test_status_routes_need_the_api_token(monkeypatch) -> None:
+    monkeypatch.delenv("STATUS_API_TOKEN", raising=False)
+    monkeypatch.setattr(
+        call_status,
+        "_ingest",
+        call_status.CallStatusIngest(call_status.InMemoryCallStatusStore()),
+    )
+    routes = ["/call-status/stats", "/call-status/CA1", "/dialer/stats"]
+    with TestClient(app) as client:
+        # Without a configured token the routes are closed.
+        for route in routes:
+            response = client.get(route, headers={"Authorization": "Bearer "})
+            assert response.status_code == 403
+
+        monkeypatch.setenv("STATUS_API_TOKEN", "reader")
+        for route in routes:
+            assert client.get(route).status_code == 403
+            wrong = client.get(route, headers={"Authorization": "Bearer guess"})
+            assert wrong.status_code == 403
+        right = client.get("/dialer/stats", headers={"Authorization": "Bearer reader"})
+        assert right.status_code == 200
@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+
+from appointment_agent import campaign, dialer
+
+UTC = datetime.timezone.utc
+
+
+def _event(phone: str, hour: int) -> dict:
+    return {
+        "summary": "Appointment: Ada",
+        "description": f"Checkup\nPhone: {phone}",
+        "start": {"dateTime": f"2030-01-10T{hour:02d}:00:00+00:00"},
+    }
+
+
+def test_campaign_calls_each_patient_once_and_resumes(monkeypatch, tmp_path) -> None:
+    events = [
+        _event("+1 555 0100", 14),
+        _event("+15550100", 9),
+        _event("+15550199", 11),
+    ]
+    calls = campaign.plan_calls(events, UTC)
+    assert [(c.phone_number, c.start.hour) for c in calls] == [
+        ("+15550100", 9),
+        ("+15550199", 11),
+    ]
+
+    dialed = []
+
+    async def place_call(phone_number, instructions, clinic_name, language):
+        dialed.append((phone_number, instructions, clinic_name))
+        return {"status": "success", "call_sid": "CA1"}
+
+    monkeypatch.setattr(
+        dialer,
+        "get_dialer",
+        lambda: dialer.OutboundDialer(place_call, calls_per_second=1000),
+    )
+    progress_path = tmp_path / "progress.jsonl"
+    # A crash while dialing the first patient: they must not be called again.
+    campaign.CampaignProgress(progress_path).mark("+15550100", "dialing")
+
+    counts = asyncio.run(
+        campaign.run_campaign(
+            calls,
+            campaign.CampaignProgress(progress_path),
+            UTC,
+            clinic_name="Smile Clinic",
+        )
+    )
+    assert counts == {"called": 1, "failed": 0, "skipped": 1}
+    assert dialed == [
+        (
+            "+15550199",
+            "Your appointment is on Thursday 10 January at 11:00 AM.",
+            "Smile Clinic",
+        )
+    ]
@@ -0,0 +1,17 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from appointment_agent.checkpointer import stored_prefix
+
+
+def test_stored_prefix_detects_appends_and_rewrites():
+    hello = HumanMessage("Hello", id="1")
+    hi = AIMessage("Hi, how can I help?", id="2")
+    book = HumanMessage("Book me in for Tuesday", id="3")
+
+    assert stored_prefix([hello, hi], [hello, hi, book]) == 2
+    # Messages loaded from the database compare equal without being the same objects.
+    assert stored_prefix([HumanMessage("Hello", id="1")], [hello, hi]) == 1
+    assert stored_prefix([hello, hi], [hello]) is None
+    assert (
+        stored_prefix([hello, hi], [hello, AIMessage("Edited", id="2"), book]) is None
+    )
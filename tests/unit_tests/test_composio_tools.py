@@ -0,0 +1,48 @@
+from appointment_agent.tools import composio_tools
+
+SCHEMA = {
+    "name": "GOOGLECALENDAR_FIND_FREE_SLOTS",
+    "description": "Find free slots in a google calendar.",
+    "parameters": {
+        "title": "FindFreeSlotsRequest",
+        "type": "object",
+        "properties": {"time_min": {"type": "string", "title": "Time Min"}},
+    },
+}
+
+
+class FakeSchema:
+    def model_dump(self, exclude_none=False):
+        return SCHEMA
+
+
+class FakeToolSet:
+    def __init__(self):
+        self.fetches = 0
+        self.executed = []
+
+    def get_action_schemas(self, actions):
+        self.fetches += 1
+        return [FakeSchema()]
+
+    def execute_action(self, action, params):
+        self.executed.append((action, params))
+        return {"successful": True, "data": {}, "error": None}
+
+
+def test_load_composio_tools_uses_snapshot(monkeypatch, tmp_path) -> None:
+    toolset = FakeToolSet()
+    monkeypatch.setenv("COMPOSIO_SCHEMA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(composio_tools, "get_composio_toolset", lambda: toolset)
+
+    composio_tools.load_composio_tools(["GOOGLECALENDAR_FIND_FREE_SLOTS"])
+    tools = composio_tools.load_composio_tools(["GOOGLECALENDAR_FIND_FREE_SLOTS"])
+
+    assert toolset.fetches == 1
+    assert len(list(tmp_path.iterdir())) == 1
+    assert [tool.name for tool in tools] == ["GOOGLECALENDAR_FIND_FREE_SLOTS"]
+
+    tools[0].invoke({"time_min": "2025,01,30,18,00,00"})
+    assert toolset.executed == [
+        ("GOOGLECALENDAR_FIND_FREE_SLOTS", {"time_min": "2025,01,30,18,00,00"})
+    ]
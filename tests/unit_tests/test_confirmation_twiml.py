@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import weakref
+from types import SimpleNamespace
+
+mcc = importlib.import_module("appointment_agent.tools.make_confirmation_call")
+
+
+def test_confirmation_twiml_splices_escaped_instructions(monkeypatch) -> None:
+    monkeypatch.setattr(mcc, "_confirmation_audio", {})
+    mcc._confirmation_prefix.cache_clear()
+    twiml = mcc.build_confirmation_twiml(
+        "Bring <forms> & ID", clinic_name="Smile Clinic"
+    )
+    assert "your Smile Clinic." in twiml
+    assert (
+        "Additional instructions: Bring &lt;forms&gt; &amp; ID</Say></Response>"
+        in twiml
+    )
+
+    mcc.register_confirmation_audio(
+        "Smile Clinic", "en", "https://cdn.example.com/smile.mp3"
+    )
+    twiml = mcc.build_confirmation_twiml(clinic_name="Smile Clinic")
+    assert (
+        twiml == "<Response><Play>https://cdn.example.com/smile.mp3</Play></Response>"
+    )
+    mcc._confirmation_prefix.cache_clear()
+
+
+def test_confirmation_call_is_rendered_for_its_clinic(monkeypatch) -> None:
+    monkeypatch.setattr(mcc, "_confirmation_audio", {})
+    mcc._confirmation_prefix.cache_clear()
+    params = mcc._call_params("+15550100", None, "Smile Clinic", "en")
+    assert "your Smile Clinic." in params["twiml"]
+    # Without a clinic, the configured default is used.
+    assert (
+        "your Dental Clinic."
+        in mcc._call_params("+15550100", None, None, "en")["twiml"]
+    )
+    mcc._confirmation_prefix.cache_clear()
+
+
+class _FakeCalls:
+    def __init__(self) -> None:
+        self.created: list[str] = []
+        self.awaited: list[str] = []
+
+    def create(self, **params):
+        self.created.append(params["to"])
+        return SimpleNamespace(sid=f"CA{len(self.created)}", status="queued")
+
+    async def create_async(self, **params):
+        await asyncio.sleep(0)
+        self.awaited.append(params["to"])
+        return self.create(**params)
+
+
+def _fake_twilio(monkeypatch) -> list:
+    """Count the Twilio clients built and record the calls each one places."""
+    clients = []
+
+    def client_factory(account_sid, auth_token, http_client=None):
+        client = SimpleNamespace(calls=_FakeCalls(), http_client=http_client)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(mcc, "Client", client_factory)
+    monkeypatch.setattr(mcc, "_client", None)
+    monkeypatch.setattr(mcc, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(mcc, "TWILIO_ACCOUNT_SID", "AC123")
+    monkeypatch.setattr(mcc, "TWILIO_AUTH_TOKEN", "token")
+    monkeypatch.setattr(mcc, "TWILIO_FROM_NUMBER", "+15550100")
+    return clients
+
+
+def test_confirmation_calls_share_one_client(monkeypatch) -> None:
+    clients = _fake_twilio(monkeypatch)
+
+    first = mcc.place_confirmation_call("+15550101")
+    second = mcc.place_confirmation_call("+15550102")
+
+    assert [first["call_sid"], second["call_sid"]] == ["CA1", "CA2"]
+    assert len(clients) == 1
+    assert clients[0].calls.created == ["+15550101", "+15550102"]
+
+
+def test_async_confirmation_calls_await_create(monkeypatch) -> None:
+    clients = _fake_twilio(monkeypatch)
+
+    async def place_two() -> list:
+        return [
+            await mcc.aplace_confirmation_call("+15550101"),
+            await mcc.aplace_confirmation_call("+15550102"),
+        ]
+
+    results = asyncio.run(place_two())
+
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert [r["call_sid"] for r in results] == ["CA1", "CA2"]
+    assert len(clients) == 1
+    assert clients[0].calls.awaited == ["+15550101", "+15550102"]
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+from appointment_agent.dialer import OutboundDialer, Priority, SharedTokenBucket
+from appointment_agent.kv import InMemoryKeyValueStore
+
+
+def test_urgent_calls_are_dialed_first() -> None:
+    dialed = []
+
+    async def place_call(phone_number, instructions):
+        dialed.append(phone_number)
+        return {"status": "success"}
+
+    async def run() -> None:
+        dialer = OutboundDialer(place_call, calls_per_second=1000, burst=1)
+        futures = [
+            dialer.submit("+1000", priority=Priority.ROUTINE),
+            dialer.submit("+2000", priority=Priority.ROUTINE),
+            dialer.submit("+3000", priority=Priority.URGENT),
+        ]
+        await asyncio.gather(*futures)
+        assert dialer.metrics()["succeeded"] == 3
+
+    asyncio.run(run())
+    # The first routine call may already be on its way; the urgent one jumps the rest.
+    assert dialed.index("+3000") < dialed.index("+2000")
+
+
+def test_throttled_calls_back_off_and_retry() -> None:
+    attempts = []
+
+    async def place_call(phone_number, instructions):
+        attempts.append(phone_number)
+        if len(attempts) == 1:
+            return {"status": "error", "http_status": 429, "error_code": 20429}
+        return {"status": "success"}
+
+    async def run() -> dict:
+        dialer = OutboundDialer(
+            place_call,
+            calls_per_second=1000,
+            base_backoff_seconds=0.01,
+            max_backoff_seconds=0.02,
+        )
+        result = await dialer.call("+1000")
+        assert dialer.metrics()["throttled"] == 1
+        return result
+
+    assert asyncio.run(run()) == {"status": "success"}
+    assert attempts == ["+1000", "+1000"]
+
+
+def test_shared_bucket_limits_every_dialer_using_it() -> None:
+    dialed = []
+
+    async def place_call(phone_number, instructions):
+        dialed.append(time.monotonic())
+        return {"status": "success"}
+
+    async def run() -> None:
+        # Two workers' dialers sharing one store at 20 calls per second.
+        store = InMemoryKeyValueStore()
+        dialers = [
+            OutboundDialer(
+                place_call, bucket=SharedTokenBucket(store, rate=20, burst=1)
+            )
+            for _ in range(2)
+        ]
+        await asyncio.gather(
+            *(dialer.call(f"+{i}000") for i in range(3) for dialer in dialers)
+        )
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert len(dialed) == 6
+    # One call per 50ms window across both dialers.
+    assert time.monotonic() - started >= 0.2
+
+
+def test_urgent_confirmation_calls_jump_the_queue(monkeypatch) -> None:
+    import importlib
+
+    from appointment_agent import dialer as dialer_module
+
+    mcc = importlib.import_module("appointment_agent.tools.make_confirmation_call")
+    for name in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_FROM_NUMBER"):
+        monkeypatch.setattr(mcc, name, "set")
+    submitted = []
+
+    class Recorder:
+        async def call(self, phone_number, instructions, priority, **call_args):
+            submitted.append((phone_number, priority))
+            return {"status": "success"}
+
+    monkeypatch.setattr(dialer_module, "get_dialer", Recorder)
+
+    async def run() -> None:
+        await mcc.make_confirmation_call.ainvoke(
+            {"phone_number": "+1000", "urgent": True}
+        )
+        await mcc.make_confirmation_call.ainvoke({"phone_number": "+2000"})
+
+    asyncio.run(run())
+    assert submitted == [("+1000", Priority.URGENT), ("+2000", Priority.ROUTINE)]
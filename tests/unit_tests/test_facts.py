@@ -0,0 +1,64 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from appointment_agent.nodes.facts import (
+    extract_facts,
+    facts_from_slot_result,
+    facts_from_text,
+)
+from appointment_agent.prompt_cache import render_facts
+from appointment_agent.state import merge_facts
+
+
+def test_extracts_contact_details_from_the_latest_turn():
+    state = {
+        "messages": [
+            HumanMessage("My name is Grace Hopper", id="1"),
+            AIMessage("Thanks Grace! What's your email?", id="2"),
+            HumanMessage("It's grace@example.com, phone 555 010 0199", id="3"),
+        ]
+    }
+    update = asyncio.run(extract_facts(state, {}))
+    assert update["facts"] == {
+        "email": "grace@example.com",
+        "phone_number": "+5550100199",
+    }
+
+
+def test_dates_and_other_words_are_not_taken_for_contact_details():
+    assert facts_from_text("can I come on 2025-01-30") == {}
+    assert facts_from_text("15 01 2025 at 3pm") == {}
+    assert facts_from_text("30/01/2025 please") == {}
+    assert facts_from_text("I'm Free tuesday") == {}
+    assert facts_from_text("This is Tuesday, right?") == {}
+    assert facts_from_text("reference 4512345") == {}
+    assert facts_from_text("This is Ada Lovelace, my number is 555 0100") == {
+        "patient_name": "Ada Lovelace",
+        "phone_number": "+5550100",
+    }
+
+
+def test_facts_merge_and_render():
+    offered = facts_from_slot_result(
+        {
+            "requested": "2030-01-07T10:00:00+00:00",
+            "timezone": "UTC",
+            "options": [
+                {
+                    "start": "2030-01-07T11:00:00+00:00",
+                    "end": "2030-01-07T12:00:00+00:00",
+                    "label": "Monday 7 January, 11:00 AM",
+                }
+            ],
+        }
+    )
+    facts = merge_facts({"email": "grace@example.com"}, offered)
+    facts = merge_facts(facts, {"email": None, "booking_status": "booked"})
+    assert facts["email"] == "grace@example.com"
+    assert facts["offered_slots"][0]["label"] == "Monday 7 January, 11:00 AM"
+
+    block = render_facts(facts)
+    assert "- email: grace@example.com" in block
+    assert "- offered slots: Monday 7 January, 11:00 AM" in block
+    assert render_facts({}) == ""
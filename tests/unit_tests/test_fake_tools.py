@@ -0,0 +1,535 @@
+import asyncio
+import datetime
+import importlib
+import json
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import StructuredTool
+from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
+
+from appointment_agent.availability.freebusy import parse_free_busy_response
+from appointment_agent.configuration import Configuration
+from appointment_agent.nodes import _tools
+from appointment_agent.nodes.find_slots import find_slots, start_availability_prefetch
+from appointment_agent.state import AppointmentAgentState
+from appointment_agent.tools.fake_composio import (
+    FakeCalendar,
+    FakeEvent,
+    FakeToolsetConfig,
+    create_fake_tools,
+)
+
+UTC = datetime.timezone.utc
+CONFIG = {"configurable": {"availability_cache": "off", "rank_slots": False}}
+
+
+def _use_fake_tools(monkeypatch, calendar: FakeCalendar) -> None:
+    monkeypatch.setattr(
+        _tools, "_schedule_tools", create_fake_tools(calendar, FakeToolsetConfig())
+    )
+    monkeypatch.setattr(
+        _tools,
+        "_compensation_tools",
+        create_fake_tools(calendar, FakeToolsetConfig(), _tools.COMPENSATION_ACTIONS),
+    )
+    monkeypatch.setattr(_tools, "_schedule_tools_write_tool_node", None)
+
+
+def _time_out_creates(monkeypatch) -> None:
+    """Make created events go through upstream while the call itself times out."""
+    tools = {tool.name: tool for tool in _tools.get_schedule_tools()}
+    create = tools["GOOGLECALENDAR_CREATE_EVENT"]
+
+    def create_then_time_out(**kwargs) -> dict:
+        create.invoke(kwargs)
+        raise TimeoutError("read timed out")
+
+    tools["GOOGLECALENDAR_CREATE_EVENT"] = StructuredTool.from_function(
+        create_then_time_out,
+        name=create.name,
+        description=create.description,
+        args_schema=create.args_schema,
+    )
+    monkeypatch.setattr(_tools, "_schedule_tools", list(tools.values()))
+
+
+def _wrap_free_slots(monkeypatch, before) -> None:
+    """Run `before()` in the worker thread ahead of every free-slot lookup."""
+    tools = {tool.name: tool for tool in _tools.get_schedule_tools()}
+    find = tools["GOOGLECALENDAR_FIND_FREE_SLOTS"]
+
+    def slow_find(**kwargs) -> dict:
+        before()
+        return find.invoke(kwargs)
+
+    tools[find.name] = StructuredTool.from_function(
+        slow_find,
+        name=find.name,
+        description=find.description,
+        args_schema=find.args_schema,
+    )
+    monkeypatch.setattr(_tools, "_schedule_tools", list(tools.values()))
+
+
+def _free_slots_call(call_id: str, day: int) -> dict:
+    return {
+        "name": "GOOGLECALENDAR_FIND_FREE_SLOTS",
+        "id": call_id,
+        "args": {
+            "time_min": f"2030,01,{day:02d},00,00,00",
+            "time_max": f"2030,01,{day + 1:02d},00,00,00",
+            "timezone": "UTC",
+        },
+    }
+
+
+def _compile_node(node) -> CompiledStateGraph:
+    # Tool nodes need a graph runtime, so nodes using them run inside a one-node graph.
+    builder = StateGraph(AppointmentAgentState)
+    builder.add_node("node", node)
+    builder.set_entry_point("node")
+    return builder.compile()
+
+
+def _run_node(node, messages: list, config: dict = CONFIG) -> dict:
+    return asyncio.run(_compile_node(node).ainvoke({"messages": messages}, config))
+
+
+def test_created_event_shows_up_as_busy(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    book = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "GOOGLECALENDAR_CREATE_EVENT",
+                "id": "call-1",
+                "args": {
+                    "start_datetime": "2030-01-07T10:00:00",
+                    "event_duration_hour": 1,
+                    "event_duration_minutes": 0,
+                    "timezone": "UTC",
+                    "attendees": ["patient@example.com"],
+                },
+            },
+            {"name": "GOOGLECALENDAR_FIND_FREE_SLOTS", "id": "call-2", "args": {}},
+        ],
+    )
+    written = _run_node(_tools.schedule_tools_write_node, [book])
+    assert [m.tool_call_id for m in written["messages"][1:]] == ["call-1"]
+    assert calendar.events["primary"][0].attendees == ["patient@example.com"]
+
+    lookup = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "GOOGLECALENDAR_FIND_FREE_SLOTS",
+                "id": "call-3",
+                "args": {
+                    "time_min": "2030,01,07,00,00,00",
+                    "time_max": "2030,01,08,00,00,00",
+                    "timezone": "UTC",
+                    "items": ["patient@example.com"],
+                },
+            }
+        ],
+    )
+    result = asyncio.run(find_slots({"messages": [lookup]}, CONFIG))
+    busy = parse_free_busy_response(json.loads(result["messages"][0].content), UTC)
+    assert busy == {
+        "patient@example.com": [
+            (
+                datetime.datetime(2030, 1, 7, 10, tzinfo=UTC),
+                datetime.datetime(2030, 1, 7, 11, tzinfo=UTC),
+            )
+        ]
+    }
+
+
+def test_failure_injection() -> None:
+    tools = create_fake_tools(config=FakeToolsetConfig(failure_rate=1.0))
+    draft = next(t for t in tools if t.name == "GMAIL_CREATE_EMAIL_DRAFT")
+    res = draft.invoke(
+        {"recipient_email": "a@example.com", "subject": "s", "body": "b"}
+    )
+    assert res["successfull"] is False
+    assert res["error"]
+
+
+def test_repeated_booking_returns_earlier_result(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    config = {
+        "configurable": {**CONFIG["configurable"], "thread_id": "thread-idempotency"}
+    }
+    args = {
+        "start_datetime": "2030-01-08T10:00:00",
+        "event_duration_hour": 1,
+        "timezone": "UTC",
+    }
+
+    contents = []
+    for call_id in ("call-1", "call-2"):
+        book = AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "GOOGLECALENDAR_CREATE_EVENT", "id": call_id, "args": args}
+            ],
+        )
+        result = _run_node(_tools.schedule_tools_write_node, [book], config)
+        assert result["messages"][-1].tool_call_id == call_id
+        contents.append(result["messages"][-1].content)
+
+    assert len(calendar.events["primary"]) == 1
+    assert contents[0] == contents[1]
+
+
+def test_booking_that_timed_out_is_not_retried(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    _time_out_creates(monkeypatch)
+    config = {"configurable": {**CONFIG["configurable"], "thread_id": "thread-timeout"}}
+    args = {
+        "start_datetime": "2030-01-08T14:00:00",
+        "event_duration_hour": 1,
+        "timezone": "UTC",
+    }
+
+    for call_id in ("call-1", "call-2"):
+        book = AIMessage(
+            content="",
+            tool_calls=[
+                {"name": "GOOGLECALENDAR_CREATE_EVENT", "id": call_id, "args": args}
+            ],
+        )
+        try:
+            result = _run_node(_tools.schedule_tools_write_node, [book], config)
+        except TimeoutError:
+            continue
+        assert result["messages"][-1].status == "error"
+
+    assert len(calendar.events["primary"]) == 1
+
+
+def test_email_draft_is_queued_after_booking(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    graph = _compile_node(_tools.schedule_tools_write_node)
+    book = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "GOOGLECALENDAR_CREATE_EVENT",
+                "id": "call-1",
+                "args": {"start_datetime": "2030-01-09T10:00:00", "timezone": "UTC"},
+            },
+            {
+                "name": "GMAIL_CREATE_EMAIL_DRAFT",
+                "id": "call-2",
+                "args": {
+                    "recipient_email": "a@example.com",
+                    "subject": "Booked",
+                    "body": "See you",
+                },
+            },
+        ],
+    )
+
+    async def run() -> dict:
+        result = await graph.ainvoke({"messages": [book]}, CONFIG)
+        for _ in range(100):
+            if calendar.drafts:
+                break
+            await asyncio.sleep(0.01)
+        return result
+
+    result = asyncio.run(run())
+    assert json.loads(result["messages"][-1].content)["status"] == "queued"
+    assert calendar.drafts[0]["subject"] == "Booked"
+
+
+def _run_booking_node(args: dict) -> dict:
+    from appointment_agent.nodes.book_appointment import book_appointment
+
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "book_appointment", "id": "call-1", "args": args}],
+    )
+    config = {"configurable": {**CONFIG["configurable"], "background_jobs": "off"}}
+    result = _run_node(book_appointment, [message], config)
+    return json.loads(result["messages"][-1].content)
+
+
+def test_book_appointment_runs_the_whole_booking(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    summary = _run_booking_node(
+        {
+            "start_datetime": "2030-01-10T10:00:00",
+            "patient_name": "Ada Lovelace",
+            "patient_email": "ada@example.com",
+        }
+    )
+    assert summary["status"] == "booked"
+    assert summary["email_draft"] == "created"
+    assert calendar.events["ada@example.com"][0].start.hour == 10
+    assert calendar.drafts[0]["recipient_email"] == "ada@example.com"
+
+
+def test_book_appointment_deletes_the_draft_when_the_event_fails(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    tools = {tool.name: tool for tool in _tools.get_schedule_tools()}
+    tools["GOOGLECALENDAR_CREATE_EVENT"] = create_fake_tools(
+        calendar, FakeToolsetConfig(failure_rate=1.0), ["GOOGLECALENDAR_CREATE_EVENT"]
+    )[0]
+    monkeypatch.setattr(_tools, "_schedule_tools", list(tools.values()))
+    summary = _run_booking_node(
+        {
+            "start_datetime": "2030-01-11T10:00:00",
+            "patient_name": "Ada Lovelace",
+            "patient_email": "ada@example.com",
+            "phone_number": "+15555550100",
+        }
+    )
+    assert summary["status"] == "failed"
+    assert summary["email_draft"] == "deleted"
+    assert "confirmation_call" not in summary
+    assert calendar.drafts == []
+
+
+def test_find_slots_answers_from_prefetch(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    config = {
+        "configurable": {**CONFIG["configurable"], "thread_id": "thread-prefetch"}
+    }
+    patient = HumanMessage(content="Is anything free on 2030-01-07?")
+    lookup = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "GOOGLECALENDAR_FIND_FREE_SLOTS",
+                "id": "call-1",
+                "args": {
+                    "time_min": "2030-01-07T09:00:00",
+                    "time_max": "2030-01-07T17:00:00",
+                    "timezone": "UTC",
+                    "items": ["primary"],
+                },
+            }
+        ],
+    )
+
+    async def run() -> dict:
+        prefetch = start_availability_prefetch(
+            [patient], Configuration.from_runnable_config(config), config
+        )
+        assert prefetch is not None
+        await prefetch.task
+        # Booked after the prefetch ran, so only a second lookup would see it.
+        calendar.add_event(
+            ["primary"],
+            FakeEvent(
+                id="late",
+                start=datetime.datetime(2030, 1, 7, 10, tzinfo=UTC),
+                end=datetime.datetime(2030, 1, 7, 11, tzinfo=UTC),
+            ),
+        )
+        return await find_slots({"messages": [patient, lookup]}, config)
+
+    result = asyncio.run(run())
+    busy = parse_free_busy_response(json.loads(result["messages"][0].content), UTC)
+    assert busy == {"primary": []}
+
+
+def test_book_appointment_does_not_rebook_after_a_timeout(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    _time_out_creates(monkeypatch)
+    args = {
+        "start_datetime": "2030-01-14T10:00:00",
+        "patient_name": "Ada Lovelace",
+        "patient_email": "ada@example.com",
+    }
+    assert _run_booking_node(args)["status"] == "failed"
+    assert _run_booking_node(args)["status"] == "uncertain"
+    assert len(calendar.events["ada@example.com"]) == 1
+
+
+def test_book_appointment_replies_when_the_booking_raises(monkeypatch) -> None:
+    # `appointment_agent.nodes` re-exports the node under the module's name.
+    module = importlib.import_module("appointment_agent.nodes.book_appointment")
+
+    async def unreachable_store(*args, **kwargs):
+        raise ConnectionError("store unreachable")
+
+    monkeypatch.setattr(module, "run_booking", unreachable_store)
+    args = {
+        "start_datetime": "2030-01-15T10:00:00",
+        "patient_name": "Ada Lovelace",
+        "patient_email": "ada@example.com",
+    }
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "book_appointment", "id": "call-1", "args": args}],
+    )
+    reply = _run_node(module.book_appointment, [message])["messages"][-1]
+    assert reply.tool_call_id == "call-1"
+    assert reply.status == "error"
+
+
+def _lookup(time_min: str, time_max: str) -> AIMessage:
+    args = {
+        "time_min": time_min,
+        "time_max": time_max,
+        "timezone": "UTC",
+        "items": ["primary"],
+    }
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "GOOGLECALENDAR_FIND_FREE_SLOTS", "id": "call-1", "args": args}
+        ],
+    )
+
+
+def test_slots_are_ranked_around_the_requested_time(monkeypatch) -> None:
+    _use_fake_tools(monkeypatch, FakeCalendar())
+    config = {"configurable": {"availability_cache": "off", "resolve_dates": False}}
+
+    lookup = _lookup("2030-01-10T15:00:00", "2030-01-13T15:00:00")
+    ranked = json.loads(
+        asyncio.run(find_slots({"messages": [lookup]}, config))["messages"][0].content
+    )
+    assert ranked["requested_available"] is True
+    assert ranked["options"][0]["start"] == "2030-01-10T15:00:00+00:00"
+
+    # Whole days name no requested time, so the free/busy payload is returned as is.
+    lookup = _lookup("2030-01-10T00:00:00", "2030-01-13T00:00:00")
+    update = asyncio.run(find_slots({"messages": [lookup]}, config))
+    raw = json.loads(update["messages"][0].content)
+    assert parse_free_busy_response(raw, UTC) == {"primary": []}
+    # Nothing was offered, so earlier options can't be picked by position any more.
+    assert update["facts"] == {"offered_slots": []}
+
+
+def test_slots_are_ranked_around_the_time_the_patient_named(monkeypatch) -> None:
+    _use_fake_tools(monkeypatch, FakeCalendar())
+    config = {"configurable": {"availability_cache": "off"}}
+    # A three-day lookup from midnight, after the patient asked for Thursday at 3pm.
+    patient = HumanMessage(content="Can I come on Thursday 2030-01-10 at 3pm?")
+    lookup = _lookup("2030-01-08T00:00:00", "2030-01-11T00:00:00")
+    ranked = json.loads(
+        asyncio.run(find_slots({"messages": [patient, lookup]}, config))["messages"][
+            0
+        ].content
+    )
+    assert ranked["requested"] == "2030-01-10T15:00:00+00:00"
+    assert ranked["requested_available"] is True
+    assert ranked["options"][0]["start"] == "2030-01-10T15:00:00+00:00"
+
+
+def test_lookup_missing_the_named_day_is_run_as_sent_with_a_hint(monkeypatch) -> None:
+    _use_fake_tools(monkeypatch, FakeCalendar())
+    config = {"configurable": {"availability_cache": "off"}}
+    patient = HumanMessage(content="Can I come on 2030-01-17 at 3pm?")
+    lookup = _lookup("2030-01-10T15:00:00", "2030-01-13T15:00:00")
+    ranked = json.loads(
+        asyncio.run(find_slots({"messages": [patient, lookup]}, config))["messages"][
+            0
+        ].content
+    )
+    # Ranked around the model's own time, in the window it asked for.
+    assert ranked["requested"] == "2030-01-10T15:00:00+00:00"
+    assert all(option["start"] < "2030-01-14" for option in ranked["options"])
+    assert "2030-01-17T15:00:00+00:00" in ranked["hint"]
+
+
+def test_mixed_tool_calls_run_side_by_side_in_the_graph(monkeypatch) -> None:
+    calendar = FakeCalendar()
+    _use_fake_tools(monkeypatch, calendar)
+    generate_response = importlib.import_module(
+        "appointment_agent.nodes.generate_response"
+    )
+    reply = AIMessage("Tuesday at ten is free.")
+
+    class FakeModel:
+        async def ainvoke(self, messages, config=None):
+            return reply
+
+    monkeypatch.setattr(generate_response, "get_model_with_tools", FakeModel)
+    from appointment_agent.graph import appointment_agent_graph
+
+    calls = AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "GOOGLECALENDAR_FIND_FREE_SLOTS",
+                "id": "call-1",
+                "args": {
+                    "time_min": "2030,01,08,00,00,00",
+                    "time_max": "2030,01,09,00,00,00",
+                    "timezone": "UTC",
+                },
+            },
+            {
+                "name": "GOOGLECALENDAR_FIND_EVENT",
+                "id": "call-2",
+                "args": {"calendar_id": "primary"},
+            },
+        ],
+    )
+
+    async def run() -> tuple[dict, dict[str, int]]:
+        steps: dict[str, int] = {}
+        state: dict = {}
+        async for mode, chunk in appointment_agent_graph.astream(
+            {"messages": [HumanMessage("Anything on Tuesday?"), calls]},
+            CONFIG,
+            stream_mode=["debug", "values"],
+        ):
+            if mode == "values":
+                state = chunk
+            elif chunk["type"] == "task":
+                steps.setdefault(chunk["payload"]["name"], chunk["step"])
+        return state, steps
+
+    state, steps = asyncio.run(run())
+    answers = [m.tool_call_id for m in state["messages"] if m.type == "tool"]
+    assert sorted(answers) == ["call-1", "call-2"]
+    assert steps["find_slots"] == steps["tools"]
+    assert state["messages"][-1].content == reply.content
+
+
+def test_slow_lookup_times_out_with_an_error(monkeypatch) -> None:
+    _use_fake_tools(monkeypatch, FakeCalendar())
+    _wrap_free_slots(monkeypatch, lambda: time.sleep(0.5))
+    config = {
+        "configurable": {**CONFIG["configurable"], "find_slots_timeout_seconds": 0.05}
+    }
+    lookup = AIMessage(content="", tool_calls=[_free_slots_call("call-1", 7)])
+
+    result = asyncio.run(find_slots({"messages": [lookup]}, config))
+    message = result["messages"][0]
+    assert message.tool_call_id == "call-1"
+    assert message.status == "error"
+    assert "timed out" in message.content
+
+
+def test_slot_lookups_overlap(monkeypatch) -> None:
+    _use_fake_tools(monkeypatch, FakeCalendar())
+    # Each lookup waits for the other one; run one after another, both would fail.
+    both_running = threading.Barrier(2, timeout=2)
+    _wrap_free_slots(monkeypatch, both_running.wait)
+    lookup = AIMessage(
+        content="",
+        tool_calls=[_free_slots_call("call-1", 7), _free_slots_call("call-2", 8)],
+    )
+
+    result = asyncio.run(find_slots({"messages": [lookup]}, CONFIG))
+    assert [m.tool_call_id for m in result["messages"]] == ["call-1", "call-2"]
+    assert all(m.status == "success" for m in result["messages"])
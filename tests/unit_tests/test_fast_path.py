@@ -0,0 +1,83 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from appointment_agent.configuration import Configuration
+from appointment_agent.nodes.fast_path import classify_turn
+
+CONFIGURATION = Configuration()
+FACTS = {
+    "patient_name": "Ada Lovelace",
+    "email": "ada@example.com",
+    "phone_number": "+15555550100",
+    "timezone": "UTC",
+    "offered_slots": [
+        {
+            "start": "2030-01-07T11:00:00+00:00",
+            "end": "2030-01-07T12:00:00+00:00",
+            "label": "Monday 7 January, 11:00 AM",
+        },
+        {
+            "start": "2030-01-07T14:00:00+00:00",
+            "end": "2030-01-07T15:00:00+00:00",
+            "label": "Monday 7 January, 2:00 PM",
+        },
+    ],
+}
+OFFER = AIMessage("I have Monday at 11 AM or 2 PM. Which works for you?")
+
+
+def _turn(text, reply=OFFER, facts=FACTS):
+    return classify_turn(
+        [HumanMessage("Hi"), reply, HumanMessage(text)], facts, CONFIGURATION
+    )
+
+
+def test_picking_an_offered_slot_books_it():
+    for text in ("The second one", "option 2", "the last one", "2pm please", "2 works"):
+        message = _turn(text)
+        (call,) = message.tool_calls
+        assert call["name"] == "book_appointment"
+        assert call["args"]["start_datetime"] == "2030-01-07T14:00:00"
+        assert call["args"]["patient_email"] == "ada@example.com"
+
+
+def test_agreeing_books_only_a_single_proposed_slot():
+    proposal = AIMessage("Monday at 11 AM is free. Shall I book it?")
+    assert (
+        _turn("Yes please", proposal).tool_calls[0]["args"]["start_datetime"]
+        == "2030-01-07T11:00:00"
+    )
+    assert _turn("Yes please") is None
+
+
+def test_unclear_turns_are_left_to_the_model():
+    assert _turn("Not the second one, something on Tuesday?") is None
+    assert _turn("Monday") is None
+    assert _turn("2pm", facts={**FACTS, "phone_number": None}) is None
+
+
+def test_ordinals_inside_other_phrases_do_not_pick_a_slot():
+    for text in (
+        "hold on a second",
+        "just a second",
+        "one second please",
+        "give me a second",
+        "the first thing I need",
+        "yes, one moment",
+    ):
+        assert _turn(text) is None, text
+
+
+def test_farewell_is_answered_directly():
+    message = _turn("No thanks, bye")
+    assert not message.tool_calls
+    assert "goodbye" in message.content.lower()
+    assert _turn(
+        "Thank you!", facts={**FACTS, "booking_status": "booked"}
+    ).content.startswith("You're welcome")
+
+
+def test_stale_options_are_not_booked_by_position():
+    # The agent's last reply offered other times than the stored options.
+    other_times = AIMessage("I have Tuesday at 9 AM or 4 PM. Which works for you?")
+    assert _turn("The second one", other_times) is None
+    assert _turn("the first one", AIMessage("Nothing is free that day, sorry.")) is None
@@ -0,0 +1,45 @@
+import asyncio
+
+from appointment_agent import jobs
+from appointment_agent.configuration import Configuration
+from appointment_agent.jobs import InMemoryJobQueue, Job, JobRunner
+
+
+def test_failed_jobs_are_retried_later_without_holding_a_worker() -> None:
+    ran = []
+
+    async def handler(tool, args):
+        ran.append(tool)
+        ok = tool != "flaky" or ran.count("flaky") > 1
+        return {"status": "success" if ok else "error"}
+
+    async def run() -> None:
+        runner = JobRunner(
+            InMemoryJobQueue(), handler, workers=1, base_delay_seconds=0.2
+        )
+        await runner.submit("flaky", {})
+        await runner.submit("other", {})
+        while ran.count("flaky") < 2:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    # The single worker ran the other job during the retry's backoff.
+    assert ran == ["flaky", "other", "flaky"]
+
+
+def test_workers_start_with_the_runner(monkeypatch) -> None:
+    monkeypatch.setattr(jobs, "_runners", {})
+
+    async def run() -> None:
+        finished = asyncio.Event()
+
+        async def handler(tool, args):
+            finished.set()
+            return {"status": "success"}
+
+        runner = jobs.get_job_runner(Configuration(background_jobs="memory"), handler)
+        # A job already waiting, e.g. left in a durable queue by a restart.
+        await runner.queue.put(Job(tool="left_over", args={}))
+        await asyncio.wait_for(finished.wait(), timeout=5)
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from langchain_core.messages import ToolMessage
+
+from appointment_agent.kv import InMemoryKeyValueStore
+from appointment_agent.payloads import PayloadStore, compact_tool_message
+from appointment_agent.tools import fetch_tool_payload
+
+
+def test_large_results_are_compacted_and_fetchable():
+    raw = json.dumps(
+        {
+            "successfull": True,
+            "error": None,
+            "data": {
+                "response_data": {
+                    "id": "evt-1",
+                    "status": "confirmed",
+                    "start": {"dateTime": "2025-01-30T10:00:00Z"},
+                    "end": {"dateTime": "2025-01-30T11:00:00Z"},
+                    "description": "x" * 2000,
+                }
+            },
+        }
+    )
+    message = ToolMessage(
+        name="GOOGLECALENDAR_CREATE_EVENT", tool_call_id="1", content=raw
+    )
+
+    async def run():
+        store = PayloadStore(InMemoryKeyValueStore(), ttl_seconds=60)
+        compact = await compact_tool_message(message, store, max_chars=600)
+        return compact, await store.get(json.loads(compact.content)["payload_ref"])
+
+    compact, payload = asyncio.run(run())
+    summary = json.loads(compact.content)
+    assert summary["successful"] is True
+    assert summary["event_id"] == "evt-1"
+    assert summary["start"] == "2025-01-30T10:00:00Z"
+    assert len(compact.content) < 300
+    assert payload == raw
+
+
+def test_fetch_unknown_payload():
+    config = {"configurable": {"payload_store": "memory"}}
+    result = asyncio.run(
+        fetch_tool_payload.ainvoke({"payload_ref": "sha256:missing"}, config)
+    )
+    assert result.startswith("Error")
@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+import importlib
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import tool
+
+from appointment_agent import prompt_cache
+from appointment_agent.configuration import Configuration
+from appointment_agent.prompt_cache import assemble_prompt, get_gemini_cached_content
+from appointment_agent.prompts import AGENT_SYSTEM
+
+
+def test_system_prefix_is_identical_across_turns():
+    configuration = Configuration(clinic_timezone="Asia/Kolkata", user_id="+15550100")
+    first = assemble_prompt(AGENT_SYSTEM, [HumanMessage("Hi")], configuration)
+    second = assemble_prompt(
+        AGENT_SYSTEM,
+        [HumanMessage("Hi"), AIMessage("Hello!"), HumanMessage("Tomorrow?")],
+        configuration,
+        facts={"patient_name": "Ada"},
+    )
+
+    assert isinstance(first[0], SystemMessage)
+    assert first[0].content.encode() == second[0].content.encode()
+    assert "Ada" in second[-1].content and "Ada" not in first[-1].content
+
+
+def test_call_context_uses_clinic_timezone():
+    configuration = Configuration(clinic_timezone="Asia/Kolkata")
+    context = prompt_cache.render_call_context(configuration)
+
+    assert "Clinic timezone: Asia/Kolkata" in context
+    stamp = context.split("Today's date/time: ")[1].split("\n")[0]
+    assert datetime.datetime.fromisoformat(stamp).utcoffset() == datetime.timedelta(
+        hours=5, minutes=30
+    )
+
+
+class _FakeCaches:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.created = 0
+
+    async def create(self, model, config):
+        self.created += 1
+        if self.fail:
+            raise RuntimeError("prompt below the minimum cacheable size")
+        return SimpleNamespace(name=f"cachedContents/{self.created}")
+
+
+def _fake_model(caches: _FakeCaches):
+    return SimpleNamespace(
+        model="gemini-test", client=SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    )
+
+
+@tool
+def lookup_slots(day: str) -> str:
+    """Look up free slots on a day."""
+    return day
+
+
+def _reset_gemini_caches(monkeypatch):
+    monkeypatch.setattr(prompt_cache, "_gemini_caches", {})
+    monkeypatch.setattr(prompt_cache, "_gemini_failures", {})
+    monkeypatch.setattr(prompt_cache, "_gemini_pending", {})
+
+
+def test_gemini_cache_is_registered_once(monkeypatch):
+    _reset_gemini_caches(monkeypatch)
+    caches = _FakeCaches()
+    model = _fake_model(caches)
+
+    async def run():
+        return [
+            await get_gemini_cached_content(model, AGENT_SYSTEM, [lookup_slots], 3600)
+            for _ in range(2)
+        ]
+
+    assert asyncio.run(run()) == ["cachedContents/1", "cachedContents/1"]
+    assert caches.created == 1
+
+
+def test_gemini_cache_failure_is_not_retried(monkeypatch):
+    _reset_gemini_caches(monkeypatch)
+    caches = _FakeCaches(fail=True)
+    model = _fake_model(caches)
+
+    async def run():
+        return [
+            await get_gemini_cached_content(model, AGENT_SYSTEM, [lookup_slots], 3600)
+            for _ in range(2)
+        ]
+
+    assert asyncio.run(run()) == [None, None]
+    assert caches.created == 1
+
+
+class _RecordingModel:
+    def __init__(self, name: str):
+        self.name = name
+        self.bound: dict = {}
+        self.inputs: list = []
+
+    def bind(self, **kwargs):
+        self.bound = kwargs
+        return self
+
+    async def ainvoke(self, messages, config=None):
+        self.inputs = messages
+        return AIMessage(self.name)
+
+
+def _generate(monkeypatch, cached_content):
+    module = importlib.import_module("appointment_agent.nodes.generate_response")
+    plain, with_tools = _RecordingModel("plain"), _RecordingModel("tools")
+
+    async def fake_cached_content(*args):
+        return cached_content
+
+    monkeypatch.setattr(module, "get_agent_tools", lambda: [])
+    monkeypatch.setattr(module, "get_model", lambda: plain)
+    monkeypatch.setattr(module, "get_model_with_tools", lambda: with_tools)
+    monkeypatch.setattr(module, "get_gemini_cached_content", fake_cached_content)
+    monkeypatch.setattr(module, "start_availability_prefetch", lambda *a: None)
+
+    result = asyncio.run(
+        module.generate_response(
+            {"messages": [HumanMessage("Hi")]},
+            {"configurable": {"prompt_cache": "gemini"}},
+        )
+    )
+    return result["messages"][0].content, plain, with_tools
+
+
+def test_generate_response_uses_cached_content(monkeypatch):
+    answered_by, plain, _ = _generate(monkeypatch, "cachedContents/1")
+
+    assert answered_by == "plain"
+    assert plain.bound == {"cached_content": "cachedContents/1"}
+    assert isinstance(plain.inputs[0], HumanMessage)
+    assert not any(isinstance(m, SystemMessage) for m in plain.inputs)
+
+
+def test_generate_response_falls_back_without_cache(monkeypatch):
+    answered_by, _, with_tools = _generate(monkeypatch, None)
+
+    assert answered_by == "tools"
+    assert isinstance(with_tools.inputs[0], SystemMessage)
+    assert with_tools.inputs[0].content == AGENT_SYSTEM
@@ -0,0 +1,59 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from appointment_agent.nodes import summarize
+from appointment_agent.nodes.summarize import RunningSummary, split_for_summary
+
+
+def _call(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"Patient turn {i} " + "words " * 200, id=f"h{i}"),
+            AIMessage(
+                "",
+                tool_calls=[{"name": "lookup", "id": f"c{i}", "args": {}}],
+                id=f"a{i}",
+            ),
+            ToolMessage(
+                "result " * 50, tool_call_id=f"c{i}", name="lookup", id=f"t{i}"
+            ),
+            AIMessage(f"Reply {i}", id=f"r{i}"),
+        ]
+    return messages
+
+
+def test_split_keeps_whole_turns():
+    messages = _call(6)
+    cut = split_for_summary(messages, keep_tokens=600)
+    assert cut > 0
+    assert isinstance(messages[cut], HumanMessage)
+    # However small the budget, the latest turn stays verbatim.
+    assert split_for_summary(messages, keep_tokens=1) == len(messages) - 4
+    assert split_for_summary(messages[:4], keep_tokens=1) == 0
+
+
+def test_folds_old_turns_into_summary(monkeypatch):
+    class FakeSummaryModel:
+        async def ainvoke(self, messages, config=None):
+            assert "Patient turn 0" in messages[1].content
+            return RunningSummary(
+                patient="Ann, ann@example.com", requested_slot="Tuesday 10am"
+            )
+
+    monkeypatch.setattr(summarize, "get_summary_model", lambda: FakeSummaryModel())
+    config = {
+        "configurable": {"summarize_after_tokens": 1000, "summary_keep_tokens": 600}
+    }
+    update = asyncio.run(
+        summarize.summarize_conversation({"messages": _call(6)}, config)
+    )
+    assert update["summary"]["patient"] == "Ann, ann@example.com"
+    removed = {message.id for message in update["messages"]}
+    assert "h0" in removed and "t0" in removed and "h5" not in removed
+
+    assert (
+        asyncio.run(summarize.summarize_conversation({"messages": _call(1)}, config))
+        == {}
+    )
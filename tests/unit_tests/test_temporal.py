@@ -0,0 +1,62 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from appointment_agent.availability.temporal import resolve_temporal_expression
+
+TZ = ZoneInfo("America/New_York")
+# A Monday morning.
+NOW = datetime.datetime(2025, 1, 13, 9, 30, tzinfo=TZ)
+
+
+@pytest.mark.parametrize(
+    "text, start, end, exact",
+    [
+        ("Tuesday afternoon", (14, 12), (14, 17), False),
+        ("next Tuesday afternoon", (21, 12), (21, 17), False),
+        ("tomorrow at 3", (14, 15), (14, 16), True),
+        ("at 10:30 am on Friday", (17, 10.5), (17, 11.5), True),
+        ("after 2pm tomorrow", (14, 14), (15, 0), False),
+        ("the 30th", (30, 0), (31, 0), False),
+        ("can I come at 11?", (13, 11), (13, 12), True),
+    ],
+)
+def test_resolves_expressions(text, start, end, exact):
+    window = resolve_temporal_expression(
+        text, NOW.astimezone(datetime.timezone.utc), TZ
+    )
+
+    def at(day, hour):
+        return datetime.datetime(2025, 1, day, int(hour), int(hour % 1 * 60), tzinfo=TZ)
+
+    assert (window.start, window.end, window.exact_time) == (
+        at(*start),
+        at(*end),
+        exact,
+    )
+
+
+def test_ignores_text_without_dates():
+    assert resolve_temporal_expression("I have 2 kids", NOW, TZ) is None
+    assert resolve_temporal_expression("my number is 555 0100", NOW, TZ) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "not tomorrow, Friday?",
+        "I can't do Tuesday",
+        "the 3rd one please",
+        "the second option at 3pm",
+        "Tuesday or Wednesday afternoon",
+        "tomorrow, or January 30",
+    ],
+)
+def test_ambiguous_mentions_resolve_to_nothing(text):
+    assert resolve_temporal_expression(text, NOW, TZ) is None
+
+
+def test_weekday_naming_the_date_agrees_with_it():
+    window = resolve_temporal_expression("Thursday 2025-01-16 at 3pm", NOW, TZ)
+    assert window.start == datetime.datetime(2025, 1, 16, 15, tzinfo=TZ)
@@ -0,0 +1,69 @@
+from langchain_core.messages import AIMessage, HumanMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+
+from react_agent import utils
+from react_agent.utils import count_message_tokens
+
+
+def test_count_message_tokens_matches_approximation() -> None:
+    messages = [
+        HumanMessage(content="Is there a free slot on Tuesday?", id="h1"),
+        AIMessage(content="Let me check that for you.", id="a1"),
+    ]
+
+    expected = sum(count_tokens_approximately([m]) for m in messages)
+    assert count_message_tokens(messages) == expected
+
+
+def test_count_message_tokens_only_counts_new_messages(monkeypatch) -> None:
+    counted = []
+
+    def fake_counter(messages):
+        counted.extend(m.id for m in messages)
+        return 1
+
+    monkeypatch.setattr(utils, "count_tokens_approximately", fake_counter)
+    history = [HumanMessage(content="hi", id="cache-h1")]
+    assert count_message_tokens(history) == 1
+
+    history.append(AIMessage(content="hello", id="cache-a1"))
+    assert count_message_tokens(history) == 2
+    assert counted == ["cache-h1", "cache-a1"]
+
+
+def test_count_message_tokens_as_trim_counter() -> None:
+    messages = [HumanMessage(content="x" * 400, id=f"trim-{i}") for i in range(10)]
+
+    trimmed = trim_messages(
+        messages,
+        max_tokens=250,
+        strategy="last",
+        token_counter=count_message_tokens,
+    )
+
+    assert [m.id for m in trimmed] == ["trim-8", "trim-9"]
+
+
+def test_get_bound_chat_model_reuses_instances(monkeypatch) -> None:
+    loaded = []
+
+    class FakeModel:
+        def bind_tools(self, tools):
+            return (self, tuple(tools))
+
+    def fake_load(name, temperature=0.5):
+        loaded.append((name, temperature))
+        return FakeModel()
+
+    monkeypatch.setattr(utils, "load_chat_model", fake_load)
+    monkeypatch.setattr(utils, "_bound_models", type(utils._bound_models)())
+    monkeypatch.setattr(utils, "_BOUND_MODEL_CACHE_SIZE", 2)
+
+    first = utils.get_bound_chat_model("openai/gpt-4o", ["search"])
+    assert utils.get_bound_chat_model("openai/gpt-4o", ["search"]) is first
+    assert len(loaded) == 1
+
+    utils.get_bound_chat_model("openai/gpt-4o", ["search"], temperature=0.0)
+    utils.get_bound_chat_model("groq/llama", ["search"])
+    assert utils.get_bound_chat_model("openai/gpt-4o", ["search"]) is not first
+    assert len(loaded) == 4